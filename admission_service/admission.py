@@ -0,0 +1,185 @@
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import soundfile as sf
+
+from metrics_service.metrics import inc, observe
+from system_service.resources import available_cores
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Requests are costed in estimated CPU-seconds and admitted while the
+# work in flight fits in ADMISSION_CAPACITY. Excess requests wait in a
+# bounded FIFO queue; past that (or after ADMISSION_MAX_WAIT) they get
+# 429 + Retry-After instead of piling up into gateway timeouts.
+# Per process: each gunicorn worker admits against its share of cores.
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+
+_WEB_WORKERS = max(1, int(os.environ.get("WEB_CONCURRENCY", 1)))
+CORES = max(1.0, available_cores() / _WEB_WORKERS)
+
+# Work admitted at once ≈ CORES × seconds of backlog we accept
+ADMISSION_BACKLOG_SECONDS = float(os.environ.get("ADMISSION_BACKLOG_SECONDS", 60))
+ADMISSION_CAPACITY = float(os.environ.get("ADMISSION_CAPACITY", CORES * ADMISSION_BACKLOG_SECONDS))
+
+# A queued request holds one of the worker's GUNICORN_THREADS request
+# threads while it waits. The queue may only fill the threads left after
+# the one running admitted work and ADMISSION_HEADROOM_THREADS kept free
+# for cheap routes (/health, /ready, /jobs polling).
+THREADS = max(1, int(os.environ.get("GUNICORN_THREADS", 4)))
+ADMISSION_HEADROOM_THREADS = int(os.environ.get("ADMISSION_HEADROOM_THREADS", 1))
+ADMISSION_MAX_QUEUE = int(os.environ.get(
+    "ADMISSION_MAX_QUEUE", max(0, THREADS - 1 - ADMISSION_HEADROOM_THREADS)
+))
+ADMISSION_MAX_WAIT = float(os.environ.get("ADMISSION_MAX_WAIT", 30))
+
+# Used when the input duration cannot be read
+DEFAULT_AUDIO_SECONDS = 180
+MIN_COST = 0.5
+
+# endpoint → {mode: estimated CPU-seconds per second of input audio}
+# (ballpark real-time factors; see benchmarks/ to re-measure)
+ENDPOINT_COSTS = {
+    "/demucs/separate": {"fast": 1.0},
+    "/master/ai": {"fast": 0.02, "hq": 0.25},
+    "/master/analog": {"fast": 0.02, "hq": 0.25},
+    "/vocal/ghost2": {"fast": 0.02, "hq": 0.6},
+    "/vocal/doubler": {"fast": 0.02, "hq": 0.6},
+    "/audio/pitch": {"fast": 0.05},
+    "/audio/reverb": {"hq": 0.05},
+    "/audio/timestretch": {"fast": 0.05},
+    "/audio/analyze": {"fast": 0.3},
+    "/audio/chorus": {"fast": 0.2},
+    "/dsp/onsets": {"fast": 0.05},
+    "/pipeline": {"hq": 0.4},   # per step
+    "/batch": {"fast": 0.3},    # per item
+}
+DEFAULT_COST_PER_SECOND = 0.1
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"server busy, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+# -------------------------------------------------------------
+# COST ESTIMATE
+# -------------------------------------------------------------
+def audio_seconds(source):
+    """Duration from the file header (path or file object, no decode); None if unreadable."""
+    try:
+        return sf.info(source).duration
+    except Exception:
+        return None
+
+
+def estimate_cost(endpoint, mode="fast", seconds=None, units=1):
+    rates = ENDPOINT_COSTS.get(endpoint, {})
+    rate = rates.get(mode) or next(iter(rates.values()), DEFAULT_COST_PER_SECOND)
+    if seconds is None:
+        seconds = DEFAULT_AUDIO_SECONDS
+    return max(MIN_COST, rate * seconds * max(1, units))
+
+
+# -------------------------------------------------------------
+# CONTROLLER
+# -------------------------------------------------------------
+class AdmissionController:
+    """Weighted semaphore over cost units with a bounded FIFO queue."""
+
+    def __init__(self, capacity, max_queue, max_wait):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._in_flight = 0.0
+        self._queue = deque()  # [cost] per waiting request, FIFO
+
+    def _retry_after(self, cost):
+        """Seconds until the work ahead of this request has drained."""
+        ahead = self._in_flight + sum(w[0] for w in self._queue) + cost - self.capacity
+        return max(1, math.ceil(ahead / CORES))
+
+    def acquire(self, cost):
+        # A request bigger than the whole capacity runs alone rather than never
+        cost = min(cost, self.capacity)
+
+        with self._cond:
+            if not self._queue and self._in_flight + cost <= self.capacity:
+                self._in_flight += cost
+                return cost
+
+            if len(self._queue) >= self.max_queue:
+                raise Overloaded(self._retry_after(cost))
+
+            waiter = [cost]
+            self._queue.append(waiter)
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while self._queue[0] is not waiter or self._in_flight + cost > self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Overloaded(self._retry_after(cost))
+                    self._cond.wait(remaining)
+                self._in_flight += cost
+                return cost
+            finally:
+                self._queue.remove(waiter)
+                self._cond.notify_all()
+
+    def release(self, cost):
+        with self._cond:
+            self._in_flight = max(0.0, self._in_flight - cost)
+            self._cond.notify_all()
+
+    def state(self):
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "in_flight": round(self._in_flight, 3),
+                "queued": len(self._queue),
+                "queued_cost": round(sum(w[0] for w in self._queue), 3),
+            }
+
+
+_controller = AdmissionController(ADMISSION_CAPACITY, ADMISSION_MAX_QUEUE, ADMISSION_MAX_WAIT)
+
+
+@contextmanager
+def admit(endpoint, mode="fast", seconds=None, units=1):
+    """
+    with admit("/master/ai", "hq", seconds=212.4):
+        ...
+    Blocks while queued; raises Overloaded when the queue is full or
+    the wait exceeds ADMISSION_MAX_WAIT.
+    """
+    if not ADMISSION_ENABLED:
+        yield
+        return
+
+    cost = estimate_cost(endpoint, mode, seconds, units)
+    start = time.perf_counter()
+    try:
+        cost = _controller.acquire(cost)
+    except Overloaded:
+        inc("admission_rejected", help_text="Requests rejected with 429 by admission control",
+            endpoint=endpoint, mode=mode)
+        raise
+    observe("admission_wait_seconds", time.perf_counter() - start,
+            "Time spent queued for admission", endpoint=endpoint, mode=mode)
+
+    try:
+        yield
+    finally:
+        _controller.release(cost)
+
+
+def admission_state():
+    return _controller.state()
@@ -1,10 +1,17 @@
-import tempfile
-import requests
 import numpy as np
-import soundfile as sf
-import librosa
 import scipy.signal as signal
-import subprocess
+
+from fetch_service.fetcher import fetch
+from fetch_service.audio_cache import load_audio
+from fetch_service.result_cache import cached_result
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+from metrics_service.metrics import lap, set_mode
+from dsp_service.filters import Crossover
+from dsp_service.block_engine import (
+    iter_blocks, spool, collect, write_blocks, compensated, Delay, PeakMeter, RmsMeter
+)
+from dsp_service.dynamics import Compressor, Limiter
 
 
 # ------------------------------------------------------------
@@ -15,11 +22,8 @@ def _analog_fast(audio_url):
     Fast 'analog-like' chain using FFmpeg filters.
     Very lightweight.
     """
-    input_path = tempfile.mktemp(suffix=".wav")
-    out_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    out_path = scratch_path(".wav")
 
     cmd = [
         "ffmpeg", "-y",
@@ -34,7 +38,7 @@ def _analog_fast(audio_url):
         out_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd)
     with open(out_path, "rb") as f:
         return f.read()
 
@@ -42,96 +46,152 @@ def _analog_fast(audio_url):
 # ------------------------------------------------------------
 # HQ MODE — True Analog Tape + Tube Modeling
 # ------------------------------------------------------------
-def _analog_hq(audio_url):
-    """
-    HQ Analog Mastering:
-    - Tape soft-knee saturation
-    - Tube harmonics
-    - Crosstalk stereo widening
-    - Analog-style EQ
-    - Warm smooth limiter
-    """
+# One LR4 crossover pass: <180 | 180–300 | 300–800 | 800–6k | >6k
+ANALOG_CROSSOVER = (180, 300, 800, 6000)
 
-    # --------------------------------
-    # 1. Download + load
-    # --------------------------------
-    input_path = tempfile.mktemp(suffix=".wav")
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+# Slow bus "glue" compressor: ratio, attack ms, release ms, threshold
+# above the (normalized) program RMS level
+GLUE_COMPRESSION = (2.0, 30.0, 300.0)
+GLUE_THRESHOLD_DB = 3.0
 
-    y, sr = librosa.load(input_path, sr=44100)
-    y = y.astype(np.float32)
+TRUE_PEAK_CEILING_DB = -1.0
+
+
+def _analog_eq(xo, block):
+    low, _, mid, _, high = xo(block)
 
-    # --------------------------------
-    # 2. ANLOG EQ CURVES
-    # --------------------------------
     # Vintage low bump (60–120 Hz)
-    low_bump = librosa.effects.bandpass(y, sr=sr, low=60, high=180) * 1.25
+    low_bump = low * 1.25
 
     # Gentle mid scoop (300–700 Hz)
-    mid_scoop = librosa.effects.bandpass(y, sr=sr, low=300, high=800) * 0.8
+    mid_scoop = mid * 0.8
 
     # Smooth high roll-off (tape style)
-    highs = librosa.effects.bandpass(y, sr=sr, low=6000, high=16000) * 0.65
+    highs = high * 0.65
 
-    eq = (
-        y * 0.75 +
+    return (
+        block * 0.75 +
         low_bump * 0.20 +
         mid_scoop * 0.05 +
         highs * 0.15
     )
 
-    # --------------------------------
-    # 3. TAPE SATURATION (soft knee)
-    # --------------------------------
-    tape = np.tanh(eq * 1.8) * 0.7 + eq * 0.3
 
-    # --------------------------------
-    # 4. TUBE HARMONICS
-    # --------------------------------
-    tube = eq + 0.15 * (eq ** 3)  # gentle 3rd harmonic
-    tube = tube / max(1e-6, np.max(np.abs(tube)))
+def _tube(eq):
+    return eq + 0.15 * (eq ** 3)  # gentle 3rd harmonic
 
-    # --------------------------------
-    # 5. Combine analog chain
-    # --------------------------------
-    analog = (
+
+def _analog_color(eq, tube_peak):
+    """Tape saturation (soft knee) + tube harmonics, mixed with the EQ'd signal."""
+    tape = np.tanh(eq * 1.8) * 0.7 + eq * 0.3
+    tube = _tube(eq) / tube_peak
+    return (
         eq * 0.55 +
         tape * 0.30 +
         tube * 0.25
     )
 
+
+def analog_master_blocks(y, sr, block_size=None):
+    """
+    HQ Analog Mastering as a block stream:
+    - Analog-style EQ
+    - Tape soft-knee saturation
+    - Tube harmonics
+    - Glue compression
+    - Crosstalk stereo widening
+    - Warm soft clip + lookahead true-peak limiter
+    Mono in → (samples, 2) blocks out, widened by crosstalk drift;
+    (samples, channels) in → same channels out, image untouched (every
+    stage runs on all channels at once). Three passes (EQ → spool +
+    tube peak, mix peak + level, render); working memory is a few
+    blocks.
+    """
     # --------------------------------
-    # 6. Stereo Crosstalk Widening
+    # 1. EQ (spooled) + tube peak
     # --------------------------------
-    shift = int(sr * 0.0008)  # tiny analog drift
-    if shift > 0:
-        left = np.roll(analog, shift)
-        right = np.roll(analog, -shift)
-    else:
-        left = analog.copy()
-        right = analog.copy()
+    xo = Crossover(sr, ANALOG_CROSSOVER)
+    eq_spool = spool(y.shape)
+    tube_meter = PeakMeter()
+
+    pos = 0
+    for block in iter_blocks(y, block_size):
+        eq = _analog_eq(xo, block)
+        tube_meter(_tube(eq))
+        eq_spool[pos:pos + len(block)] = eq
+        pos += len(block)
+    tube_peak = max(1e-6, tube_meter.peak)
 
-    stereo = np.stack([left, right], axis=1)
+    # --------------------------------
+    # 2. Peak + level of the combined chain (normalize to avoid clipping)
+    # --------------------------------
+    peak = PeakMeter()
+    level = RmsMeter()
+    for eq in iter_blocks(eq_spool, block_size):
+        level(peak(_analog_color(eq, tube_peak)))
+    scale = 0.98 / max(peak.peak, 1e-6)
 
-    # Normalize to avoid clipping
-    max_val = max(np.max(np.abs(stereo)), 1e-6)
-    stereo = (stereo / max_val) * 0.98
+    ratio, attack, release = GLUE_COMPRESSION
+    threshold = level.level_db() + 20.0 * np.log10(scale) + GLUE_THRESHOLD_DB
+    glue = Compressor(sr, threshold, ratio, attack, release)
 
     # --------------------------------
-    # 7. Warm Analog Limiter
+    # 3. Glue, stereo crosstalk widening + warm analog limiter
     # --------------------------------
-    # soft clip instead of hard limit
-    stereo = np.tanh(stereo * 1.2).astype(np.float32)
+    # left[n] = analog[n - shift], right[n] = analog[n + shift]: the
+    # right side needs `shift` samples of lookahead, so the stream runs
+    # `shift` late (left delayed 2 * shift) and the lead-in is dropped.
+    # Stereo input already has an image: no drift.
+    shift = int(sr * 0.0008) if y.ndim == 1 else 0  # tiny analog drift
+    left = Delay(2 * shift)
+    skip = shift
+
+    def analog_blocks():
+        for eq in iter_blocks(eq_spool, block_size):
+            yield glue(_analog_color(eq, tube_peak) * scale)
+        if shift:
+            yield np.zeros(shift, dtype=np.float32)
+
+    def widened_blocks():
+        nonlocal skip
+        for analog in analog_blocks():
+            stereo = np.stack([left(analog), analog], axis=1) if analog.ndim == 1 else analog
+            if skip:
+                dropped = min(skip, len(stereo))
+                stereo = stereo[dropped:]
+                skip -= dropped
 
+            # soft clip for warmth, then the limiter catches what's left
+            yield np.tanh(stereo * 1.2).astype(np.float32)
+
+    limiter = Limiter(sr, ceiling_db=TRUE_PEAK_CEILING_DB)
+    yield from compensated(limiter, widened_blocks())
+
+
+def _output_channels(y):
+    return 2 if y.ndim == 1 else y.shape[1]
+
+
+def analog_master_array(y, sr):
+    """Mono float32 in → (samples, 2); (samples, channels) → same shape (used by /pipeline)."""
+    y = np.asarray(y, dtype=np.float32)
+    return collect(analog_master_blocks(y, sr), (len(y), _output_channels(y)))
+
+
+@cached_result("analog_master_hq", version=5, file_ext=".wav")
+def _analog_hq(audio_url):
     # --------------------------------
-    # 8. Save mastered file
+    # Download + decode (memory-mapped, streamed from here on);
+    # channels kept: (channels, samples) → (samples, channels) view
     # --------------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
-    sf.write(out_path, stereo, sr)
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
+    y = y.T
 
-    with open(out_path, "rb") as f:
-        return f.read()
+    out_path = write_blocks(analog_master_blocks(y, sr), scratch_path(".wav"), sr, _output_channels(y))
+    lap("dsp")
+
+    # rendered file by path: the cache and publish step copy it, never load it
+    return out_path
 
 
 # ------------------------------------------------------------
@@ -146,6 +206,7 @@ def analog_master(audio_url, hq=False):
         hq = True
 
     if hq:
+        set_mode("hq")
         return _analog_hq(audio_url)
 
     return _analog_fast(audio_url)
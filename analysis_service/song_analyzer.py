@@ -2,9 +2,12 @@ import numpy as np
 import librosa
 import scipy.signal as signal
 
+from fetch_service.audio_cache import load_audio_file
+from fetch_service.result_cache import cached_result
 from chorus_service.chorus_detector import detect_chorus_sections
 
 
+@cached_result("analyze_song", version=1, source="path")
 def analyze_song(audio_path):
     """
     Full song analysis including:
@@ -18,7 +21,7 @@ def analyze_song(audio_path):
     # ---------------------------------------------------------
     # LOAD AUDIO
     # ---------------------------------------------------------
-    y, sr = librosa.load(audio_path, sr=44100, mono=True)
+    y, sr = load_audio_file(audio_path, sr=44100, mono=True)
     total_duration = librosa.get_duration(y=y, sr=sr)
 
     # ---------------------------------------------------------
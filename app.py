@@ -1,67 +1,64 @@
+import io
 import os
-import uuid
 import traceback
-import tempfile
-import librosa
 import base64
-import numpy as np
 
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, g
 from flask_cors import CORS
 
 ##############################################################
-# IMPORT ONLY MODULES THAT ACTUALLY EXIST IN YOUR REPO
+# LIGHTWEIGHT INFRASTRUCTURE (imported eagerly)
 ##############################################################
 
-# Demucs CPU separation
-from demucs_service.demucs_handler import run_demucs
-
-# FFmpeg tools
-from ffmpeg_service.ffmpeg_handler import (
-    run_ffmpeg_mix,
-    create_zip_from_stems
+# Lazy handler registry
+from loader_service.lazy_loader import (
+    lazy,
+    handler_status,
+    loaded_engines,
+    start_warmup,
+    warmup_state
 )
 
-# Mastering
-from mastering_service.mastering_handler import run_mastering
-from analog_master_service.analog_master_handler import analog_master
-from master_ai_service.master_ai_handler import run_master_ai
+# Persona cache
+from persona_service.persona_cache import cache_persona, load_persona
 
-# Pitch / Time
-from pitch_service.pitch_handler import pitch_shift
-from timestretch_service.timestretch_handler import time_stretch
+# Versions
+from versioning_service.version_handler import save_version, get_versions
 
-# Effects
-from ghost_mode_service.ghost_mode_handler import apply_ghost_mode
-from doubler_service.doubler_handler import vocal_doubler
+# Shared download cache
+from fetch_service.fetcher import fetch, fetch_info, store_stream
 
-# Melody / MIDI extraction
-from melody_midi_service.melody_midi_handler import voice_to_midi
+# Background jobs
+from job_service.job_queue import submit_job, get_job, queue_depth, JobQueueFull
 
-# Persona cache
-from persona_service.persona_cache import cache_persona, load_persona
+# Batches of operations over shared inputs
+from batch_service.batch import run_batch
 
-# Sovits
-from sovits_service.sovits_handler import run_sovits
-from sovits_service.sovits_multilayer import run_sovits_multilayer
+# Single-flight coalescing of identical in-flight work
+from coalesce_service.single_flight import flight_key, single_flight, inflight_count
 
-# MusicGen simple
-from musicgen_service.musicgen_handler import generate_music
+# Output encoding (wav / flac / opus / mp3, negotiated per request)
+from audio_io_service.audio_io import output_options, negotiate_format, transcode, publish_audio, decode
 
-# Cover art
-from cover_art_service.cover_art_handler import generate_cover
+# Admission control (cost-capped concurrency, 429 + Retry-After past the queue)
+from admission_service.admission import admit, audio_seconds, admission_state, Overloaded
 
-# Versions
-from versioning_service.version_handler import save_version, get_versions
+# Impulse response library (impulse_responses/ scanned at import)
+from reverb_service.ir_registry import DEFAULT_IR, ir_names, reverb_params
 
-# DSP utils
-from dsp_service.dsp_utils import (
-    detect_onsets,
-    estimate_tempo,
-    compute_energy_map,
-    detect_silence,
-    slice_by_onsets,
-    detect_transients
+# Metrics
+from metrics_service import metrics
+from metrics_service.profiler import begin_profile, finish_profile, get_report
+
+# Scratch space + published outputs
+from scratch_service.scratch import (
+    begin_request,
+    end_request,
+    publish_bytes,
+    publish_file,
+    published_path,
+    start_gc_thread,
+    usage as scratch_usage
 )
 
 ##############################################################
@@ -71,7 +68,61 @@ from dsp_service.dsp_utils import (
 def safe_not_implemented(*args, **kwargs):
     return {"status": "not_implemented"}
 
-# Missing advanced modules overridden with safe versions
+##############################################################
+# HANDLERS (imported on first use — librosa/numba, torch,
+# crepe/TensorFlow etc. only load in workers that need them)
+##############################################################
+
+# Demucs CPU separation
+run_demucs = lazy("run_demucs", "demucs_service.demucs_handler", engine="demucs")
+
+# FFmpeg tools
+run_ffmpeg_mix = lazy("run_ffmpeg_mix", "ffmpeg_service.ffmpeg_handler", engine="ffmpeg")
+create_zip_from_stems = lazy("create_zip_from_stems", "ffmpeg_service.ffmpeg_handler", engine="ffmpeg")
+create_hq_zip_stems = lazy("create_hq_zip_stems", "ffmpeg_service.zip_stems_hq", engine="librosa",
+                           fallback=lambda stems, max_downloads=None, output=None: b"EMPTY_ZIP")
+
+# Mastering
+run_mastering = lazy("run_mastering", "mastering_service.mastering_handler", engine="pyloudnorm")
+analog_master = lazy("analog_master", "analog_master_service.analog_master_handler", engine="librosa")
+run_master_ai = lazy("run_master_ai", "master_ai_service.master_ai_handler", engine="librosa")
+
+# Pitch / Time
+pitch_shift = lazy("pitch_shift", "pitch_service.pitch_handler", engine="ffmpeg")
+time_stretch = lazy("time_stretch", "timestretch_service.timestretch_handler", engine="ffmpeg")
+
+# Effects
+apply_ghost_mode = lazy("apply_ghost_mode", "ghost_mode_service.ghost_mode_handler", engine="librosa")
+vocal_doubler = lazy("vocal_doubler", "doubler_service.doubler_handler", engine="librosa")
+convolution_reverb = lazy("convolution_reverb", "reverb_service.impulse_reverb", engine="librosa")
+
+# In-memory effect chains
+run_pipeline = lazy("run_pipeline", "pipeline_service.pipeline", engine="librosa")
+parse_pipeline = lazy("parse_pipeline", "pipeline_service.pipeline", attr="parse_steps", engine="librosa")
+
+# Melody / MIDI extraction
+voice_to_midi = lazy("voice_to_midi", "melody_midi_service.melody_midi_handler", engine="crepe")
+
+# Sovits
+run_sovits = lazy("run_sovits", "sovits_service.sovits_handler", engine="sovits")
+run_sovits_multilayer = lazy("run_sovits_multilayer", "sovits_service.sovits_multilayer", engine="sovits")
+
+# MusicGen simple
+generate_music = lazy("generate_music", "musicgen_service.musicgen_handler", engine="musicgen")
+
+# Cover art
+generate_cover = lazy("generate_cover", "cover_art_service.cover_art_handler", engine="cover_art")
+
+# DSP utils
+detect_onsets = lazy("detect_onsets", "dsp_service.dsp_utils", engine="librosa")
+estimate_tempo = lazy("estimate_tempo", "dsp_service.dsp_utils", engine="librosa")
+compute_energy_map = lazy("compute_energy_map", "dsp_service.dsp_utils", engine="librosa")
+detect_silence = lazy("detect_silence", "dsp_service.dsp_utils", engine="librosa")
+slice_by_onsets = lazy("slice_by_onsets", "dsp_service.dsp_utils", engine="librosa")
+detect_transients = lazy("detect_transients", "dsp_service.dsp_utils", engine="librosa")
+
+# Missing advanced modules overridden with safe versions (not lazy():
+# these answer not_implemented even where a module of that name exists)
 analyze_song = safe_not_implemented
 align_lyrics_to_melody = safe_not_implemented
 detect_chorus_sections = safe_not_implemented
@@ -83,7 +134,6 @@ master_album_hq = safe_not_implemented
 sovits_multipass_hq = safe_not_implemented
 analyze_lyrics_hq = safe_not_implemented
 songwriting_hq = safe_not_implemented
-create_hq_zip_stems = lambda stems: b"EMPTY_ZIP"
 
 ##############################################################
 # FLASK APP SETUP
@@ -91,14 +141,86 @@ create_hq_zip_stems = lambda stems: b"EMPTY_ZIP"
 
 app = Flask(__name__)
 
+# Per-request working directory, removed when the request ends
+app.before_request(begin_request)
+app.teardown_request(lambda exc: end_request())
+
+# Per-endpoint / per-mode stage timing
+@app.before_request
+def start_request_metrics():
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    mode = "hq" if request.args.get("hq") == "true" else "fast"
+    metrics.start_request(endpoint, mode)
+
+@app.teardown_request
+def end_request_metrics(exc):
+    metrics.end_request()
+
+metrics.register_gauge("job_queue_depth", "Background jobs not yet finished", queue_depth)
+metrics.register_gauge("inflight_calls", "Distinct coalescable calls currently running", inflight_count)
+
+def admission_gauge():
+    state = admission_state()
+    return {
+        (("state", "in_flight"),): state["in_flight"],
+        (("state", "queued"),): state["queued_cost"],
+    }
+
+metrics.register_gauge("admission_cost_units", "Estimated CPU-seconds admitted / waiting", admission_gauge)
+
+def scratch_bytes_gauge():
+    usage = scratch_usage()
+    return {
+        (("area", area),): usage[f"{area}_bytes"]
+        for area in ("work", "orphan", "published")
+    }
+
+metrics.register_gauge("scratch_bytes", "Bytes held in scratch / published areas", scratch_bytes_gauge)
+
+# ?profile=1 (only when ENABLE_PROFILING=true): hot functions + stage
+# timeline, merged into JSON responses or fetched via X-Profile-Url
+@app.before_request
+def start_profile():
+    if request.args.get("profile") == "1":
+        begin_profile(sort=request.args.get("profile_sort", "self"))
+
+@app.after_request
+def attach_profile(response):
+    report = finish_profile()
+    if report is None:
+        return response
+
+    response.headers["X-Profile-Url"] = f"{request.url_root.rstrip('/')}/profile/{report['id']}"
+    if response.is_json and not response.direct_passthrough:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            body["profile"] = report
+            response.set_data(app.json.dumps(body))
+    return response
+
+# after_request is skipped on some error paths — always stop the profiler
+app.teardown_request(lambda exc: finish_profile())
+
+def start_background_tasks():
+    # TTL expiry + quota eviction of published outputs
+    start_gc_thread()
+
+    # Optional background import of WARMUP_HANDLERS
+    start_warmup()
+
+# Threads do not survive fork: with gunicorn's preload_app these are
+# started per worker from post_fork (see gunicorn.conf.py) instead
+if os.environ.get("APP_PRELOAD") != "true":
+    start_background_tasks()
+
 ##############################################################
 # STATIC FILES
 ##############################################################
 
 @app.route("/files/<path:filename>")
 def serve_files(filename):
-    path = os.path.join("/tmp", filename)
-    if not os.path.exists(path):
+    path = published_path(filename)
+    if path is None:
         return jsonify({"error": "file not found"}), 404
     return send_file(path)
 
@@ -116,17 +238,196 @@ def safe_json():
     return request.get_json(silent=True) or {}
 
 def error_response(e):
+    if isinstance(e, Overloaded):
+        return overloaded_response(e)
     print("------ ERROR ------")
     print(traceback.format_exc())
     return jsonify({"error": str(e)}), 500
 
 def generate_temp_file(raw_bytes, ext=".wav"):
-    name = f"{uuid.uuid4().hex}{ext}"
-    path = os.path.join("/tmp", name)
-    with open(path, "wb") as f:
-        f.write(raw_bytes)
+    with metrics.stage("write", len(raw_bytes)):
+        name = publish_bytes(raw_bytes, ext)
     url = f"{request.url_root.rstrip('/')}/files/{name}"
-    return path, url
+    return published_path(name), url
+
+##############################################################
+# STREAMED AUDIO IN / OUT
+##############################################################
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+def is_audio_upload():
+    """Body is raw audio (audio/* or octet-stream) instead of JSON."""
+    mimetype = request.mimetype or ""
+    return mimetype.startswith("audio/") or mimetype == "application/octet-stream"
+
+def request_params():
+    """JSON body for URL requests, query string for raw audio uploads."""
+    if is_audio_upload():
+        return request.args.to_dict()
+    return safe_json()
+
+def audio_source(data):
+    """
+    audio_url from JSON, or the uploaded body streamed to the blob
+    store in chunks (never via request.data).
+    """
+    if is_audio_upload():
+        return store_stream(request.stream)
+    return data["audio_url"]
+
+def wants_stream():
+    """Uploads (and ?stream=true) get the audio back as a chunked body."""
+    return is_audio_upload() or request.args.get("stream") == "true"
+
+def requested_output():
+    """
+    output_format / bit_depth / dither from the params (JSON body or
+    query string), else the first audio type in the Accept header.
+    """
+    data = request_params()
+    if not isinstance(data, dict):
+        data = {}
+
+    def param(name):
+        return data.get(name) or request.args.get(name)
+
+    fmt = param("output_format") or negotiate_format(request.headers.get("Accept"))
+    return output_options(fmt, param("bit_depth"), param("dither"))
+
+def stream_bytes(raw_bytes, mimetype="audio/wav"):
+    def generate():
+        for i in range(0, len(raw_bytes), STREAM_CHUNK_SIZE):
+            yield raw_bytes[i:i + STREAM_CHUNK_SIZE]
+    return Response(generate(), mimetype=mimetype)
+
+def audio_response(audio):
+    """Handler WAV output (bytes or a rendered file), encoded once into the negotiated format."""
+    if wants_stream():
+        encoded, _, mimetype = transcode(audio, g.output)
+        if isinstance(encoded, str):
+            return send_file(encoded, mimetype=mimetype)
+        return stream_bytes(encoded, mimetype)
+    return jsonify({"audio_url": file_url(publish_audio(audio, g.output))})
+
+# Invalid output options fail before any work is done
+@app.before_request
+def check_output_options():
+    try:
+        g.output = requested_output()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+##############################################################
+# BACKGROUND JOBS
+##############################################################
+
+def wants_async():
+    """?async=true or {"async": true} → run as a background job."""
+    if request.args.get("async") == "true":
+        return True
+    return bool(safe_json().get("async"))
+
+def file_url(name):
+    return f"{request.url_root.rstrip('/')}/files/{name}"
+
+def write_job_output(audio, output=None):
+    """Job-side twin of audio_response (no request context)."""
+    return publish_audio(audio, output)
+
+def job_accepted(kind, fn, *args, key=None):
+    if key is not None:
+        # Same input in another output format is a different job
+        key = flight_key(kind, key, g.output)
+    try:
+        job_id = submit_job(kind, fn, *args, coalesce_key=key)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"{request.url_root.rstrip('/')}/jobs/{job_id}"
+    }), 202
+
+##############################################################
+# COALESCING (identical in-flight requests share one computation)
+##############################################################
+
+def request_key(operation, url, params=None):
+    """(operation, input content hash, normalized params) → key."""
+    _, digest = fetch_info(url)
+    return flight_key(operation, digest, params)
+
+def coalesced(operation, key, fn, *args, url=None, mode="fast", units=1):
+    """Only the call that actually runs takes admission units; followers just wait."""
+    def run():
+        with admitted(url, mode, units):
+            return fn(*args)
+    return single_flight(key, run, operation=operation)
+
+##############################################################
+# ADMISSION CONTROL
+##############################################################
+
+def input_seconds(url):
+    """Input duration from the audio file header, else the X-Audio-Duration hint."""
+    seconds = audio_seconds(fetch(url)) if url else None
+    if seconds is None:
+        try:
+            seconds = float(request.headers["X-Audio-Duration"])
+        except (KeyError, ValueError):
+            pass
+    return seconds
+
+def admitted(url=None, mode="fast", units=1):
+    """
+    with admitted(url, "hq"): ...
+    Cost is estimated from endpoint, mode and input duration; raises
+    Overloaded (→ 429 via error_response) when the wait queue is full.
+    """
+    return admit(metrics.current_endpoint(), mode, input_seconds(url), units)
+
+def overloaded_response(e):
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 429
+
+# Job bodies run in the process pool: module-level, return file names
+def demucs_job(url):
+    stems = run_demucs(url)
+    return {"stems": [{"name": s["name"], "file": os.path.basename(s["path"])} for s in stems]}
+
+def master_ai_job(url, preset, output):
+    return {"files": {"audio_url": write_job_output(run_master_ai(url, preset), output)}}
+
+def ghost_job(url, hq, output):
+    return {"files": {"audio_url": write_job_output(apply_ghost_mode(url, hq=hq), output)}}
+
+def pipeline_job(url, steps, output):
+    return {"files": {"audio_url": write_job_output(run_pipeline(url, steps), output)}}
+
+def sovits_multi_job(lyrics, midi, persona, layers, seed, output):
+    audio = run_sovits_multilayer(lyrics, midi, persona, layers, seed=seed)
+    return {"files": {"audio_url": write_job_output(audio, output)}}
+
+@app.get("/jobs/<job_id>")
+def job_status_route(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+
+    result = job.get("result")
+    if result is not None:
+        out = {}
+        for key, name in result.get("files", {}).items():
+            out[key] = file_url(name)
+        if "stems" in result:
+            out["stems"] = [
+                {"name": s["name"], "url": file_url(s["file"])}
+                for s in result["stems"]
+            ]
+        job["result"] = out
+
+    return jsonify(job)
 
 ##############################################################
 # HEALTHCHECK
@@ -136,6 +437,37 @@ def generate_temp_file(raw_bytes, ext=".wav"):
 def health():
     return jsonify({"status": "ok"})
 
+@app.get("/ready")
+def ready():
+    """
+    Unlike /health (process is up), /ready reports warm-up progress
+    and which handler engines are already imported.
+    """
+    state = warmup_state()
+    is_ready = state["finished"] or not state["started"]
+    body = {
+        "ready": is_ready,
+        "warmup": state,
+        "engines_loaded": loaded_engines(),
+        "handlers": handler_status()
+    }
+    return jsonify(body), (200 if is_ready else 503)
+
+@app.get("/profile/<report_id>")
+def profile_report(report_id):
+    report = get_report(report_id)
+    if report is None:
+        return jsonify({"error": "profile not found"}), 404
+    return jsonify(report)
+
+@app.get("/metrics")
+def metrics_route():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.get("/scratch/usage")
+def scratch_usage_route():
+    return jsonify(scratch_usage())
+
 ##############################################################
 # DSP: Onsets
 ##############################################################
@@ -143,14 +475,13 @@ def health():
 @app.post("/dsp/onsets")
 def dsp_onsets_route():
     try:
-        audio_bytes = request.data
-        temp = tempfile.mktemp(suffix=".wav")
-        with open(temp, "wb") as f:
-            f.write(audio_bytes)
-
-        audio, sr = librosa.load(temp, sr=44100)
-        result = detect_onsets(audio, sr)
-        return jsonify({"onsets": result})
+        audio_bytes = request.get_data()
+
+        seconds = audio_seconds(io.BytesIO(audio_bytes))
+        with admit(metrics.current_endpoint(), "fast", seconds):
+            audio, sr = decode(audio_bytes, sr=44100)
+            result = detect_onsets(audio, sr)
+        return jsonify({"onsets": result.tolist()})
     except Exception as e:
         return error_response(e)
 
@@ -164,12 +495,9 @@ def analyze_route():
         data = safe_json()
         url = data["audio_url"]
 
-        tmp = tempfile.mktemp(suffix=".wav")
-        import requests
-        with open(tmp, "wb") as f:
-            f.write(requests.get(url).content)
+        tmp = fetch(url)
 
-        result = analyze_song(tmp)
+        result = coalesced("analyze", request_key("analyze", url), analyze_song, tmp, url=url)
         return jsonify(result)
     except Exception as e:
         return error_response(e)
@@ -184,12 +512,9 @@ def chorus_route():
         data = safe_json()
         url = data["audio_url"]
 
-        import requests
-        tmp = tempfile.mktemp(suffix=".wav")
-        with open(tmp, "wb") as f:
-            f.write(requests.get(url).content)
+        tmp = fetch(url)
 
-        return jsonify(detect_chorus_sections(tmp))
+        return jsonify(coalesced("chorus", request_key("chorus", url), detect_chorus_sections, tmp, url=url))
     except Exception as e:
         return error_response(e)
 
@@ -205,11 +530,10 @@ def zipstems_route():
         hq = request.args.get("hq") == "true"
 
         if hq:
-            raw = create_hq_zip_stems(stems)
+            _, url = generate_temp_file(create_hq_zip_stems(stems, output=g.output), ext=".zip")
         else:
-            raw = create_zip_from_stems(stems)
+            url = file_url(publish_file(create_zip_from_stems(stems)))
 
-        _, url = generate_temp_file(raw, ext=".zip")
         return jsonify({"zip_url": url})
     except Exception as e:
         return error_response(e)
@@ -223,7 +547,10 @@ def demucs_route():
     try:
         data = safe_json()
         url = data["audio_url"]
-        stems = run_demucs(url)
+        key = request_key("demucs", url)
+        if wants_async():
+            return job_accepted("demucs", demucs_job, url, key=key)
+        stems = coalesced("demucs", key, run_demucs, url, url=url)
         return jsonify({"stems": stems})
     except Exception as e:
         return error_response(e)
@@ -242,8 +569,7 @@ def sovits_sing():
         midi = base64.b64decode(data["melody_midi"]) if data.get("melody_midi") else b""
         result = run_sovits(lyrics, midi, persona)
 
-        wav_path = result["wav_path"]
-        url = f"{request.url_root.rstrip('/')}/files/{os.path.basename(wav_path)}"
+        url = file_url(publish_file(result["wav_path"]))
         return jsonify({"audio_url": url})
     except Exception as e:
         return error_response(e)
@@ -260,10 +586,13 @@ def sovits_multi():
         lyrics = data["lyrics"]
         midi = base64.b64decode(data["melody_midi"])
         layers = data["layers"]
+        seed = int(data.get("seed", 0))
 
-        audio = run_sovits_multilayer(lyrics, midi, persona, layers)
-        _, url = generate_temp_file(audio)
-        return jsonify({"audio_url": url})
+        if wants_async():
+            return job_accepted("sovits_multi", sovits_multi_job, lyrics, midi, persona, layers, seed, g.output)
+
+        audio = run_sovits_multilayer(lyrics, midi, persona, layers, seed=seed)
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -274,12 +603,14 @@ def sovits_multi():
 @app.post("/vocal/ghost2")
 def ghost_route():
     try:
-        data = safe_json()
-        url = data["audio_url"]
+        data = request_params()
+        url = audio_source(data)
         hq = request.args.get("hq") == "true"
-        audio = apply_ghost_mode(url, hq=hq)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        key = request_key("ghost", url, {"hq": hq})
+        if wants_async():
+            return job_accepted("ghost", ghost_job, url, hq, g.output, key=key)
+        audio = coalesced("ghost", key, apply_ghost_mode, url, hq, url=url, mode="hq" if hq else "fast")
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -289,12 +620,92 @@ def ghost_route():
 
 @app.post("/vocal/doubler")
 def doubler_route():
+    try:
+        data = request_params()
+        url = audio_source(data)
+        with admitted(url):
+            audio = vocal_doubler(url)
+        return audio_response(audio)
+    except Exception as e:
+        return error_response(e)
+
+##############################################################
+# CONVOLUTION REVERB (impulse response by name)
+##############################################################
+
+@app.get("/audio/reverb/irs")
+def reverb_irs_route():
+    return jsonify({"irs": ir_names(), "default": DEFAULT_IR})
+
+@app.post("/audio/reverb")
+def reverb_route():
+    """{"audio_url": ..., "ir": "cathedral", "mix": 0.3, "dampen": 0.15}"""
+    try:
+        data = request_params()
+        try:
+            ir, mix, dampen = reverb_params(data.get("ir", DEFAULT_IR), data.get("mix", 0.28),
+                                            data.get("dampen", 0.15))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        url = audio_source(data)
+        key = request_key("reverb", url, {"ir": ir, "mix": mix, "dampen": dampen})
+        audio = coalesced("reverb", key, convolution_reverb, url, ir, mix, dampen, url=url, mode="hq")
+        return audio_response(audio)
+    except Exception as e:
+        return error_response(e)
+
+##############################################################
+# PIPELINE (ghost → doubler → reverb → master in one request)
+##############################################################
+
+@app.post("/pipeline")
+def pipeline_route():
+    """
+    {"audio_url": ..., "steps": ["ghost", "doubler", {"op": "reverb", "mix": 0.3}, "master_ai"]}
+    Raw audio uploads pass steps in the query string (?steps=ghost,doubler).
+    """
+    try:
+        data = request_params()
+        steps = data.get("steps")
+        try:
+            plan = parse_pipeline(steps)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        url = audio_source(data)
+        key = request_key("pipeline", url, {"steps": steps})
+        if wants_async():
+            return job_accepted("pipeline", pipeline_job, url, steps, g.output, key=key)
+        audio = coalesced("pipeline", key, run_pipeline, url, steps, url=url, mode="hq", units=len(plan))
+        return audio_response(audio)
+    except Exception as e:
+        return error_response(e)
+
+##############################################################
+# BATCH (many operations, shared inputs fetched/decoded once)
+##############################################################
+
+@app.post("/batch")
+def batch_route():
+    """
+    {"items": [{"op": "pitch", "audio_url": ..., "semitones": 1},
+               {"op": "midi", "audio_url": ...}, ...]}
+    Every item gets a result entry; one failing item never fails the batch.
+    """
     try:
         data = safe_json()
-        url = data["audio_url"]
-        audio = vocal_doubler(url)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        items = data.get("items")
+        try:
+            with admitted(units=len(items) if isinstance(items, list) else 1):
+                results = run_batch(items, g.output)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        for entry in results:
+            if "file" in entry:
+                entry["url"] = file_url(entry.pop("file"))
+        return jsonify({"results": results})
     except Exception as e:
         return error_response(e)
 
@@ -323,11 +734,11 @@ def gen_instrumental():
 @app.post("/master/analog")
 def analog_route():
     try:
-        data = safe_json()
-        url = data["audio_url"]
-        audio = analog_master(url)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        data = request_params()
+        url = audio_source(data)
+        with admitted(url):
+            audio = analog_master(url)
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -338,12 +749,15 @@ def analog_route():
 @app.post("/master/ai")
 def master_ai_route():
     try:
-        data = safe_json()
-        url = data["audio_url"]
+        data = request_params()
+        url = audio_source(data)
         preset = data.get("preset", "default")
-        audio = run_master_ai(url, preset)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        key = request_key("master_ai", url, {"preset": preset})
+        if wants_async():
+            return job_accepted("master_ai", master_ai_job, url, preset, g.output, key=key)
+        mode = "hq" if str(preset).lower() in ("hq", "librosa", "true", "1", "master") else "fast"
+        audio = coalesced("master_ai", key, run_master_ai, url, preset, url=url, mode=mode)
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -354,12 +768,12 @@ def master_ai_route():
 @app.post("/audio/pitch")
 def pitch_route():
     try:
-        data = safe_json()
-        url = data["audio_url"]
-        semitones = data["semitones"]
-        audio = pitch_shift(url, semitones)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        data = request_params()
+        url = audio_source(data)
+        semitones = float(data["semitones"])
+        with admitted(url):
+            audio = pitch_shift(url, semitones)
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -370,12 +784,12 @@ def pitch_route():
 @app.post("/audio/timestretch")
 def timestretch_route():
     try:
-        data = safe_json()
-        url = data["audio_url"]
-        factor = data["stretch_factor"]
-        audio = time_stretch(url, factor)
-        _, out = generate_temp_file(audio)
-        return jsonify({"audio_url": out})
+        data = request_params()
+        url = audio_source(data)
+        factor = float(data["stretch_factor"])
+        with admitted(url):
+            audio = time_stretch(url, factor)
+        return audio_response(audio)
     except Exception as e:
         return error_response(e)
 
@@ -388,7 +802,7 @@ def melody_midi_route():
     try:
         data = safe_json()
         url = data["audio_url"]
-        midi_url = voice_to_midi(url)
+        midi_url = file_url(publish_file(voice_to_midi(url)))
         return jsonify({"midi_url": midi_url})
     except Exception as e:
         return error_response(e)
@@ -0,0 +1,377 @@
+import io
+import os
+import functools
+from math import gcd
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import firwin, resample_poly
+
+from metrics_service.metrics import stage
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+from scratch_service.scratch import scratch_path, publish_bytes, publish_file
+
+# -------------------------------------------------------------
+# RESAMPLE
+# -------------------------------------------------------------
+RESAMPLE_QUALITY = os.environ.get("RESAMPLE_QUALITY", "hq")
+
+# quality → (filter half-length in periods of the higher rate, Kaiser beta, cutoff re. Nyquist)
+RESAMPLE_FILTERS = {
+    "fast": (10, 5.0, 1.0),     # scipy.signal.resample_poly's own design
+    "hq": (32, 12.0, 0.95),     # ~-120 dB stopband, no aliasing at the band edge
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _resample_filter(up, down, quality):
+    half_len, beta, cutoff = RESAMPLE_FILTERS[quality]
+    max_rate = max(up, down)
+    return firwin(2 * half_len * max_rate + 1, cutoff / max_rate, window=("kaiser", beta))
+
+
+def resample(y, orig_sr, target_sr, quality=None, axis=-1):
+    """Polyphase resampling; quality: "fast" | "hq" (default RESAMPLE_QUALITY)."""
+    if orig_sr == target_sr:
+        return y
+
+    quality = quality or RESAMPLE_QUALITY
+    if quality not in RESAMPLE_FILTERS:
+        raise ValueError(f"resample quality must be one of {sorted(RESAMPLE_FILTERS)}")
+
+    g = gcd(int(orig_sr), int(target_sr))
+    up, down = int(target_sr) // g, int(orig_sr) // g
+    with stage("resample"):
+        out = resample_poly(y, up, down, axis=axis, window=_resample_filter(up, down, quality))
+    return out.astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming resample() (samples on axis 0): call it per block, then
+    flush() once at the end; the concatenated output equals resample()
+    of the whole signal. Input is cut into chunks aligned to the
+    polyphase period, each run with enough filter context on both sides
+    that its output is exact.
+    """
+
+    def __init__(self, orig_sr, target_sr, quality=None, chunk=65536):
+        quality = quality or RESAMPLE_QUALITY
+        if quality not in RESAMPLE_FILTERS:
+            raise ValueError(f"resample quality must be one of {sorted(RESAMPLE_FILTERS)}")
+
+        g = gcd(int(orig_sr), int(target_sr))
+        self.up, self.down = int(target_sr) // g, int(orig_sr) // g
+        self.window = _resample_filter(self.up, self.down, quality)
+
+        # input samples either side that one output sample depends on,
+        # rounded up to whole periods so chunk edges stay aligned
+        half_len = (len(self.window) - 1) // 2
+        context = -(-half_len // self.up) + 1
+        self.context = -(-context // self.down) * self.down
+        self.step = max(1, chunk // self.down) * self.down
+        self.buf = None   # context history + pending input
+
+    def _run(self, seg, n_out):
+        with stage("resample"):
+            out = resample_poly(seg, self.up, self.down, axis=0, window=self.window)
+        start = self.context * self.up // self.down
+        return out[start:start + n_out].astype(np.float32)
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.buf is None:
+            self.buf = np.zeros((self.context,) + block.shape[1:], dtype=np.float32)
+        self.buf = np.concatenate([self.buf, block])
+
+        out = []
+        while len(self.buf) >= self.step + 2 * self.context:
+            out.append(self._run(self.buf[:self.step + 2 * self.context], self.step * self.up // self.down))
+            self.buf = self.buf[self.step:]
+
+        if not out:
+            return np.zeros((0,) + block.shape[1:], dtype=np.float32)
+        return np.concatenate(out)
+
+    def flush(self):
+        """Output still owed for the buffered tail (past the end is silence)."""
+        if self.buf is None:
+            return np.zeros(0, dtype=np.float32)
+        pending = len(self.buf) - self.context
+        out = self._run(self.buf, -(-pending * self.up // self.down))
+        self.buf = None
+        return out
+
+
+# -------------------------------------------------------------
+# DECODE
+# -------------------------------------------------------------
+def _ffmpeg_read(source):
+    """Formats libsndfile can't parse (AAC, M4A, …): ffmpeg → float AU over a pipe."""
+    if isinstance(source, (bytes, bytearray)):
+        src, data = "pipe:0", bytes(source)
+    else:
+        src, data = source, None
+
+    cmd = ["ffmpeg", "-v", "error", "-i", src, "-f", "au", "-c:a", "pcm_f32be", "pipe:1"]
+    result = run_ffmpeg(cmd, check=True, input=data)
+    return sf.read(io.BytesIO(result.stdout), dtype="float32", always_2d=True)
+
+
+def decode(source, sr=44100, mono=True, quality=None):
+    """
+    Encoded bytes (or a file path) → (y, sr) without temp files.
+    Same layout as librosa.load: (samples,) when mono or single-channel,
+    (channels, samples) otherwise. sr=None keeps the native rate.
+    WAV/FLAC/OGG/MP3 decode in-process via libsndfile; anything else
+    goes through an ffmpeg pipe.
+    """
+    with stage("decode") as info:
+        try:
+            f = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+            y, native_sr = sf.read(f, dtype="float32", always_2d=True)
+        except RuntimeError:  # sf.LibsndfileError: unknown / unsupported format
+            y, native_sr = _ffmpeg_read(source)
+
+        y = y.mean(axis=1) if mono or y.shape[1] == 1 else y.T
+        if sr is None:
+            sr = native_sr
+        else:
+            y = resample(y, native_sr, sr, quality)
+
+        y = np.ascontiguousarray(y, dtype=np.float32)
+        info["bytes"] = y.nbytes
+
+    return y, sr
+
+
+# Containers whose frame count libsndfile reports exactly
+STREAMABLE_FORMATS = ("WAV", "WAVEX", "RF64", "W64", "FLAC", "AIFF")
+DECODE_BLOCK_SIZE = 65536
+
+
+def decode_to_npy(path, npy_path, sr=44100, mono=True, quality=None):
+    """
+    decode() straight into an .npy file. Inputs that need no resampling
+    and whose length is known up front stream through in blocks, so
+    memory stays flat for hour-long files; the rest decode in memory.
+    """
+    try:
+        f = sf.SoundFile(path)
+    except RuntimeError:
+        f = None
+
+    if f is None or f.format not in STREAMABLE_FORMATS or (sr is not None and f.samplerate != sr):
+        if f is not None:
+            f.close()
+        y, sr = decode(path, sr=sr, mono=mono, quality=quality)
+        np.save(npy_path, y)
+        return sr
+
+    with f, stage("decode") as info:
+        single = mono or f.channels == 1
+        shape = (f.frames,) if single else (f.channels, f.frames)
+        out = np.lib.format.open_memmap(npy_path, mode="w+", dtype=np.float32, shape=shape)
+
+        pos = 0
+        for block in f.blocks(DECODE_BLOCK_SIZE, dtype="float32", always_2d=True):
+            n = len(block)
+            if single:
+                out[pos:pos + n] = block.mean(axis=1)
+            else:
+                out[:, pos:pos + n] = block.T
+            pos += n
+
+        out.flush()
+        info["bytes"] = out.nbytes
+        del out
+
+    return f.samplerate
+
+
+# -------------------------------------------------------------
+# OUTPUT FORMATS
+# -------------------------------------------------------------
+# Handlers produce WAV bytes, a rendered WAV file (the block-streamed
+# chains) or their float buffer as (y, sr) (the in-memory chains); the
+# response layer encodes it once into whatever the client asked for
+# (output_format param or Accept header). Lossy codecs go through
+# libsndfile as well, so there is no ffmpeg subprocess on the way out,
+# float buffers are encoded directly and files block by block.
+OUTPUT_FORMATS = {
+    "wav": {"ext": ".wav", "mimetype": "audio/wav", "format": "WAV",
+            "subtypes": {16: "PCM_16", 24: "PCM_24", 32: "FLOAT"}},
+    "flac": {"ext": ".flac", "mimetype": "audio/flac", "format": "FLAC",
+             "subtypes": {16: "PCM_16", 24: "PCM_24"}},
+    # compression: libsndfile level, 0 = highest bitrate … 1 = lowest
+    "opus": {"ext": ".opus", "mimetype": "audio/ogg", "format": "OGG",
+             "subtype": "OPUS", "samplerate": 48000,
+             "compression": float(os.environ.get("OPUS_COMPRESSION", 0.8)),   # ~128 kbps VBR
+             "bitrate_mode": None},
+    "mp3": {"ext": ".mp3", "mimetype": "audio/mpeg", "format": "MP3",
+            "subtype": "MPEG_LAYER_III",
+            "compression": float(os.environ.get("MP3_COMPRESSION", 0.4)),    # 192 kbps CBR
+            "bitrate_mode": "CONSTANT"},
+}
+
+ACCEPT_TYPES = {
+    "audio/wav": "wav", "audio/wave": "wav", "audio/x-wav": "wav",
+    "audio/flac": "flac", "audio/x-flac": "flac",
+    "audio/ogg": "opus", "audio/opus": "opus",
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+}
+
+DITHER_MODES = ("tpdf", "none")
+
+DEFAULT_OUTPUT = {"format": "wav", "bit_depth": None, "dither": "tpdf"}
+
+
+def output_options(fmt=None, bit_depth=None, dither=None):
+    """Validated {"format", "bit_depth", "dither"}; raises ValueError."""
+    fmt = (fmt or "wav").lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"output_format must be one of {sorted(OUTPUT_FORMATS)}")
+
+    if bit_depth is not None:
+        subtypes = OUTPUT_FORMATS[fmt].get("subtypes")
+        try:
+            bit_depth = int(bit_depth)
+        except (TypeError, ValueError):
+            raise ValueError("bit_depth must be an integer")
+        if subtypes is None:
+            raise ValueError(f"bit_depth is not supported for {fmt}")
+        if bit_depth not in subtypes:
+            raise ValueError(f"bit_depth for {fmt} must be one of {sorted(subtypes)}")
+
+    dither = (dither or "tpdf").lower()
+    if dither not in DITHER_MODES:
+        raise ValueError(f"dither must be one of {list(DITHER_MODES)}")
+
+    return {"format": fmt, "bit_depth": bit_depth, "dither": dither}
+
+
+def negotiate_format(accept):
+    """First audio type in an Accept header we can produce, else None."""
+    if not accept:
+        return None
+    for part in accept.split(","):
+        mimetype = part.split(";")[0].strip().lower()
+        if mimetype in ACCEPT_TYPES:
+            return ACCEPT_TYPES[mimetype]
+    return None
+
+
+# -------------------------------------------------------------
+# ENCODE
+# -------------------------------------------------------------
+def _quantize(y, bits, dither, seed=0):
+    """
+    Float → int PCM with optional TPDF dither (±1 LSB triangular).
+    24-bit samples are returned left-aligned in int32, as libsndfile
+    expects for PCM_24.
+    """
+    scale = 2 ** (bits - 1)
+    q = y.astype(np.float64) * (scale - 1)
+    if dither == "tpdf":
+        rng = np.random.default_rng(seed)
+        q += rng.random(q.shape) - rng.random(q.shape)
+    q = np.clip(np.round(q), -scale, scale - 1)
+
+    if bits == 16:
+        return q.astype(np.int16)
+    return q.astype(np.int32) << (32 - bits)
+
+
+def encode_blocks(blocks, sr, channels, target, fmt="wav", bit_depth=None, dither="tpdf"):
+    """
+    Block stream (samples on axis 0) → target (path or file object),
+    encoded as it arrives, so memory stays at a block whatever the
+    length. bit_depth defaults to 16 for wav/flac; lossy formats ignore it.
+    """
+    spec = OUTPUT_FORMATS[fmt]
+    resampler = None
+
+    if "subtypes" in spec:
+        bits = bit_depth or 16
+        f = sf.SoundFile(target, "w", samplerate=sr, channels=channels,
+                         subtype=spec["subtypes"][bits], format=spec["format"])
+
+        def prepare(block, i):
+            # a different dither sequence per block, so the noise never repeats
+            return block if bits == 32 else _quantize(block, bits, dither, seed=i)
+    else:
+        rate = spec.get("samplerate", sr)
+        if rate != sr:
+            resampler = Resampler(sr, rate)
+        f = sf.SoundFile(target, "w", samplerate=rate, channels=channels,
+                         subtype=spec["subtype"], format=spec["format"],
+                         compression_level=spec["compression"], bitrate_mode=spec["bitrate_mode"])
+
+        def prepare(block, i):
+            if resampler is not None:
+                block = resampler(block)
+            return np.clip(block, -1.0, 1.0)
+
+    with stage("encode"), f:
+        for i, block in enumerate(blocks):
+            block = prepare(np.asarray(block, dtype=np.float32), i)
+            if len(block):
+                f.write(block)
+        tail = resampler.flush() if resampler is not None else ()
+        if len(tail):
+            f.write(np.clip(tail, -1.0, 1.0))
+
+
+def encode(y, sr, fmt="wav", bit_depth=None, dither="tpdf"):
+    """
+    y: (samples,) or (samples, channels) float → encoded bytes.
+    bit_depth defaults to 16 for wav/flac; lossy formats ignore it.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    buf = io.BytesIO()
+    encode_blocks([y], sr, 1 if y.ndim == 1 else y.shape[1], buf, fmt, bit_depth, dither)
+    return buf.getvalue()
+
+
+def transcode(audio, options=None):
+    """
+    Handler output → (encoded, ext, mimetype) for the requested options.
+    audio: a (y, sr) float buffer (→ bytes, one encode, no WAV round
+    trip), WAV bytes (→ bytes), or the path of a rendered WAV file
+    (→ path of a scratch file, encoded block by block and never read
+    whole). Plain WAV requests for bytes and files pass through untouched.
+    """
+    options = options or DEFAULT_OUTPUT
+    spec = OUTPUT_FORMATS[options["format"]]
+    if isinstance(audio, tuple):
+        y, sr = audio
+        raw = encode(y, sr, options["format"], options["bit_depth"], options["dither"])
+        return raw, spec["ext"], spec["mimetype"]
+
+    if options["format"] == "wav" and options["bit_depth"] is None:
+        return audio, spec["ext"], spec["mimetype"]
+
+    if isinstance(audio, str):
+        out_path = scratch_path(spec["ext"])
+        with sf.SoundFile(audio) as f:
+            encode_blocks(f.blocks(DECODE_BLOCK_SIZE, dtype="float32"), f.samplerate, f.channels,
+                          out_path, options["format"], options["bit_depth"], options["dither"])
+        return out_path, spec["ext"], spec["mimetype"]
+
+    y, sr = sf.read(io.BytesIO(audio), dtype="float32")
+    raw = encode(y, sr, options["format"], options["bit_depth"], options["dither"])
+    return raw, spec["ext"], spec["mimetype"]
+
+
+def publish_audio(audio, options=None):
+    """
+    transcode() + publish; returns the /files name. A rendered file that
+    passes through untouched is shared (result cache, coalesced
+    callers), so it is copied, never moved.
+    """
+    encoded, ext, _ = transcode(audio, options)
+    if isinstance(encoded, str):
+        with stage("write", os.path.getsize(encoded)):
+            return publish_file(encoded, ext, copy=encoded == audio)
+    with stage("write", len(encoded)):
+        return publish_bytes(encoded, ext)
@@ -1,6 +1,7 @@
 import numpy as np
 import soundfile as sf
-import tempfile
+
+from scratch_service.scratch import scratch_path
 
 def auto_mix(stem_paths):
     mix = None
@@ -16,7 +17,7 @@ def auto_mix(stem_paths):
 
     mix = mix / max(np.abs(mix))
 
-    out = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    sf.write(out.name, mix, sr)
+    out = scratch_path(".wav")
+    sf.write(out, mix, sr)
 
-    return open(out.name, "rb").read()
+    return open(out, "rb").read()
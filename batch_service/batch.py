@@ -0,0 +1,254 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from loader_service.lazy_loader import lazy
+from fetch_service.fetcher import fetch, fetch_info, FETCH_CONCURRENCY
+from job_service.job_queue import map_jobs
+from scratch_service.scratch import publish_file
+from audio_io_service.audio_io import publish_audio
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 32))
+
+REQUIRED = object()
+
+
+def _flag(value):
+    if isinstance(value, str):
+        return value.lower() in ["1", "true", "yes", "y", "hq"]
+    return bool(value)
+
+
+def _master_hq(preset):
+    # same presets run_master_ai routes to its HQ chain
+    return preset.lower() in ["hq", "librosa", "true", "1", "master"]
+
+
+def _steps(value):
+    if not isinstance(value, (list, str)):
+        raise ValueError("must be a list")
+    return value
+
+
+# op → spec
+#   handler: (name, module, engine) of the lazily imported handler —
+#            resolved in the pool worker; every name here is one app.py
+#            registers with lazy(), so a forked worker gets that same
+#            handler. app.py's safe_not_implemented stubs (analyze_song,
+#            detect_chorus_sections, ...) are deliberately not batchable.
+#   input:   "url" → handler(audio_url, ...), "path" → handler(local_path, ...)
+#   output:  "audio" (handler audio, encoded in the batch's output format),
+#            "file" (path to publish) or "json"
+#   params:  {name: (parser, default)}
+#   decode:  params → sample rate the handler decodes at (None: ffmpeg
+#            reads the file itself), so each input is decoded once up front
+#   mono:    channel layout that decode is loaded with (default True;
+#            the stereo HQ chains load mono=False)
+OPERATIONS = {
+    "pitch": {
+        "handler": ("pitch_shift", "pitch_service.pitch_handler", "ffmpeg"),
+        "input": "url", "output": "audio",
+        "params": {"semitones": (float, REQUIRED)},
+        "decode": lambda p: None,
+    },
+    "timestretch": {
+        "handler": ("time_stretch", "timestretch_service.timestretch_handler", "ffmpeg"),
+        "input": "url", "output": "audio",
+        "params": {"stretch_factor": (float, REQUIRED)},
+        "decode": lambda p: None,
+    },
+    "ghost": {
+        "handler": ("apply_ghost_mode", "ghost_mode_service.ghost_mode_handler", "librosa"),
+        "input": "url", "output": "audio",
+        "params": {"hq": (_flag, False)},
+        "decode": lambda p: 44100 if p["hq"] else None,
+        "mono": False,
+    },
+    "doubler": {
+        "handler": ("vocal_doubler", "doubler_service.doubler_handler", "librosa"),
+        "input": "url", "output": "audio",
+        "params": {"hq": (_flag, False)},
+        "decode": lambda p: 44100 if p["hq"] else None,
+        "mono": False,
+    },
+    "analog_master": {
+        "handler": ("analog_master", "analog_master_service.analog_master_handler", "librosa"),
+        "input": "url", "output": "audio",
+        "params": {"hq": (_flag, False)},
+        "decode": lambda p: 44100 if p["hq"] else None,
+        "mono": False,
+    },
+    "master_ai": {
+        "handler": ("run_master_ai", "master_ai_service.master_ai_handler", "librosa"),
+        "input": "url", "output": "audio",
+        "params": {"preset": (str, "default")},
+        "decode": lambda p: 44100 if _master_hq(p["preset"]) else None,
+        "mono": False,
+    },
+    "mastering": {
+        "handler": ("run_mastering", "mastering_service.mastering_handler", "pyloudnorm"),
+        "input": "url", "output": "audio",
+        "params": {},
+        "decode": lambda p: None,
+    },
+    "pipeline": {
+        "handler": ("run_pipeline", "pipeline_service.pipeline", "librosa"),
+        "input": "url", "output": "audio",
+        "params": {"steps": (_steps, REQUIRED)},
+        "decode": lambda p: 44100,
+        "mono": False,
+    },
+    "midi": {
+        "handler": ("voice_to_midi", "melody_midi_service.melody_midi_handler", "crepe"),
+        "input": "url", "output": "file",
+        "params": {"hq": (_flag, False)},
+        "decode": lambda p: 16000,
+    },
+}
+
+
+# -------------------------------------------------------------
+# VALIDATION
+# -------------------------------------------------------------
+def _parse_item(item):
+    """Returns (op, audio_url, params); raises ValueError."""
+    if not isinstance(item, dict):
+        raise ValueError("expected an object")
+
+    op = item.get("op")
+    if op not in OPERATIONS:
+        raise ValueError(f"unknown op {op!r} (one of {', '.join(OPERATIONS)})")
+
+    url = item.get("audio_url")
+    if not isinstance(url, str) or not url:
+        raise ValueError("missing audio_url")
+
+    spec = OPERATIONS[op]["params"]
+    unknown = set(item) - set(spec) - {"op", "audio_url"}
+    if unknown:
+        raise ValueError(f"unknown params {', '.join(sorted(unknown))}")
+
+    params = {}
+    for name, (parse, default) in spec.items():
+        if name not in item:
+            if default is REQUIRED:
+                raise ValueError(f"missing {name}")
+            params[name] = default
+            continue
+        try:
+            params[name] = parse(item[name])
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"invalid {name}: {e}")
+
+    return op, url, params
+
+
+# -------------------------------------------------------------
+# POOL WORKER SIDE (module-level so they pickle)
+# -------------------------------------------------------------
+def _decode_input(path, digest, sr, mono):
+    """Warms the shared decoded-audio cache; the array stays on disk."""
+    load_audio_file = lazy("load_audio_file", "fetch_service.audio_cache", engine="librosa")
+    load_audio_file(path, sr=sr, mono=mono, digest=digest)
+
+
+def _run_item(op, url, params, output=None):
+    spec = OPERATIONS[op]
+    name, module_path, engine = spec["handler"]
+    handler = lazy(name, module_path, engine=engine)
+
+    source = fetch(url) if spec["input"] == "path" else url
+    result = handler(source, **params)
+
+    if spec["output"] == "audio":
+        return {"file": publish_audio(result, output)}
+    if spec["output"] == "file":
+        return {"file": publish_file(result)}
+    return {"result": result}
+
+
+# -------------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------------
+def _resolve(urls):
+    """Downloads each distinct url once; {url: (path, digest) | Exception}."""
+    def _one(url):
+        try:
+            return fetch_info(url)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(FETCH_CONCURRENCY, len(urls)))) as pool:
+        return dict(zip(urls, pool.map(_one, urls)))
+
+
+def run_batch(items, output=None):
+    """
+    items: [{"op": "pitch", "audio_url": ..., "semitones": 2}, ...]
+    output: audio_io.output_options() for every audio result (the
+    request's negotiated format); None → WAV.
+
+    1. validates every item (bad items become per-item errors)
+    2. downloads each distinct audio_url once
+    3. decodes each distinct (content, sample rate, layout) once, in the pool
+    4. runs all items across the pool
+
+    Returns one dict per item, in order:
+        {"index", "op", "status": "ok", "file" | "result"}
+        {"index", "op", "status": "error", "error"}
+    Raises ValueError only when items itself is unusable.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError("items must be a non-empty list")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"at most {BATCH_MAX_ITEMS} items per batch")
+
+    results = []
+    planned = []
+
+    for index, item in enumerate(items):
+        op = item.get("op") if isinstance(item, dict) else None
+        entry = {"index": index, "op": op}
+        results.append(entry)
+        try:
+            planned.append((entry, *_parse_item(item)))
+        except ValueError as e:
+            entry.update(status="error", error=str(e))
+
+    # Download each distinct input once
+    resolved = _resolve(sorted({url for _, _, url, _ in planned}))
+
+    runnable = []
+    decodes = {}
+    for entry, op, url, params in planned:
+        source = resolved[url]
+        if isinstance(source, Exception):
+            entry.update(status="error", error=f"could not fetch audio_url: {source}")
+            continue
+
+        path, digest = source
+        sr = OPERATIONS[op]["decode"](params)
+        if sr is not None:
+            decodes[(digest, sr, OPERATIONS[op].get("mono", True))] = path
+        runnable.append((entry, op, url, params))
+
+    # Decode each distinct (content, rate, layout) once; failures surface per item below
+    map_jobs("batch_decode", [
+        (_decode_input, (path, digest, sr, mono), {})
+        for (digest, sr, mono), path in decodes.items()
+    ])
+
+    outcomes = map_jobs("batch", [
+        (_run_item, (op, url, params, output), {})
+        for _, op, url, params in runnable
+    ])
+
+    for (entry, _, _, _), (result, error) in zip(runnable, outcomes):
+        if error is not None:
+            entry.update(status="error", error=error)
+        else:
+            entry.update(status="ok", **result)
+
+    return results
@@ -0,0 +1,58 @@
+"""
+Compares two benchmark JSON files:
+
+    python -m benchmarks.compare old.json new.json
+
+Prints wall time and peak RSS side by side with the new/old ratio
+for every (handler, mode, fixture) present in both runs.
+"""
+import sys
+import json
+
+
+def _load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return {(r["handler"], r["mode"], r["fixture"]): r for r in report["results"]}
+
+
+def _ratio(old, new):
+    if old is None or new is None or old == 0:
+        return "—"
+    return f"{new / old:.2f}x"
+
+
+def compare(old_path, new_path):
+    old = _load(old_path)
+    new = _load(new_path)
+
+    header = f"{'case':<52} {'wall old':>9} {'wall new':>9} {'ratio':>7} {'rss old':>8} {'rss new':>8} {'ratio':>7}"
+    print(header)
+    print("-" * len(header))
+
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        label = "{}/{} {}".format(*key)
+
+        if "error" in a or "error" in b:
+            status = "error" if "error" in b else "fixed"
+            print(f"{label:<52} {status}")
+            continue
+
+        print(
+            f"{label:<52} {a['wall_seconds']:>9.2f} {b['wall_seconds']:>9.2f} "
+            f"{_ratio(a['wall_seconds'], b['wall_seconds']):>7} "
+            f"{a['peak_rss_mb']:>8.0f} {b['peak_rss_mb']:>8.0f} "
+            f"{_ratio(a['peak_rss_mb'], b['peak_rss_mb']):>7}"
+        )
+
+    for key in sorted(set(old) ^ set(new)):
+        where = "old" if key in old else "new"
+        print("{}/{} {}".format(*key) + f"  (only in {where})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python -m benchmarks.compare OLD.json NEW.json")
+        sys.exit(2)
+    compare(sys.argv[1], sys.argv[2])
@@ -0,0 +1,125 @@
+import os
+import numpy as np
+import soundfile as sf
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+SAMPLE_RATE = 44100
+DURATIONS = {"30s": 30, "3m": 180, "10m": 600}
+CHANNELS = {"mono": 1, "stereo": 2}
+KINDS = ("vocal", "mix")
+
+# Generated in blocks so a 10 min stereo fixture never sits in memory
+BLOCK_SECONDS = 10
+
+# C major-ish melody (Hz) the synthetic vocal glides between
+MELODY = (220.0, 246.9, 261.6, 293.7, 329.6, 293.7, 261.6, 246.9)
+NOTE_SECONDS = 0.5
+TEMPO_BPM = 120
+
+
+def fixture_name(kind, duration_key, channels_key):
+    return f"{kind}_{duration_key}_{channels_key}.wav"
+
+
+# -------------------------------------------------------------
+# SIGNALS
+# -------------------------------------------------------------
+def _f0(t):
+    """Melody with 40 ms glides between notes + 5.5 Hz vibrato."""
+    idx = np.floor(t / NOTE_SECONDS).astype(np.int64)
+    here = np.take(MELODY, idx % len(MELODY))
+    prev = np.take(MELODY, (idx - 1) % len(MELODY))
+    glide = np.clip((t - idx * NOTE_SECONDS) / 0.04, 0.0, 1.0)
+    f = prev + (here - prev) * glide
+    return f * (1.0 + 0.012 * np.sin(2 * np.pi * 5.5 * t))
+
+
+def _vocal_block(t, phase, rng):
+    """Harmonic chirp with syllable gating and breath noise."""
+    inc = 2 * np.pi * _f0(t) / SAMPLE_RATE
+    ph = phase + np.cumsum(inc)
+
+    voice = np.zeros_like(t)
+    for k in range(1, 7):
+        voice += np.sin(k * ph) / k
+
+    syllables = 0.55 + 0.45 * np.sin(2 * np.pi * 4.0 * t) ** 2
+    breath = rng.standard_normal(len(t)) * 0.02
+    return 0.25 * voice * syllables + breath, ph[-1]
+
+
+def _drums_block(t, rng):
+    """Kick on every beat, noise hi-hat on off-beats."""
+    beat = 60.0 / TEMPO_BPM
+    since_beat = np.mod(t, beat)
+    kick = np.sin(2 * np.pi * 55.0 * since_beat) * np.exp(-since_beat * 18.0)
+
+    since_hat = np.mod(t + beat / 2, beat)
+    hat = rng.standard_normal(len(t)) * np.exp(-since_hat * 60.0)
+    return 0.5 * kick + 0.08 * hat
+
+
+def _bed_block(t):
+    """Bass + pad; harmony changes every 4 bars so sections exist."""
+    bar = 4 * 60.0 / TEMPO_BPM
+    section = np.floor(t / (4 * bar)).astype(np.int64) % 2
+    root = np.where(section == 0, 55.0, 73.4)
+    bass = 0.2 * np.sin(2 * np.pi * root * t)
+    pad = sum(np.sin(2 * np.pi * root * m * t) for m in (4, 5, 6)) * 0.04
+    return bass + pad
+
+
+# -------------------------------------------------------------
+# WRITER
+# -------------------------------------------------------------
+def write_fixture(path, kind, seconds, channels, seed=0):
+    """Streams a deterministic synthetic fixture to a 16-bit wav."""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * SAMPLE_RATE)
+    block = BLOCK_SECONDS * SAMPLE_RATE
+    phases = [0.0] * channels
+
+    with sf.SoundFile(path, "w", SAMPLE_RATE, channels, subtype="PCM_16") as f:
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            t = (start + np.arange(n)) / SAMPLE_RATE
+
+            out = np.zeros((n, channels), dtype=np.float64)
+            for ch in range(channels):
+                # Slight detune per channel so L/R are not identical
+                t_ch = t * (1.0 + 0.0007 * ch)
+                vocal, phases[ch] = _vocal_block(t_ch, phases[ch], rng)
+                if kind == "mix":
+                    out[:, ch] = 0.6 * vocal + _drums_block(t, rng) + _bed_block(t)
+                else:
+                    out[:, ch] = vocal
+
+            f.write(np.clip(out * 0.8, -1.0, 1.0).astype(np.float32))
+
+
+def ensure_fixtures(directory, kinds=KINDS, durations=DURATIONS, channels=CHANNELS):
+    """
+    Generates any missing fixtures into directory.
+    Returns {name: {"path", "kind", "seconds", "channels"}}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fixtures = {}
+
+    for kind in kinds:
+        for d_key in durations:
+            for c_key in channels:
+                name = fixture_name(kind, d_key, c_key)
+                path = os.path.join(directory, name)
+                if not os.path.exists(path):
+                    print(f"[bench] generating {name}")
+                    write_fixture(path, kind, DURATIONS[d_key], CHANNELS[c_key])
+                fixtures[name] = {
+                    "path": path,
+                    "kind": kind,
+                    "seconds": DURATIONS[d_key],
+                    "channels": CHANNELS[c_key],
+                }
+
+    return fixtures
@@ -0,0 +1,284 @@
+"""
+Offline benchmark suite for the DSP handlers.
+
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --handlers master_ai,vocal_doubler --durations 30s --repeat 3
+
+Synthetic fixtures are served from a local HTTP server so URL-based
+handlers run unmodified. Every (handler, mode, fixture) runs in its own
+spawned process with empty fetch / scratch dirs, so peak RSS belongs to
+that case alone and the first run includes download + decode. Results
+(wall time, real-time factor, peak RSS, per-stage seconds) go to JSON;
+compare two runs with benchmarks.compare.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+
+from benchmarks.fixtures import DURATIONS, CHANNELS, ensure_fixtures, fixture_name
+from benchmarks.http_server import serve_directory
+
+# -------------------------------------------------------------
+# CASES
+# -------------------------------------------------------------
+# arg: "url"   → handler(audio_url)
+#      "path"  → handler(local_path)
+#      "array" → handler(mono float32 array, sr)
+#      "frames" → handler(float32 (samples, channels) array as decoded, sr)
+CASES = [
+    {"handler": "master_ai", "mode": "fast", "module": "master_ai_service.master_ai_handler", "attr": "_master_fast", "arg": "url", "kind": "mix"},
+    {"handler": "master_ai", "mode": "hq", "module": "master_ai_service.master_ai_handler", "attr": "_master_hq", "arg": "url", "kind": "mix"},
+    {"handler": "analog_master", "mode": "fast", "module": "analog_master_service.analog_master_handler", "attr": "_analog_fast", "arg": "url", "kind": "mix"},
+    {"handler": "analog_master", "mode": "hq", "module": "analog_master_service.analog_master_handler", "attr": "_analog_hq", "arg": "url", "kind": "mix"},
+    {"handler": "ghost_mode", "mode": "fast", "module": "ghost_mode_service.ghost_mode_handler", "attr": "_ghost_fast", "arg": "url", "kind": "vocal"},
+    {"handler": "ghost_mode", "mode": "hq", "module": "ghost_mode_service.ghost_mode_handler", "attr": "_ghost_hq", "arg": "url", "kind": "vocal"},
+    {"handler": "ghost_mode_array", "mode": "hq", "module": "ghost_mode_service.ghost_mode_handler", "attr": "ghost_mode_array", "arg": "frames", "kind": "vocal"},
+    {"handler": "vocal_doubler", "mode": "fast", "module": "doubler_service.doubler_handler", "attr": "_doubler_fast", "arg": "url", "kind": "vocal"},
+    {"handler": "vocal_doubler", "mode": "hq", "module": "doubler_service.doubler_handler", "attr": "_doubler_hq", "arg": "url", "kind": "vocal"},
+    {"handler": "convolution_reverb", "mode": "hq", "module": "reverb_service.impulse_reverb", "attr": "apply_convolution_reverb", "arg": "array", "kind": "mix"},
+    {"handler": "demucs_reverb", "mode": "hq", "module": "demucs_service.demucs_reverb_hq", "attr": "apply_demucs_hq_reverb", "arg": "url", "kind": "mix"},
+    {"handler": "chorus_detector", "mode": "hq", "module": "chorus_service.chorus_detector", "attr": "detect_chorus_sections", "arg": "path", "kind": "mix"},
+    {"handler": "song_analyzer", "mode": "hq", "module": "analysis_service.song_analyzer", "attr": "analyze_song", "arg": "path", "kind": "mix"},
+    {"handler": "detect_onsets", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "detect_onsets", "arg": "array", "kind": "mix"},
+    {"handler": "estimate_tempo", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "estimate_tempo", "arg": "array", "kind": "mix"},
+    {"handler": "compute_energy_map", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "compute_energy_map", "arg": "array", "kind": "mix"},
+    {"handler": "detect_silence", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "detect_silence", "arg": "array", "kind": "mix"},
+    {"handler": "slice_by_onsets", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "slice_by_onsets", "arg": "array", "kind": "mix"},
+    {"handler": "detect_transients", "mode": "fast", "module": "dsp_service.dsp_utils", "attr": "detect_transients", "arg": "array", "kind": "mix"},
+]
+
+DEFAULT_FIXTURES_DIR = os.path.join(tempfile.gettempdir(), "bench_fixtures")
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+# -------------------------------------------------------------
+# CHILD PROCESS
+# -------------------------------------------------------------
+def _peak_rss_bytes():
+    import resource
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return max(own, children)
+
+
+def _run_case(case, fixture, url, repeat, conn):
+    """Runs in a fresh spawned process; sends one result dict back."""
+    try:
+        import importlib
+        import soundfile as sf
+        from metrics_service import metrics
+        from scratch_service.scratch import request_scope
+
+        fn = getattr(importlib.import_module(case["module"]), case["attr"])
+
+        if case["arg"] == "url":
+            args = (url,)
+        elif case["arg"] == "path":
+            args = (fixture["path"],)
+        else:
+            audio, sr = sf.read(fixture["path"], dtype="float32")
+            if audio.ndim > 1 and case["arg"] == "array":
+                audio = audio.mean(axis=1)
+            args = (audio, sr)
+
+        import_rss = _peak_rss_bytes()
+        runs = []
+
+        for _ in range(repeat):
+            metrics.start_request(f"bench:{case['handler']}", case["mode"])
+            metrics.start_timeline()
+
+            start = time.perf_counter()
+            with request_scope():
+                fn(*args)
+            wall = time.perf_counter() - start
+
+            stages = {}
+            for entry in metrics.stop_timeline():
+                stages[entry["stage"]] = stages.get(entry["stage"], 0.0) + entry["seconds"]
+            metrics.end_request()
+
+            runs.append({"wall_seconds": round(wall, 4), "stages": stages})
+
+        conn.send({
+            "runs": runs,
+            "import_rss_mb": round(import_rss / 2**20, 1),
+            "peak_rss_mb": round(_peak_rss_bytes() / 2**20, 1),
+        })
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+# -------------------------------------------------------------
+# PARENT
+# -------------------------------------------------------------
+def run_case(case, fixture, url, repeat, timeout):
+    """Spawns one isolated process for the case; returns its result row."""
+    ctx = multiprocessing.get_context("spawn")
+    recv, send = ctx.Pipe(duplex=False)
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    env_backup = {k: os.environ.get(k) for k in ("FETCH_CACHE_DIR", "SCRATCH_ROOT", "PUBLISH_DIR")}
+    os.environ["FETCH_CACHE_DIR"] = os.path.join(work_dir, "fetch")
+    os.environ["SCRATCH_ROOT"] = os.path.join(work_dir, "scratch")
+    os.environ["PUBLISH_DIR"] = os.path.join(work_dir, "published")
+
+    try:
+        proc = ctx.Process(target=_run_case, args=(case, fixture, url, repeat, send))
+        proc.start()
+        send.close()
+
+        if recv.poll(timeout):
+            try:
+                outcome = recv.recv()
+            except EOFError:
+                outcome = None
+        else:
+            proc.terminate()
+            outcome = {"error": f"timeout after {timeout}s"}
+        proc.join()
+
+        if outcome is None:
+            outcome = {"error": f"worker exited with code {proc.exitcode}"}
+    finally:
+        for key, value in env_backup.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    row = {
+        "handler": case["handler"],
+        "mode": case["mode"],
+        "fixture": os.path.basename(fixture["path"]),
+        "audio_seconds": fixture["seconds"],
+        "channels": fixture["channels"],
+        "input": case["arg"],
+    }
+
+    if "error" in outcome:
+        row["error"] = outcome["error"]
+        return row
+
+    runs = outcome["runs"]
+    cold = runs[0]["wall_seconds"]
+    row.update({
+        "wall_seconds": cold,
+        "rtf": round(cold / fixture["seconds"], 5),
+        "peak_rss_mb": outcome["peak_rss_mb"],
+        "import_rss_mb": outcome["import_rss_mb"],
+        "stages": runs[0]["stages"],
+    })
+    if len(runs) > 1:
+        warm = min(r["wall_seconds"] for r in runs[1:])
+        row["warm_wall_seconds"] = warm
+        row["warm_rtf"] = round(warm / fixture["seconds"], 5)
+    return row
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        )
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _split(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DSP handlers on synthetic fixtures.")
+    parser.add_argument("--handlers", help="comma-separated handler names (default: all)")
+    parser.add_argument("--modes", help="comma-separated: fast,hq (default: both)")
+    parser.add_argument("--durations", default=",".join(DURATIONS), help="comma-separated: " + ",".join(DURATIONS))
+    parser.add_argument("--channels", default=",".join(CHANNELS), help="comma-separated: " + ",".join(CHANNELS))
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; runs after the first are reported as warm")
+    parser.add_argument("--timeout", type=float, default=1800, help="seconds before a case is killed")
+    parser.add_argument("--fixtures-dir", default=DEFAULT_FIXTURES_DIR)
+    parser.add_argument("--out", help="output JSON path (default: benchmarks/results/bench_<time>.json)")
+    args = parser.parse_args(argv)
+
+    handlers = _split(args.handlers)
+    modes = _split(args.modes)
+    durations = _split(args.durations)
+    channels = _split(args.channels)
+
+    for d in durations:
+        if d not in DURATIONS:
+            parser.error(f"unknown duration {d!r}")
+    for c in channels:
+        if c not in CHANNELS:
+            parser.error(f"unknown channel layout {c!r}")
+
+    cases = [
+        c for c in CASES
+        if (handlers is None or c["handler"] in handlers)
+        and (modes is None or c["mode"] in modes)
+    ]
+    if not cases:
+        parser.error("no benchmark cases selected")
+
+    kinds = sorted({c["kind"] for c in cases})
+    fixtures = ensure_fixtures(
+        args.fixtures_dir,
+        kinds=kinds,
+        durations={d: DURATIONS[d] for d in durations},
+        channels={c: CHANNELS[c] for c in channels}
+    )
+
+    results = []
+    with serve_directory(args.fixtures_dir) as base_url:
+        for case in cases:
+            for d in durations:
+                for c in channels:
+                    name = fixture_name(case["kind"], d, c)
+                    row = run_case(case, fixtures[name], f"{base_url}/{name}", args.repeat, args.timeout)
+                    results.append(row)
+
+                    label = f"{case['handler']}/{case['mode']} {name}"
+                    if "error" in row:
+                        print(f"[bench] {label}: ERROR {row['error']}")
+                    else:
+                        print(f"[bench] {label}: {row['wall_seconds']:.2f}s "
+                              f"rtf={row['rtf']:.4f} peak_rss={row['peak_rss_mb']}MB")
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    out = args.out or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("bench_%Y%m%d_%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[bench] wrote {out}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,10 @@ import librosa
 import librosa.display
 import scipy.signal as signal
 
+from fetch_service.audio_cache import load_audio_file
+from fetch_service.result_cache import cached_result
+
+@cached_result("detect_chorus_sections", version=1, source="path")
 def detect_chorus_sections(audio_path):
     """
     Modern high-accuracy chorus detector.
@@ -21,7 +25,7 @@ def detect_chorus_sections(audio_path):
     # ---------------------------------------------------------
     # Load audio
     # ---------------------------------------------------------
-    y, sr = librosa.load(audio_path, sr=44100)
+    y, sr = load_audio_file(audio_path, sr=44100)
 
     # Harmonic + percussive split (chorus = harmonic-heavy)
     harmonic, percussive = librosa.effects.hpss(y)
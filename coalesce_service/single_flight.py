@@ -0,0 +1,81 @@
+import json
+import hashlib
+import threading
+
+from metrics_service.metrics import inc
+
+# -------------------------------------------------------------
+# IN-FLIGHT CALLS
+# -------------------------------------------------------------
+# Identical concurrent requests (retries, several users opening the
+# same song) attach to the call already running instead of starting
+# their own. Coalescing is per process: with several gunicorn workers
+# two identical requests can still land on different workers.
+
+_lock = threading.Lock()
+_inflight = {}
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _normalize(value):
+    """Makes equal params serialize equally (1 == 1.0, dict order)."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return str(value)
+
+
+def flight_key(operation, digest, params=None):
+    """Key for (operation, input content sha256, normalized params)."""
+    raw = json.dumps([operation, digest, _normalize(params or {})], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def single_flight(key, fn, *args, operation="", **kwargs):
+    """
+    Runs fn(*args, **kwargs) unless an identical call (same key) is
+    already running, in which case waits for it and returns its result
+    (or raises its exception). Results are shared, not copied — callers
+    must not mutate them.
+    """
+    with _lock:
+        call = _inflight.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _inflight[key] = call
+
+    if not leader:
+        inc("coalesced_requests", help_text="Requests served by an identical in-flight call",
+            operation=operation)
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn(*args, **kwargs)
+        return call.result
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        call.done.set()
+
+
+def inflight_count():
+    with _lock:
+        return len(_inflight)
@@ -1,8 +1,10 @@
 import os
-import tempfile
 import subprocess
-import requests
-import uuid
+
+from job_service.job_queue import report_progress
+from fetch_service.fetcher import fetch
+from scratch_service.scratch import scratch_dir, publish_file, published_path
+from metrics_service.metrics import stage
 
 def run_demucs(audio_url):
     """
@@ -15,14 +17,11 @@ def run_demucs(audio_url):
     """
 
     # Download audio
-    input_path = tempfile.mktemp(suffix=".wav")
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    report_progress(0.1)
 
-    # Output stem folder
-    prefix = uuid.uuid4().hex
-    output_dir = f"/tmp/demucs_{prefix}"
-    os.makedirs(output_dir, exist_ok=True)
+    # Output stem folder (request scratch, removed afterwards)
+    output_dir = scratch_dir("demucs_")
 
     # Run Demucs
     cmd = [
@@ -30,7 +29,9 @@ def run_demucs(audio_url):
         "-o", output_dir,
         input_path
     ]
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with stage("separate"):
+        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    report_progress(0.9)
 
     # Path to stems
     stems_dir = os.path.join(output_dir, "htdemucs", os.path.basename(input_path).split(".")[0])
@@ -40,8 +41,7 @@ def run_demucs(audio_url):
         if stem_file.endswith(".wav"):
             src = os.path.join(stems_dir, stem_file)
             name = stem_file.replace(".wav", "")
-            dest = f"/tmp/{prefix}_{stem_file}"
-            os.rename(src, dest)
+            dest = published_path(publish_file(src))
             stems.append({"name": name, "path": dest})
 
     return stems
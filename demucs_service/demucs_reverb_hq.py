@@ -1,41 +1,37 @@
-import tempfile
-import requests
-import librosa
 import numpy as np
 import soundfile as sf
 import scipy.signal as signal
 
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from metrics_service.metrics import lap
+from dsp_service.filters import bandpass
+
 
 def apply_demucs_hq_reverb(audio_url, reverb_amount=0.8):
     """
     HQ Cinematic Reverb and Spatial Enhancement for DEMUCS stems.
+    Works on (samples, channels) with every stage vectorized over the
+    channels, so stereo stems keep their image.
     """
     # --------------------------------------------------------
-    # Load stem from URL
+    # Load stem from URL (channels kept)
     # --------------------------------------------------------
-    input_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
 
-    y, sr = librosa.load(input_path, sr=44100)
-    dry = y.astype(np.float32)
+    # (channels, samples) → (samples, channels); mono stems get two
+    # identical channels so the output is always stereo (mid/side below)
+    dry = np.array(y[:2].T if y.ndim > 1 else np.stack([y, y]).T, dtype=np.float32)
 
-    # Ensure stereo output even for mono stems
-    if len(dry.shape) == 1:
-        dry = np.stack([dry, dry], axis=1)
 
-    left = dry[:, 0]
-    right = dry[:, 1]
+    def delayed(x, samples):
+        return np.pad(x, ((samples, 0), (0, 0)))[:len(x)]
 
 
     # --------------------------------------------------------
     # 1. Pre-delay (10–20 ms)
     # --------------------------------------------------------
-    predelay_samples = int(sr * 0.015)
-    left_pre = np.pad(left, (predelay_samples, 0))[:len(left)]
-    right_pre = np.pad(right, (predelay_samples, 0))[:len(right)]
-    predelayed = np.stack([left_pre, right_pre], axis=1)
+    predelayed = delayed(dry, int(sr * 0.015))
 
 
     # --------------------------------------------------------
@@ -46,31 +42,24 @@ def apply_demucs_hq_reverb(audio_url, reverb_amount=0.8):
         gains = [0.22, 0.18, 0.14, 0.10]
         out = x.copy()
         for d, g in zip(delays, gains):
-            samples = int(sr * d)
-            out += np.pad(x * g, (samples, 0))[:len(x)]
+            out += delayed(x * g, int(sr * d))
         return out
 
-    er_left = early_reflections(left)
-    er_right = early_reflections(right)
-    early = np.stack([er_left, er_right], axis=1)
+    early = early_reflections(dry)
 
 
     # --------------------------------------------------------
     # 3. Reverb tail convolution with custom impulses
     # --------------------------------------------------------
     tail_impulse = signal.exponential(M=int(sr * 1.5), tau=sr * 0.55, sym=False)
-    tail_left = signal.fftconvolve(left, tail_impulse, mode='same')
-    tail_right = signal.fftconvolve(right, tail_impulse, mode='same')
-    tail = np.stack([tail_left, tail_right], axis=1)
+    tail = signal.fftconvolve(dry, tail_impulse[:, None], mode='same', axes=0)
 
 
     # --------------------------------------------------------
     # 4. High-frequency shimmer boost (10–14 kHz)
     # --------------------------------------------------------
-    shimmer = librosa.effects.bandpass(left, sr=sr, low=9000, high=14000)
-    shimmer = shimmer / max(1e-6, np.max(np.abs(shimmer))) * 0.25
-
-    shimmer_st = np.stack([shimmer, shimmer], axis=1)
+    shimmer_st = bandpass(dry, sr, 9000, 14000)
+    shimmer_st = shimmer_st / max(1e-6, np.max(np.abs(shimmer_st))) * 0.25
 
 
     # --------------------------------------------------------
@@ -108,13 +97,15 @@ def apply_demucs_hq_reverb(audio_url, reverb_amount=0.8):
 
     # Normalize
     mix /= max(1e-6, np.max(np.abs(mix))) * 1.01
+    lap("dsp")
 
 
     # --------------------------------------------------------
     # 8. Save output file
     # --------------------------------------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
+    out_path = scratch_path(".wav")
     sf.write(out_path, mix.astype(np.float32), sr)
+    lap("encode")
 
     with open(out_path, "rb") as f:
         return f.read()
@@ -1,9 +1,13 @@
-import tempfile
-import subprocess
-import requests
 import numpy as np
 import librosa
-import soundfile as sf
+
+from fetch_service.fetcher import fetch
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+from metrics_service.metrics import lap, set_mode
+from dsp_service.filters import bandpass
+from dsp_service.delay_line import modulated_delay
 
 
 # -------------------------------------------------
@@ -13,11 +17,8 @@ def _doubler_fast(audio_url):
     """
     Fast stereo doubler via FFmpeg.
     """
-    input_path = tempfile.mktemp(suffix=".wav")
-    out_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    out_path = scratch_path(".wav")
 
     cmd = [
         "ffmpeg", "-y",
@@ -30,7 +31,7 @@ def _doubler_fast(audio_url):
         out_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd)
     with open(out_path, "rb") as f:
         return f.read()
 
@@ -38,51 +39,52 @@ def _doubler_fast(audio_url):
 # -------------------------------------------------
 # HIGH QUALITY DOUBLER (Librosa)
 # -------------------------------------------------
-def _doubler_hq(audio_url):
+def _side(x, channel):
+    """Left (0) / right (-1) source of a mono or (samples, channels) layer."""
+    return x[:, channel] if x.ndim > 1 else x
+
+
+def vocal_doubler_array(y, sr):
     """
     HQ doubler:
     - micro-pitch drift
     - stereo harmonic widening
     - breath/aeration enhancement
     - frequency-domain chorus
+    Mono or (samples, channels) float32 in → (samples, 2) float32 out
+    (used by /pipeline). Stereo input keeps its image: each side is
+    doubled from its own channel, all layers computed channel-wise.
     """
-    input_path = tempfile.mktemp(suffix=".wav")
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
-
-    y, sr = librosa.load(input_path, sr=44100)
-
     # ---------------------------
     # 1. Create detuned copy
     # ---------------------------
     detune_cents = -15  # very subtle drift
-    y_detuned = librosa.effects.pitch_shift(y, sr=sr, n_steps=detune_cents / 100)
+    y_detuned = librosa.effects.pitch_shift(
+        np.ascontiguousarray(y.T), sr=sr, n_steps=detune_cents / 100
+    ).T
 
     # ---------------------------
     # 2. Chorus via modulated delay
     # ---------------------------
-    t = np.linspace(0, len(y) / sr, len(y))
-    lfo = 0.002 * np.sin(2 * np.pi * 0.8 * t)  # 0.8 Hz modulation
-    chorus = np.zeros_like(y)
-
-    for i in range(len(y)):
-        d = int(sr * lfo[i])
-        if i - d >= 0:
-            chorus[i] = y[i - d]
+    # 2 ms ± 2 ms at 0.8 Hz, fractional (cubic) so the sweep doesn't zipper
+    chorus = modulated_delay(y, sr, base=0.002, depth=0.002, rate_hz=0.8, interpolation="cubic")
 
     # ---------------------------
     # 3. Breath excite layer
     # ---------------------------
-    breath = librosa.effects.preemphasis(y)
-    breath = librosa.effects.bandpass(breath, sr=sr, low=3000, high=8000)
+    breath = librosa.effects.preemphasis(y.T).T
+    breath = bandpass(breath, sr, 3000, 8000)
     if np.max(np.abs(breath)) > 0:
         breath /= np.max(np.abs(breath))
 
     # ---------------------------
     # 4. Stereo widening layer
     # ---------------------------
-    left = y + 0.35 * y_detuned + 0.20 * chorus
-    right = y - 0.35 * y_detuned + 0.20 * chorus + 0.15 * breath
+    left = _side(y, 0) + 0.35 * _side(y_detuned, 0) + 0.20 * _side(chorus, 0)
+    right = (
+        _side(y, -1) - 0.35 * _side(y_detuned, -1) +
+        0.20 * _side(chorus, -1) + 0.15 * _side(breath, -1)
+    )
 
     # Normalize
     max_val = max(np.max(np.abs(left)), np.max(np.abs(right)), 1e-6)
@@ -90,15 +92,18 @@ def _doubler_hq(audio_url):
     right /= max_val
 
     stereo = np.stack([left, right], axis=1)
+    return stereo.astype(np.float32)
 
-    # ---------------------------
-    # Save WAV
-    # ---------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
-    sf.write(out_path, stereo.astype(np.float32), sr)
 
-    with open(out_path, "rb") as f:
-        return f.read()
+def _doubler_hq(audio_url):
+    # channels kept: (channels, samples) → (samples, channels)
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
+
+    stereo = vocal_doubler_array(y.T, sr)
+    lap("dsp")
+
+    # float buffer: the response layer encodes it once, in the requested format
+    return stereo, sr
 
 
 # -------------------------------------------------
@@ -113,6 +118,7 @@ def vocal_doubler(audio_url, hq=False):
         hq = True
 
     if hq:
+        set_mode("hq")
         return _doubler_hq(audio_url)
 
     return _doubler_fast(audio_url)
@@ -0,0 +1,202 @@
+import os
+import warnings
+import numpy as np
+import soundfile as sf
+import scipy.signal as signal
+import pyloudnorm as pyln
+
+from scratch_service.scratch import scratch_path
+
+
+# -------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------
+# Chains stream fixed-size blocks from the (memory-mapped) decoded
+# input through stateful filters and pointwise stages to the encoder,
+# so working memory is a few blocks regardless of track length.
+# Whole-signal statistics (peaks, loudness) come from an earlier pass
+# over the same stream instead of from full-length temporaries.
+BLOCK_SIZE = int(os.environ.get("DSP_BLOCK_SIZE", 65536))
+
+# Intermediates spooled between passes stay in RAM below this size and
+# go to a scratch-backed memmap above it
+SPOOL_IN_MEMORY_BYTES = int(os.environ.get("DSP_SPOOL_IN_MEMORY_BYTES", 64 * 1024 ** 2))
+
+
+# -------------------------------------------------------
+# 1. SOURCES / SINKS
+# -------------------------------------------------------
+def iter_blocks(y, block_size=None):
+    """float32 blocks along axis 0 of an array or memmap (last one shorter)."""
+    block_size = block_size or BLOCK_SIZE
+    for start in range(0, len(y), block_size):
+        yield np.asarray(y[start:start + block_size], dtype=np.float32)
+
+
+def spool(shape):
+    """float32 buffer for one intermediate signal: RAM when small, scratch memmap when not."""
+    nbytes = int(np.prod(shape)) * 4
+    if nbytes <= SPOOL_IN_MEMORY_BYTES:
+        return np.empty(shape, dtype=np.float32)
+    return np.lib.format.open_memmap(scratch_path(".npy"), mode="w+", dtype=np.float32, shape=shape)
+
+
+def collect(blocks, shape):
+    """Gathers a block stream into one array (for the in-memory *_array APIs)."""
+    out = np.empty(shape, dtype=np.float32)
+    pos = 0
+    for block in blocks:
+        out[pos:pos + len(block)] = block
+        pos += len(block)
+    return out[:pos]
+
+
+def write_blocks(blocks, path, sr, channels, subtype="PCM_16"):
+    """Encodes a block stream straight to a WAV file."""
+    with sf.SoundFile(path, "w", samplerate=sr, channels=channels, subtype=subtype, format="WAV") as f:
+        for block in blocks:
+            f.write(block)
+    return path
+
+
+# -------------------------------------------------------
+# 2. STREAMING STAGES
+# -------------------------------------------------------
+class Delay:
+    """Integer-sample delay line; zeros until the first input comes out."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.tail = None
+
+    def __call__(self, block):
+        if self.samples == 0:
+            return block
+        if self.tail is None:
+            self.tail = np.zeros((self.samples,) + block.shape[1:], dtype=np.float32)
+        joined = np.concatenate([self.tail, block])
+        self.tail = joined[len(block):]
+        return joined[:len(block)]
+
+
+def compensated(stage, blocks):
+    """
+    Runs a block stream through a stage with a `latency` (samples):
+    drops the lead-in and flushes the tail, so the output lines up with,
+    and is as long as, the input.
+    """
+    skip = stage.latency
+    trailing = ()
+
+    for block in blocks:
+        trailing = block.shape[1:]
+        out = stage(block)
+        if skip:
+            dropped = min(skip, len(out))
+            out = out[dropped:]
+            skip -= dropped
+        if len(out):
+            yield out
+
+    if stage.latency:
+        yield stage(np.zeros((stage.latency,) + trailing, dtype=np.float32))[skip:]
+
+
+class PeakMeter:
+    def __init__(self):
+        self.peak = 0.0
+
+    def __call__(self, block):
+        if len(block):
+            self.peak = max(self.peak, float(np.max(np.abs(block))))
+        return block
+
+
+class RmsMeter:
+    def __init__(self):
+        self.sum_squares = 0.0
+        self.samples = 0
+
+    def __call__(self, block):
+        self.sum_squares += float(np.sum(np.square(block, dtype=np.float64)))
+        self.samples += block.size
+        return block
+
+    def level_db(self):
+        rms = np.sqrt(self.sum_squares / max(1, self.samples))
+        return float(20.0 * np.log10(max(rms, 1e-9)))
+
+
+class LoudnessMeter:
+    """
+    Streaming pyloudnorm.Meter(sr).integrated_loudness: K-weighting with
+    carried lfilter state, squared sums per 100 ms hop, and the
+    BS.1770-4 gating over 400 ms / 75%-overlap blocks at the end.
+    integrated(gain) reports the loudness of the signal scaled by gain,
+    so it can be measured before a normalization gain is known.
+    """
+
+    GATE_SECONDS = 0.4
+    HOP_SECONDS = 0.1
+    CHANNEL_GAINS = [1.0, 1.0, 1.0, 1.41, 1.41]
+
+    def __init__(self, sr):
+        meter = pyln.Meter(sr)
+        self.sr = sr
+        self.stages = [(f.b, f.a, f.passband_gain) for f in meter._filters.values()]
+        self.zi = [None] * len(self.stages)
+        self.hop = int(self.HOP_SECONDS * sr)
+        self.hops = []
+        self.partial = None
+        self.filled = 0
+        self.samples = 0
+
+    def __call__(self, block):
+        x = np.asarray(block, dtype=np.float64).reshape(len(block), -1)
+        for i, (b, a, gain) in enumerate(self.stages):
+            if self.zi[i] is None:
+                self.zi[i] = np.zeros((max(len(a), len(b)) - 1, x.shape[1]))
+            x, self.zi[i] = signal.lfilter(b, a, x, axis=0, zi=self.zi[i])
+            x *= gain
+
+        squared = x ** 2
+        if self.partial is None:
+            self.partial = np.zeros(x.shape[1])
+
+        pos = 0
+        while pos < len(squared):
+            take = min(self.hop - self.filled, len(squared) - pos)
+            self.partial += squared[pos:pos + take].sum(axis=0)
+            self.filled += take
+            pos += take
+            if self.filled == self.hop:
+                self.hops.append(self.partial)
+                self.partial = np.zeros(x.shape[1])
+                self.filled = 0
+
+        self.samples += len(block)
+        return block
+
+    def integrated(self, gain=1.0):
+        if self.samples < self.GATE_SECONDS * self.sr:
+            raise ValueError("Audio must have length greater than the block size.")
+
+        hops = np.array(self.hops + [self.partial])
+        per_block = int(round(self.GATE_SECONDS / self.HOP_SECONDS))
+        seconds = self.samples / self.sr
+        num_blocks = int(np.round((seconds - self.GATE_SECONDS) / self.HOP_SECONDS)) + 1
+
+        z = np.array([hops[j:j + per_block].sum(axis=0) for j in range(num_blocks)])
+        z *= gain ** 2 / (self.GATE_SECONDS * self.sr)
+        weights = np.array(self.CHANNEL_GAINS[:z.shape[1]])
+
+        with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            block_loudness = -0.691 + 10.0 * np.log10(z @ weights)
+
+            gated = block_loudness >= -70.0
+            relative = -0.691 + 10.0 * np.log10(z[gated].mean(axis=0) @ weights) - 10.0
+
+            gated = (block_loudness > relative) & (block_loudness > -70.0)
+            z_avg = np.nan_to_num(z[gated].mean(axis=0))
+            return -0.691 + 10.0 * np.log10(z_avg @ weights)
@@ -0,0 +1,94 @@
+import numpy as np
+
+
+# -------------------------------------------------------
+# 1. LFO
+# -------------------------------------------------------
+class LFO:
+    """
+    Sine modulator in samples: base + depth * sin(2π·rate·t + phase).
+    Keeps its phase across calls, so a block stream gets one continuous
+    sweep.
+    """
+
+    def __init__(self, sr, rate_hz, base, depth, phase=0.0):
+        self.sr = sr
+        self.rate_hz = rate_hz
+        self.base = base
+        self.depth = depth
+        self.phase = phase
+        self.pos = 0
+
+    def __call__(self, n):
+        t = (self.pos + np.arange(n)) / self.sr
+        self.pos += n
+        return self.base + self.depth * np.sin(2 * np.pi * self.rate_hz * t + self.phase)
+
+
+# -------------------------------------------------------
+# 2. FRACTIONAL DELAY LINE
+# -------------------------------------------------------
+def _read(buf, pos, now, interpolation):
+    """
+    buf sampled at fractional positions pos (one gather per tap, no
+    Python loop). Taps past now (the current sample's index) are clamped
+    to it, so the read stays causal and block-size independent.
+    """
+    i0 = np.floor(pos).astype(np.int64)
+    frac = (pos - i0).astype(np.float32)
+    if buf.ndim > 1:
+        frac = frac[:, None]
+
+    def tap(offset):
+        return buf[np.clip(i0 + offset, 0, now)]
+
+    if interpolation == "linear":
+        return tap(0) * (1 - frac) + tap(1) * frac
+
+    # 4-point Catmull-Rom
+    xm1, x0, x1, x2 = tap(-1), tap(0), tap(1), tap(2)
+    a = -0.5 * xm1 + 1.5 * x0 - 1.5 * x1 + 0.5 * x2
+    b = xm1 - 2.5 * x0 + 2.0 * x1 - 0.5 * x2
+    c = -0.5 * xm1 + 0.5 * x1
+    return ((a * frac + b) * frac + c) * frac + x0
+
+
+class DelayLine:
+    """
+    Delay with a per-sample fractional delay time (in samples, 0 to
+    max_delay). Keeps max_delay samples of history, so blocks can be
+    fed one after another (samples on axis 0, any channel count).
+    interpolation: "linear" | "cubic" (Catmull-Rom; exact for delays
+    of at least 2 samples, clamped to the current sample below that).
+    """
+
+    def __init__(self, max_delay, interpolation="linear"):
+        if interpolation not in ("linear", "cubic"):
+            raise ValueError("interpolation must be 'linear' or 'cubic'")
+        self.size = int(np.ceil(max_delay)) + 2
+        self.interpolation = interpolation
+        self.history = None
+
+    def __call__(self, block, delay):
+        block = np.asarray(block, dtype=np.float32)
+        n = len(block)
+        if self.history is None:
+            self.history = np.zeros((self.size,) + block.shape[1:], dtype=np.float32)
+
+        buf = np.concatenate([self.history, block])
+        delay = np.clip(np.broadcast_to(delay, (n,)), 0, self.size - 2)
+        now = self.size + np.arange(n)
+        out = _read(buf, now - delay, now, self.interpolation)
+
+        self.history = buf[-self.size:]
+        return out.astype(np.float32)
+
+
+def modulated_delay(y, sr, base, depth=0.0, rate_hz=0.0, interpolation="linear", phase=0.0):
+    """
+    Whole-signal chorus/flanger/ADT tap: y delayed by
+    base + depth * sin(2π·rate·t) seconds (depth ≤ base). Same length as y.
+    """
+    lfo = LFO(sr, rate_hz, base * sr, depth * sr, phase)
+    line = DelayLine((base + depth) * sr, interpolation)
+    return line(y, lfo(len(y)))
@@ -0,0 +1,184 @@
+import numpy as np
+import numba
+import scipy.signal as signal
+from scipy.ndimage import minimum_filter1d
+
+from dsp_service.block_engine import Delay
+
+
+# -------------------------------------------------------
+# 1. ENVELOPE FOLLOWER
+# -------------------------------------------------------
+# The attack/release branch makes the follower recursive per sample,
+# so it is the one stage that can't be written as array maths: it is
+# compiled with numba (already pulled in by librosa) instead.
+@numba.njit(cache=True)
+def _follow(x, attack, release, state):
+    out = np.empty_like(x)
+    s = state
+    for i in range(len(x)):
+        coef = attack if x[i] > s else release
+        s = coef * s + (1.0 - coef) * x[i]
+        out[i] = s
+    return out
+
+
+def time_coefficient(ms, sr):
+    """One-pole coefficient reaching 1 - 1/e of a step in `ms` milliseconds."""
+    if ms <= 0:
+        return 0.0
+    return float(np.exp(-1.0 / (ms * 0.001 * sr)))
+
+
+class EnvelopeFollower:
+    """
+    Attack/release smoother: rises toward the input with the attack time
+    and falls back with the release time. State carries across blocks.
+    """
+
+    def __init__(self, sr, attack_ms, release_ms, initial=0.0):
+        self.attack = time_coefficient(attack_ms, sr)
+        self.release = time_coefficient(release_ms, sr)
+        self.state = float(initial)
+
+    def __call__(self, x):
+        if not len(x):
+            return np.asarray(x, dtype=np.float64)
+        out = _follow(np.asarray(x, dtype=np.float64), self.attack, self.release, self.state)
+        self.state = float(out[-1])
+        return out
+
+
+def _level(block):
+    """Per-sample linked level: max |x| over channels."""
+    block = np.abs(block)
+    return block.max(axis=1) if block.ndim > 1 else block
+
+
+def _to_db(x):
+    return 20.0 * np.log10(np.maximum(x, 1e-9))
+
+
+# -------------------------------------------------------
+# 2. COMPRESSOR
+# -------------------------------------------------------
+class Compressor:
+    """
+    Feed-forward compressor with a soft-knee gain computer and an
+    attack/release-smoothed gain reduction (log domain). Channels are
+    linked. Stateful — call it per block (samples on axis 0).
+    """
+
+    def __init__(self, sr, threshold_db, ratio, attack_ms=10.0, release_ms=100.0,
+                 knee_db=6.0, makeup_db=0.0):
+        self.threshold_db = threshold_db
+        self.slope = 1.0 - 1.0 / ratio
+        self.knee_db = knee_db
+        self.makeup_db = makeup_db
+        self.envelope = EnvelopeFollower(sr, attack_ms, release_ms)
+
+    def reduction_db(self, level_db):
+        """Static curve: dB of gain reduction (≥ 0) for a given level."""
+        over = level_db - self.threshold_db
+        knee = self.knee_db
+        reduction = np.where(over > 0, self.slope * over, 0.0)
+        if knee > 0:
+            in_knee = np.abs(over) <= knee / 2
+            reduction = np.where(in_knee, self.slope * (over + knee / 2) ** 2 / (2 * knee), reduction)
+        return reduction
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        reduction = self.envelope(self.reduction_db(_to_db(_level(block))))
+        gain = (10.0 ** ((self.makeup_db - reduction) / 20.0)).astype(np.float32)
+        return block * (gain[:, None] if block.ndim > 1 else gain)
+
+
+# -------------------------------------------------------
+# 3. TRUE-PEAK DETECTOR
+# -------------------------------------------------------
+class TruePeakDetector:
+    """
+    BS.1770-style true-peak level: 4x polyphase interpolation (12 taps
+    per phase), max |x| over phases and channels per input sample.
+    Output lags the input by `latency` samples; `peak` is the running
+    maximum.
+    """
+
+    OVERSAMPLE = 4
+    TAPS_PER_PHASE = 12
+
+    def __init__(self):
+        taps = self.OVERSAMPLE * self.TAPS_PER_PHASE + 1
+        h = signal.firwin(taps, 1.0 / self.OVERSAMPLE, window=("kaiser", 8.0)) * self.OVERSAMPLE
+        self.phases = [h[p::self.OVERSAMPLE] for p in range(self.OVERSAMPLE)]
+        self.zi = None
+        self.latency = (taps - 1) // (2 * self.OVERSAMPLE)
+        self.peak = 0.0
+
+    def __call__(self, block):
+        x = np.asarray(block, dtype=np.float64).reshape(len(block), -1)
+        if self.zi is None:
+            self.zi = [np.zeros((len(b) - 1, x.shape[1])) for b in self.phases]
+
+        level = np.zeros(len(x))
+        for p, b in enumerate(self.phases):
+            y, self.zi[p] = signal.lfilter(b, [1.0], x, axis=0, zi=self.zi[p])
+            np.maximum(level, np.abs(y).max(axis=1), out=level)
+
+        if len(level):
+            self.peak = max(self.peak, float(level.max()))
+        return level
+
+
+# -------------------------------------------------------
+# 4. LOOKAHEAD LIMITER
+# -------------------------------------------------------
+class Limiter:
+    """
+    Brickwall lookahead limiter. The gain each sample needs to stay
+    under the ceiling is min-held and then box-averaged over the
+    lookahead window, so the gain is already down when a peak arrives
+    and it never overshoots. It then recovers with an exponential
+    release. With true_peak the level comes from TruePeakDetector, so
+    the ceiling is in dBTP. The audio is delayed by `latency` samples;
+    run it through block_engine.compensated() to keep the output aligned.
+    """
+
+    def __init__(self, sr, ceiling_db=-1.0, lookahead_ms=5.0, release_ms=80.0, true_peak=True):
+        self.ceiling = 10.0 ** (ceiling_db / 20.0)
+        self.window = 2 * (int(lookahead_ms * 0.001 * sr) // 2) + 1   # odd, for the trailing min
+        self.detector = TruePeakDetector() if true_peak else None
+        self.detector_latency = self.detector.latency if true_peak else 0
+        self.latency = self.detector_latency + self.window - 1
+        self.delay = Delay(self.latency)
+        self.release = EnvelopeFollower(sr, 0.0, release_ms)
+        self.required_tail = np.ones(self.window - 1)
+        self.held_tail = np.ones(self.window - 1)
+
+    def gain(self, block):
+        level = self.detector(block) if self.detector else _level(block)
+        required = np.minimum(1.0, self.ceiling / np.maximum(level, 1e-9))
+        n = len(required)
+
+        # min over the trailing window [i - window + 1, i]
+        joined = np.concatenate([self.required_tail, required])
+        held = minimum_filter1d(joined, self.window, origin=(self.window - 1) // 2)[-n:]
+        self.required_tail = joined[-(self.window - 1):]
+
+        # box average of the held curve over the same window
+        joined = np.concatenate([self.held_tail, held])
+        sums = np.cumsum(np.concatenate([[0.0], joined]))
+        smoothed = (sums[self.window:] - sums[:-self.window]) / self.window
+        self.held_tail = joined[-(self.window - 1):]
+
+        # instant attack (already smoothed), exponential release, as reduction
+        return 1.0 - self.release(1.0 - smoothed)
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if not len(block):
+            return block
+        gain = self.gain(block).astype(np.float32)
+        delayed = self.delay(block)
+        return delayed * (gain[:, None] if block.ndim > 1 else gain)
@@ -0,0 +1,126 @@
+import functools
+import numpy as np
+import scipy.signal as signal
+
+
+# -------------------------------------------------------
+# 1. FILTER DESIGN CACHE
+# -------------------------------------------------------
+# Butterworth designs are memoized on (type, order, edges, sr): every
+# chain asks for the same handful of filters on every request, and
+# scipy's design (zpk → sos) costs more than filtering a short clip.
+# Cached arrays are shared — they are returned read-only.
+@functools.lru_cache(maxsize=256)
+def design_sos(btype, order, edges, sr):
+    """
+    btype: "lowpass" | "highpass" | "bandpass" | "allpass"
+    edges: Hz — one float, or a (low, high) tuple for bandpass.
+    Returns float32 second-order sections.
+    """
+    nyq = sr / 2
+    wn = tuple(e / nyq for e in edges) if isinstance(edges, tuple) else edges / nyq
+
+    if btype == "allpass":
+        # 2nd-order allpass sharing the Butterworth poles: what an LR4
+        # low/high pair sums to, used to phase-align crossover bands
+        _, a = signal.butter(2, wn)
+        sos = np.concatenate([a[::-1], a])[None]
+    else:
+        sos = signal.butter(order, wn, btype=btype, output="sos")
+
+    sos = sos.astype(np.float32)
+    sos.setflags(write=False)
+    return sos
+
+
+def linkwitz_riley(btype, freq, sr):
+    """LR4 = two cascaded 2nd-order Butterworths."""
+    sos = design_sos(btype, 2, float(freq), sr)
+    return np.concatenate([sos, sos])
+
+
+def sosfilt(sos, y, axis=0):
+    """scipy sosfilt kept in float32 end to end (scipy wants writable sos)."""
+    return signal.sosfilt(np.array(sos), np.asarray(y, dtype=np.float32), axis=axis)
+
+
+# -------------------------------------------------------
+# 2. SINGLE FILTERS
+# -------------------------------------------------------
+def bandpass(y, sr, low, high, order=4, axis=0):
+    """Butterworth bandpass; a high edge at/above Nyquist becomes a highpass."""
+    if high >= sr / 2:
+        return highpass(y, sr, low, order, axis)
+    return sosfilt(design_sos("bandpass", order, (float(low), float(high)), sr), y, axis)
+
+
+def highpass(y, sr, freq, order=4, axis=0):
+    return sosfilt(design_sos("highpass", order, float(freq), sr), y, axis)
+
+
+def lowpass(y, sr, freq, order=4, axis=0):
+    return sosfilt(design_sos("lowpass", order, float(freq), sr), y, axis)
+
+
+# -------------------------------------------------------
+# 3. STATEFUL FILTERS (block processing)
+# -------------------------------------------------------
+class SosFilter:
+    """
+    sosfilt whose zi state carries over between calls: feeding a signal
+    block by block (samples on axis 0) gives the same output as one
+    sosfilt over the whole signal.
+    """
+
+    def __init__(self, sos):
+        self.sos = np.array(sos, dtype=np.float32)
+        self.zi = None
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.zi is None:
+            self.zi = np.zeros((self.sos.shape[0], 2) + block.shape[1:], dtype=np.float32)
+        out, self.zi = signal.sosfilt(self.sos, block, axis=0, zi=self.zi)
+        return out
+
+
+class Crossover:
+    """
+    Linkwitz-Riley (LR4) crossover: len(freqs) + 1 bands in one cascade,
+    [below f0, f0–f1, …, above f_last]. Each split runs once on what is
+    left above the previous one, and lower bands get the allpass of the
+    splits above them, so the bands are phase-aligned and sum back to
+    an allpassed (flat magnitude) input. Stateful — call it per block.
+    """
+
+    def __init__(self, sr, freqs):
+        freqs = sorted(float(f) for f in freqs)
+        if any(f <= 0 or f >= sr / 2 for f in freqs):
+            raise ValueError("crossover frequencies must lie between 0 and Nyquist")
+
+        self.splits = []
+        for i, f in enumerate(freqs):
+            above = freqs[i + 1:]
+            allpass = None
+            if above:
+                allpass = SosFilter(np.concatenate([design_sos("allpass", 2, g, sr) for g in above]))
+            self.splits.append((
+                SosFilter(linkwitz_riley("lowpass", f, sr)),
+                SosFilter(linkwitz_riley("highpass", f, sr)),
+                allpass,
+            ))
+
+    def __call__(self, block):
+        bands = []
+        rest = np.asarray(block, dtype=np.float32)
+        for lowpass_, highpass_, allpass in self.splits:
+            low = lowpass_(rest)
+            rest = highpass_(rest)
+            bands.append(allpass(low) if allpass else low)
+        bands.append(rest)
+        return bands
+
+
+def crossover(y, sr, freqs):
+    """Whole-signal Crossover: float32 bands, samples on axis 0."""
+    return Crossover(sr, freqs)(y)
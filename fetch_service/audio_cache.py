@@ -0,0 +1,101 @@
+import os
+import time
+import uuid
+import threading
+import numpy as np
+
+from fetch_service.fetcher import CACHE_DIR, fetch_info, path_digest
+from metrics_service.metrics import inc
+from audio_io_service.audio_io import decode_to_npy, RESAMPLE_QUALITY
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Decoded + resampled audio is stored as float32 .npy files keyed by
+# (content sha256, sr, mono/stereo) and handed back as read-only
+# memory maps, so repeat requests skip decode/resample entirely and
+# all workers share the same pages through the OS page cache.
+DECODED_DIR = os.path.join(CACHE_DIR, "decoded")
+DECODED_MAX_BYTES = int(os.environ.get("DECODED_CACHE_MAX_BYTES", 4 * 1024 ** 3))
+MIN_EVICT_AGE = 120
+
+_evict_lock = threading.Lock()
+
+
+def _npy_path(digest, sr, mono):
+    layout = "mono" if mono else "multi"
+    return os.path.join(DECODED_DIR, f"{digest}_{sr}_{layout}_{RESAMPLE_QUALITY}.npy")
+
+
+def _evict():
+    """Drops least-recently-used decodes until under DECODED_MAX_BYTES."""
+    with _evict_lock:
+        entries = []
+        total = 0
+
+        for name in os.listdir(DECODED_DIR):
+            if not name.endswith(".npy"):
+                continue
+            path = os.path.join(DECODED_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= DECODED_MAX_BYTES:
+                break
+            if now - mtime < MIN_EVICT_AGE:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# -------------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------------
+def load_audio_file(path, sr=44100, mono=True, digest=None):
+    """
+    Drop-in for librosa.load(path, sr=sr, mono=mono).
+    Returns (y, sr) where y is a READ-ONLY float32 array
+    (copy before modifying in place).
+    """
+    if digest is None:
+        digest = path_digest(path)
+
+    os.makedirs(DECODED_DIR, exist_ok=True)
+    npy = _npy_path(digest, sr, mono)
+
+    if os.path.exists(npy):
+        try:
+            os.utime(npy, None)
+            y = np.asarray(np.load(npy, mmap_mode="r"))
+            inc("cache_requests", help_text="Cache lookups by cache and result", cache="decoded", result="hit")
+            return y, sr
+        except (OSError, ValueError):
+            pass  # evicted / truncated between exists() and load()
+
+    inc("cache_requests", help_text="Cache lookups by cache and result", cache="decoded", result="miss")
+
+    # Atomic publish so concurrent readers never map a partial file
+    tmp = os.path.join(DECODED_DIR, f".{uuid.uuid4().hex}.npy")
+    sr = decode_to_npy(path, tmp, sr=sr, mono=mono)
+    os.replace(tmp, npy)
+    _evict()
+
+    return np.asarray(np.load(npy, mmap_mode="r")), sr
+
+
+def load_audio(audio_url, sr=44100, mono=True):
+    """
+    Download (via the shared fetch cache) + decode (via the decoded
+    cache). Returns (y, sr) with y read-only float32.
+    """
+    path, digest = fetch_info(audio_url)
+    return load_audio_file(path, sr=sr, mono=mono, digest=digest)
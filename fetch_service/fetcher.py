@@ -0,0 +1,332 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+from metrics_service.metrics import stage, inc
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Downloads are stored once per content hash under CACHE_DIR/blobs.
+# CACHE_DIR/urls/<sha1(url)>.json remembers which blob a URL
+# resolved to, plus its ETag / Last-Modified for revalidation.
+CACHE_DIR = os.environ.get("FETCH_CACHE_DIR", "/tmp/fetch_cache")
+CACHE_MAX_BYTES = int(os.environ.get("FETCH_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+
+# Within this window a cached URL is reused without revalidating
+FRESH_SECONDS = int(os.environ.get("FETCH_FRESH_SECONDS", 300))
+
+# Blobs touched more recently than this are never evicted
+# (a handler may be about to open them)
+MIN_EVICT_AGE = 120
+
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = (10, 300)
+
+# Connection pool size of the shared session, and the default number
+# of parallel downloads one request may run through fetch_many()
+POOL_SIZE = int(os.environ.get("FETCH_POOL_SIZE", 16))
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", 4))
+
+_BLOB_DIR = os.path.join(CACHE_DIR, "blobs")
+_URL_DIR = os.path.join(CACHE_DIR, "urls")
+
+_evict_lock = threading.Lock()
+_session_lock = threading.Lock()
+_session = None
+_session_pid = None
+
+
+def get_session():
+    """
+    Shared keep-alive session (one per process — pooled sockets must
+    not be inherited across the job pool's fork).
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+
+        return _session
+
+
+def _ensure_dirs():
+    os.makedirs(_BLOB_DIR, exist_ok=True)
+    os.makedirs(_URL_DIR, exist_ok=True)
+
+
+def _url_meta_path(url):
+    return os.path.join(_URL_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _blob_path(digest):
+    return os.path.join(_BLOB_DIR, digest)
+
+
+def _read_meta(url):
+    try:
+        with open(_url_meta_path(url)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(url, meta):
+    # Atomic replace so concurrent workers never see a half-written file
+    path = _url_meta_path(url)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, path)
+
+
+def _count(result):
+    inc("cache_requests", help_text="Cache lookups by cache and result", cache="download", result=result)
+
+
+def _timed_download(url, headers=None):
+    with stage("download") as info:
+        resp, digest = _download(url, headers)
+        if digest is not None:
+            info["bytes"] = os.path.getsize(_blob_path(digest))
+    return resp, digest
+
+
+def _touch(path):
+    """Bumps mtime → used as LRU clock."""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+# -------------------------------------------------------------
+# BLOB STORE
+# -------------------------------------------------------------
+BLOB_SCHEME = "blob:"
+
+
+def _store_chunks(chunks):
+    """Writes an iterable of byte chunks into the blob store → digest."""
+    sha = hashlib.sha256()
+    tmp = os.path.join(_BLOB_DIR, f".{uuid.uuid4().hex}.part")
+
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                if chunk:
+                    f.write(chunk)
+                    sha.update(chunk)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    digest = sha.hexdigest()
+    dest = _blob_path(digest)
+
+    if os.path.exists(dest):
+        # Same bytes already cached under another URL / earlier fetch
+        os.remove(tmp)
+        _touch(dest)
+    else:
+        os.replace(tmp, dest)
+
+    return digest
+
+
+def store_stream(stream):
+    """
+    Copies a file-like body (e.g. request.stream) into the blob store
+    chunk by chunk, never holding it in memory.
+    Returns a "blob:<sha256>" source usable wherever a URL is accepted.
+    """
+    _ensure_dirs()
+    digest = _store_chunks(iter(lambda: stream.read(CHUNK_SIZE), b""))
+    _evict()
+    return BLOB_SCHEME + digest
+
+
+# -------------------------------------------------------------
+# DOWNLOAD
+# -------------------------------------------------------------
+def _download(url, headers=None):
+    """
+    Streams url into the blob store.
+    Returns (response, digest) or (response, None) on 304.
+    """
+    resp = get_session().get(url, headers=headers or {}, stream=True, timeout=TIMEOUT)
+
+    if resp.status_code == 304:
+        resp.close()
+        return resp, None
+
+    resp.raise_for_status()
+
+    try:
+        digest = _store_chunks(resp.iter_content(chunk_size=CHUNK_SIZE))
+    finally:
+        resp.close()
+
+    return resp, digest
+
+
+# -------------------------------------------------------------
+# EVICTION
+# -------------------------------------------------------------
+def _evict():
+    """Deletes least-recently-used blobs until under CACHE_MAX_BYTES."""
+    with _evict_lock:
+        entries = []
+        total = 0
+
+        for name in os.listdir(_BLOB_DIR):
+            if name.startswith("."):
+                continue
+            path = os.path.join(_BLOB_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= CACHE_MAX_BYTES:
+            return
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= CACHE_MAX_BYTES:
+                break
+            if now - mtime < MIN_EVICT_AGE:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# -------------------------------------------------------------
+# PUBLIC API
+# -------------------------------------------------------------
+def fetch_info(url):
+    """
+    Returns (local_path, sha256) for url.
+    url may also be a "blob:<sha256>" source from store_stream().
+    The file is shared and must be treated as read-only.
+    """
+    _ensure_dirs()
+
+    if url.startswith(BLOB_SCHEME):
+        digest = url[len(BLOB_SCHEME):]
+        path = _blob_path(digest)
+        valid = len(digest) == 64 and all(c in "0123456789abcdef" for c in digest)
+        if not valid or not os.path.exists(path):
+            raise FileNotFoundError(f"unknown upload: {url}")
+        _touch(path)
+        return path, digest
+
+    meta = _read_meta(url)
+
+    if meta is not None:
+        cached = _blob_path(meta["sha256"])
+
+        if os.path.exists(cached):
+            # Fresh → no network at all
+            if time.time() - meta.get("checked_at", 0) < FRESH_SECONDS:
+                _touch(cached)
+                _count("hit")
+                return cached, meta["sha256"]
+
+            # Stale → conditional request
+            headers = {}
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+            if headers:
+                resp, digest = _timed_download(url, headers)
+                if digest is None:
+                    meta["checked_at"] = time.time()
+                    _write_meta(url, meta)
+                    _touch(cached)
+                    _count("revalidated")
+                    return cached, meta["sha256"]
+                _count("miss")
+                return _remember(url, resp, digest)
+
+    resp, digest = _timed_download(url)
+    _count("miss")
+    return _remember(url, resp, digest)
+
+
+def _remember(url, resp, digest):
+    _write_meta(url, {
+        "sha256": digest,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "checked_at": time.time(),
+    })
+    _evict()
+    return _blob_path(digest), digest
+
+
+def fetch(url):
+    """Returns a local, read-only path holding the bytes of url."""
+    return fetch_info(url)[0]
+
+
+def path_digest(path):
+    """
+    sha256 of a local file. Free for paths handed out by fetch()
+    (blobs are named by their digest); hashes anything else.
+    """
+    if os.path.dirname(os.path.abspath(path)) == os.path.abspath(_BLOB_DIR):
+        return os.path.basename(path)
+
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def fetch_bytes(url):
+    """Returns the bytes of url (served from the cache when possible)."""
+    with open(fetch(url), "rb") as f:
+        return f.read()
+
+
+def fetch_many(urls, max_workers=None):
+    """
+    Downloads several URLs in parallel over the shared session.
+    Returns local paths in the same order as urls.
+    max_workers caps this request's concurrency (default FETCH_CONCURRENCY).
+    """
+    unique = list(dict.fromkeys(urls))
+    if not unique:
+        return []
+
+    workers = max(1, min(max_workers or FETCH_CONCURRENCY, len(unique)))
+
+    if workers == 1:
+        paths = {url: fetch(url) for url in unique}
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            paths = dict(zip(unique, pool.map(fetch, unique)))
+
+    return [paths[url] for url in urls]
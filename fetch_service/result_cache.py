@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import uuid
+import shutil
+import inspect
+import functools
+import threading
+
+from fetch_service.fetcher import CACHE_DIR, fetch_info, path_digest
+from coalesce_service.single_flight import flight_key
+from metrics_service.metrics import inc
+from audio_io_service.audio_io import RESAMPLE_QUALITY
+from reverb_service.partitioned_convolution import PARTITION_SIZE
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Outputs of deterministic handlers keyed by (operation, handler
+# version, input sha256, normalized params). Bump a handler's version
+# in its @cached_result decorator whenever its output would change.
+RESULTS_DIR = os.path.join(CACHE_DIR, "results")
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 2 * 1024 ** 3))
+MIN_EVICT_AGE = 120
+
+# Env-driven settings that change rendered output are part of every
+# key, so changing one misses instead of serving stale renders
+DSP_SETTINGS = {"resample_quality": RESAMPLE_QUALITY, "partition_size": PARTITION_SIZE}
+
+_evict_lock = threading.Lock()
+
+# bytes results → <key>.bin, JSON-able results → <key>.json,
+# file results (see cached_result's file_ext) → <key><file_ext>
+_FORMATS = (".bin", ".json")
+
+
+def _count(result):
+    inc("cache_requests", help_text="Cache lookups by cache and result", cache="result", result=result)
+
+
+def _evict():
+    """Drops least-recently-used results until under RESULT_CACHE_MAX_BYTES."""
+    with _evict_lock:
+        entries = []
+        total = 0
+
+        for name in os.listdir(RESULTS_DIR):
+            if name.startswith("."):
+                continue
+            path = os.path.join(RESULTS_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= RESULT_CACHE_MAX_BYTES:
+                break
+            if now - mtime < MIN_EVICT_AGE:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# -------------------------------------------------------------
+# STORE
+# -------------------------------------------------------------
+def get_result(key):
+    """Returns (True, value) on a hit, (False, None) otherwise."""
+    for ext in _FORMATS:
+        path = os.path.join(RESULTS_DIR, key + ext)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            continue
+
+        os.utime(path, None)
+        if ext == ".bin":
+            return True, raw
+        return True, json.loads(raw)
+
+    return False, None
+
+
+def put_result(key, value):
+    """Stores bytes or JSON-able values; anything else is not cached."""
+    if isinstance(value, (bytes, bytearray)):
+        ext, raw = ".bin", bytes(value)
+    else:
+        try:
+            ext, raw = ".json", json.dumps(value, default=float).encode()
+        except (TypeError, ValueError):
+            return False
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    tmp = os.path.join(RESULTS_DIR, f".{uuid.uuid4().hex}")
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, os.path.join(RESULTS_DIR, key + ext))
+    _evict()
+    return True
+
+
+def get_file(key, ext):
+    """Path of a cached file result (touched, so eviction spares it for now), or None."""
+    path = os.path.join(RESULTS_DIR, key + ext)
+    try:
+        os.utime(path, None)
+    except OSError:
+        return None
+    return path
+
+
+def put_file(key, path, ext):
+    """Moves a rendered file into the cache; returns its cached path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    tmp = os.path.join(RESULTS_DIR, f".{uuid.uuid4().hex}")
+    shutil.move(path, tmp)
+    cached = os.path.join(RESULTS_DIR, key + ext)
+    os.replace(tmp, cached)
+    os.utime(cached, None)
+    _evict()
+    return cached
+
+
+# -------------------------------------------------------------
+# DECORATOR
+# -------------------------------------------------------------
+def cached_result(operation, version, source="url", file_ext=None):
+    """
+    @cached_result("pitch_shift", version=1)
+    def pitch_shift(audio_url, semitones): ...
+
+    The first argument is the input (source="url": an audio_url or
+    blob: source, source="path": a local file); every other argument,
+    defaults included, becomes part of the key, as does DSP_SETTINGS.
+
+    file_ext: the handler returns the path of a file it rendered (with
+    that extension) instead of a value. The file is moved into the
+    cache and the cached path returned, on hits too, so results are
+    never read into memory; callers copy it, never modify or move it.
+    """
+    def decorate(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not RESULT_CACHE_ENABLED:
+                return fn(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            (_, src), *params = bound.arguments.items()
+
+            digest = fetch_info(src)[1] if source == "url" else path_digest(src)
+            key = flight_key(f"{operation}@{version}", digest,
+                             {"params": dict(params), "settings": DSP_SETTINGS})
+
+            if file_ext is not None:
+                path = get_file(key, file_ext)
+                if path is not None:
+                    _count("hit")
+                    return path
+
+                _count("miss")
+                return put_file(key, fn(*args, **kwargs), file_ext)
+
+            hit, value = get_result(key)
+            if hit:
+                _count("hit")
+                return value
+
+            _count("miss")
+            value = fn(*args, **kwargs)
+            put_result(key, value)
+            return value
+
+        return wrapper
+
+    return decorate
@@ -1,33 +1,32 @@
 import tempfile
-import subprocess
 import os
-import requests
-import uuid
 import zipfile
 
+from fetch_service.fetcher import fetch_many
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+
 
 # ============================================================
 #  MIX MULTIPLE STEMS
 # ============================================================
-def run_ffmpeg_mix(tracks):
+def run_ffmpeg_mix(tracks, max_downloads=None):
     """
     tracks = [
         { "url": "https://...", "volume": 1.0 },
         ...
     ]
+    max_downloads: parallel download limit for this call
     Returns: raw WAV bytes
     """
     with tempfile.TemporaryDirectory() as tmpdir:
         inputs = []
         filter_parts = []
 
-        # Download stems
-        for i, track in enumerate(tracks):
-            path = os.path.join(tmpdir, f"track{i}.wav")
-            audio = requests.get(track["url"]).content
-            with open(path, "wb") as f:
-                f.write(audio)
+        # Download stems (parallel, pooled connections)
+        paths = fetch_many([t["url"] for t in tracks], max_workers=max_downloads)
 
+        for i, (track, path) in enumerate(zip(tracks, paths)):
             volume = track.get("volume", 1.0)
 
             inputs.extend(["-i", path])
@@ -47,7 +46,7 @@ def run_ffmpeg_mix(tracks):
             "-map", "[out]", output_path
         ]
 
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        run_ffmpeg(cmd, check=True)
 
         # Return bytes, not a JSON
         with open(output_path, "rb") as f:
@@ -57,29 +56,23 @@ def run_ffmpeg_mix(tracks):
 # ============================================================
 #  ZIP EXPORTED STEMS
 # ============================================================
-def create_zip_from_stems(stems):
+def create_zip_from_stems(stems, max_downloads=None):
     """
     stems = [
         { "name": "vocal", "url": "https://..." },
         { "name": "drums", "url": "https://..." },
         ...
     ]
-    Returns: path to .zip file in /tmp/
+    Returns: path to .zip file in request scratch
     """
 
-    zip_filename = f"stems_{uuid.uuid4().hex}.zip"
-    zip_path = os.path.join("/tmp", zip_filename)
+    zip_path = scratch_path(".zip")
+
+    paths = fetch_many([s["url"] for s in stems], max_workers=max_downloads)
 
     with zipfile.ZipFile(zip_path, "w") as zipf:
-        for stem in stems:
+        for stem, path in zip(stems, paths):
             name = stem["name"] + ".wav"
-
-            audio = requests.get(stem["url"]).content
-            temp_path = tempfile.mktemp(suffix=".wav")
-
-            with open(temp_path, "wb") as f:
-                f.write(audio)
-
-            zipf.write(temp_path, arcname=name)
+            zipf.write(path, arcname=name)
 
     return zip_path
@@ -0,0 +1,40 @@
+import subprocess
+import numpy as np
+
+from metrics_service.metrics import stage, inc, current_endpoint
+
+
+def run_ffmpeg(cmd, check=False, input=None):
+    """
+    subprocess.run for ffmpeg commands, timed as the "ffmpeg" stage.
+    Non-zero exits are counted in ffmpeg_failures_total.
+    input: bytes fed to stdin (for pipe:0 inputs).
+    """
+    with stage("ffmpeg"):
+        result = subprocess.run(cmd, input=input, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    if result.returncode != 0:
+        inc("ffmpeg_failures", help_text="ffmpeg invocations that exited non-zero",
+            endpoint=current_endpoint())
+        if check:
+            raise subprocess.CalledProcessError(
+                result.returncode, cmd, output=result.stdout, stderr=result.stderr
+            )
+
+    return result
+
+
+def filter_audio(y, sr, af):
+    """
+    Runs float32 samples through an ffmpeg -af chain over pipes, no
+    temp files. y: (samples,) or (samples, channels); same layout back.
+    """
+    channels = 1 if y.ndim == 1 else y.shape[1]
+    raw_format = ["-f", "f32le", "-ar", str(sr), "-ac", str(channels)]
+
+    cmd = ["ffmpeg", "-v", "error", *raw_format, "-i", "pipe:0",
+           "-af", af, *raw_format, "pipe:1"]
+    result = run_ffmpeg(cmd, check=True, input=np.ascontiguousarray(y, dtype="<f4").tobytes())
+
+    out = np.frombuffer(result.stdout, dtype="<f4").copy()
+    return out.reshape(-1, channels) if channels > 1 else out
@@ -1,19 +1,16 @@
 import os
 import zipfile
-import tempfile
 import numpy as np
-import librosa
-import soundfile as sf
-import requests
+
+from fetch_service.fetcher import fetch_many
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from audio_io_service.audio_io import OUTPUT_FORMATS, encode
 
 
 def _download_stem(url, sr=44100):
     """Download a stem URL and load as float32 mono or stereo."""
-    tmp = tempfile.mktemp(suffix=".wav")
-    with open(tmp, "wb") as f:
-        f.write(requests.get(url).content)
-
-    y, stem_sr = librosa.load(tmp, sr=sr, mono=False)
+    y, stem_sr = load_audio(url, sr=sr, mono=False)
 
     # Ensure shape (samples, channels)
     if y.ndim == 1:
@@ -52,13 +49,14 @@ def _pad_to_length(stem, length):
     return np.pad(stem, ((0, pad), (0, 0)), mode='constant')
 
 
-def create_hq_zip_stems(stem_list):
+def create_hq_zip_stems(stem_list, max_downloads=None, output=None):
     """
     stem_list = [
         {"name": "vocals", "url": "..."},
         {"name": "drums", "url": "..."},
         ...
     ]
+    output: audio_io output options; default 32-bit float WAV
 
     Returns: raw bytes of a ZIP file
     """
@@ -69,6 +67,9 @@ def create_hq_zip_stems(stem_list):
     processed = {}
     max_length = 0
 
+    # Pull every stem in parallel first; _download_stem then hits the cache
+    fetch_many([stem["url"] for stem in stem_list], max_workers=max_downloads)
+
     for stem in stem_list:
         name = stem["name"]
         url = stem["url"]
@@ -95,16 +96,24 @@ def create_hq_zip_stems(stem_list):
     # --------------------------------------------------------
     # 3. Create output ZIP
     # --------------------------------------------------------
-    zip_path = tempfile.mktemp(suffix=".zip")
+    zip_path = scratch_path(".zip")
+
+    fmt = output["format"] if output else "wav"
+    bit_depth = output["bit_depth"] if output else None
+    dither = output["dither"] if output else "tpdf"
+    if fmt == "wav" and bit_depth is None:
+        bit_depth = 32
+
+    # Already-compressed codecs gain nothing from deflate
+    compression = zipfile.ZIP_DEFLATED if fmt == "wav" else zipfile.ZIP_STORED
 
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_path, "w", compression) as zf:
         for name, audio in processed.items():
-            out_wav = tempfile.mktemp(suffix=".wav")
-            sf.write(out_wav, audio, sr, subtype="FLOAT")  # 32-bit
+            raw = encode(audio, sr, fmt, bit_depth, dither)
 
             # Clean naming
             safe_name = name.replace(" ", "_").lower()
-            zf.write(out_wav, f"{safe_name}.wav")
+            zf.writestr(f"{safe_name}{OUTPUT_FORMATS[fmt]['ext']}", raw)
 
 
     # --------------------------------------------------------
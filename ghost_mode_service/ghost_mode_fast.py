@@ -1,16 +1,13 @@
-import tempfile
-import requests
-import subprocess
+from fetch_service.fetcher import fetch
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
 
 def ghost_mode_fast(audio_url):
     """
     Fast CPU-safe Ghost Mode (default).
     """
-    input_path = tempfile.mktemp(suffix=".wav")
-    out_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    out_path = scratch_path(".wav")
 
     cmd = [
         "ffmpeg", "-y",
@@ -23,7 +20,7 @@ def ghost_mode_fast(audio_url):
         out_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd)
 
     with open(out_path, "rb") as f:
         return f.read()
@@ -1,11 +1,14 @@
-import tempfile
-import subprocess
-import requests
 import numpy as np
 import librosa
-import soundfile as sf
 import scipy.signal as signal
 
+from fetch_service.fetcher import fetch
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+from metrics_service.metrics import lap, set_mode
+from dsp_service.filters import bandpass
+
 
 # ------------------------------------------------------------
 # FAST MODE (FFmpeg-based)
@@ -14,12 +17,8 @@ def _ghost_fast(audio_url):
     """
     Fast, CPU-safe ghost mode.
     """
-    input_path = tempfile.mktemp(suffix=".wav")
-    out_path = tempfile.mktemp(suffix=".wav")
-
-    # Download audio
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    out_path = scratch_path(".wav")
 
     # FFmpeg spectral/temporal ghosting
     cmd = [
@@ -35,7 +34,7 @@ def _ghost_fast(audio_url):
         out_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd)
 
     with open(out_path, "rb") as f:
         return f.read()
@@ -44,27 +43,35 @@ def _ghost_fast(audio_url):
 # ------------------------------------------------------------
 # HQ MODE (Librosa DSP-based)
 # ------------------------------------------------------------
-def _ghost_hq(audio_url):
+def _harmonic(y):
     """
-    HQ cinematic ghost mode using spectral decomposition.
-    MUCH heavier DSP but produces a signature 'haunted' sound.
+    librosa.effects.harmonic for (samples,) or (samples, channels).
+    The HPSS median filtering (the expensive part) runs once, on the
+    channel-averaged magnitude, and that mask is applied to every
+    channel's STFT — stereo costs little more than mono.
     """
-    input_path = tempfile.mktemp(suffix=".wav")
+    if y.ndim == 1:
+        return librosa.effects.harmonic(y)
 
-    # Download audio
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    stft = librosa.stft(np.ascontiguousarray(y.T))           # (channels, freq, frames)
+    mask, _ = librosa.decompose.hpss(np.abs(stft).mean(axis=0), mask=True)
+    return librosa.istft(stft * mask.astype(np.float32), length=len(y), dtype=np.float32).T
 
-    # Load audio
-    y, sr = librosa.load(input_path, sr=44100)
 
+def ghost_mode_array(y, sr):
+    """
+    HQ cinematic ghost mode using spectral decomposition.
+    MUCH heavier DSP but produces a signature 'haunted' sound.
+    float32 (samples,) or (samples, channels) in → same shape out (used
+    by /pipeline); every layer runs on all channels at once (librosa
+    gets the transposed, time-last view).
+    """
     # ---------------------------------------
     # Breath layer — whisper noise
     # ---------------------------------------
-    breath = signal.lfilter([1, -1], [1], y)                # whisper extraction
-    breath = librosa.effects.preemphasis(breath)            # high-end crackle
-    breath = librosa.effects.bandpass(breath, sr=sr,
-                                      low=2000, high=8000)  # isolate breath band
+    breath = signal.lfilter([1, -1], [1], y, axis=0)        # whisper extraction
+    breath = librosa.effects.preemphasis(breath.T).T        # high-end crackle
+    breath = bandpass(breath, sr, 2000, 8000)               # isolate breath band
 
     if np.max(np.abs(breath)) > 0:
         breath /= np.max(np.abs(breath))
@@ -72,7 +79,7 @@ def _ghost_hq(audio_url):
     # ---------------------------------------
     # Harmonic layer — ghost warmth
     # ---------------------------------------
-    harm = librosa.effects.harmonic(y)
+    harm = _harmonic(y)
     harm *= 1.3
     if np.max(np.abs(harm)) > 0:
         harm /= np.max(np.abs(harm))
@@ -80,8 +87,8 @@ def _ghost_hq(audio_url):
     # ---------------------------------------
     # Pitch ghost — formant-shifted phantom tone
     # ---------------------------------------
-    shifted = librosa.effects.pitch_shift(y, sr=sr, n_steps=-3)
-    shifted = librosa.effects.preemphasis(shifted)
+    shifted = librosa.effects.pitch_shift(np.ascontiguousarray(y.T), sr=sr, n_steps=-3)
+    shifted = librosa.effects.preemphasis(shifted).T
     if np.max(np.abs(shifted)) > 0:
         shifted /= np.max(np.abs(shifted))
 
@@ -96,13 +103,18 @@ def _ghost_hq(audio_url):
     )
 
     ghost = ghost / max(1e-6, np.max(np.abs(ghost)))
+    return ghost.astype(np.float32)
 
-    # Save WAV
-    out_path = tempfile.mktemp(suffix=".wav")
-    sf.write(out_path, ghost.astype(np.float32), sr)
 
-    with open(out_path, "rb") as f:
-        return f.read()
+def _ghost_hq(audio_url):
+    # Download + load audio (cached), channels kept: (channels, samples) → (samples, channels)
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
+
+    ghost = ghost_mode_array(y.T, sr)
+    lap("dsp")
+
+    # float buffer: the response layer encodes it once, in the requested format
+    return ghost, sr
 
 
 # ------------------------------------------------------------
@@ -121,6 +133,7 @@ def apply_ghost_mode(audio_url, hq=False):
             hq = True
 
     if hq:
+        set_mode("hq")
         return _ghost_hq(audio_url)
 
     return _ghost_fast(audio_url)
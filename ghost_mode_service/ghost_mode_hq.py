@@ -1,11 +1,14 @@
 import librosa
 import soundfile as sf
-import tempfile
 import numpy as np
 import scipy.signal as signal
-import requests
 import os
 
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from metrics_service.metrics import lap
+from dsp_service.filters import bandpass
+
 
 def ghost_mode_hq(audio_url):
     """
@@ -14,16 +17,9 @@ def ghost_mode_hq(audio_url):
     """
 
     # --------------------------
-    # Download into temp file
-    # --------------------------
-    input_path = tempfile.mktemp(suffix=".wav")
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
-
-    # --------------------------
-    # Load audio
+    # Download + load audio (cached)
     # --------------------------
-    y, sr = librosa.load(input_path, sr=44100)
+    y, sr = load_audio(audio_url, sr=44100)
 
     # --------------------------
     # Breath layer (whisper)
@@ -33,7 +29,7 @@ def ghost_mode_hq(audio_url):
     breath = librosa.effects.preemphasis(breath)
 
     # Slight bandpass to isolate breathiness
-    breath = librosa.effects.bandpass(breath, sr=sr, low=2000, high=8000)
+    breath = bandpass(breath, sr, 2000, 8000)
 
     # Normalize breath layer
     if np.max(np.abs(breath)) > 0:
@@ -67,12 +63,14 @@ def ghost_mode_hq(audio_url):
     )
 
     ghost /= max(1e-8, np.max(np.abs(ghost)))
+    lap("dsp")
 
     # --------------------------
     # Save to temp file
     # --------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
+    out_path = scratch_path(".wav")
     sf.write(out_path, ghost.astype(np.float32), sr)
+    lap("encode")
 
     # --------------------------
     # Return raw bytes
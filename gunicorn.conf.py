@@ -0,0 +1,71 @@
+"""
+gunicorn -c gunicorn.conf.py app:app
+
+One gthread worker: job state, coalescing keys, admission control and
+metrics all live in the worker process, so a second worker would 404
+/jobs/<id> polls that land on it, report only its own /metrics and
+multiply the admission limits. Scale with GUNICORN_THREADS and the job
+pool (JOB_WORKERS) until that state is shared between workers.
+
+The app (and every fork-safe handler: librosa, scipy, pyloudnorm,
+numba-compiled code) is imported in the master before the fork, so a
+restarted worker starts warm.
+
+Overrides: GUNICORN_THREADS, PORT, GUNICORN_TIMEOUT,
+APP_PRELOAD=false (import in the worker instead), PRELOAD_HANDLERS.
+"""
+import os
+
+from system_service.resources import available_cores, available_memory_mb
+
+# -------------------------------------------------------------
+# SERVER
+# -------------------------------------------------------------
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = 1  # per-process job / metrics / admission state, see above
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 1200))
+
+preload_app = os.environ.setdefault("APP_PRELOAD", "true") == "true"
+
+# Read by app.py / job_queue.py when the app is imported (after this file)
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+# -------------------------------------------------------------
+# HOOKS
+# -------------------------------------------------------------
+def on_starting(server):
+    server.log.info(
+        f"[gunicorn] {workers} workers x {threads} threads "
+        f"(cores={available_cores()}, memory={available_memory_mb()}MB, preload={preload_app})"
+    )
+
+
+def when_ready(server):
+    """Master, after the app import and before the first fork."""
+    if not preload_app:
+        return
+
+    from loader_service.lazy_loader import preload
+
+    states = preload()
+    loaded = sorted(name for name, state in states.items() if state == "loaded")
+    server.log.info(f"[gunicorn] preloaded {len(loaded)} handlers: {', '.join(loaded)}")
+
+    # Shared, memory-mapped IR spectra: built once here, not per worker
+    try:
+        from reverb_service.impulse_reverb import prebuild_spectra
+        server.log.info(f"[gunicorn] IR spectra ready: {', '.join(prebuild_spectra())}")
+    except Exception as e:
+        server.log.warning(f"[gunicorn] IR spectra not prebuilt: {e}")
+
+
+def post_fork(server, worker):
+    """Threads started in the master do not survive fork — start them per worker."""
+    if not preload_app:
+        return
+
+    import app
+    app.start_background_tasks()
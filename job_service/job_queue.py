@@ -0,0 +1,230 @@
+import os
+import time
+import uuid
+import threading
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from scratch_service.scratch import request_scope
+from metrics_service import metrics
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Long-running handlers (Demucs, HQ mastering, SoVITS) run in a
+# bounded process pool so the web worker stays free for /health
+# and short requests. Under gunicorn every web worker owns a pool, so
+# the default splits the spare cores between WEB_CONCURRENCY workers.
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+JOB_WORKERS = int(os.environ.get(
+    "JOB_WORKERS",
+    max(1, ((os.cpu_count() or 2) - 1) // max(1, WEB_CONCURRENCY))
+))
+JOB_MAX_PENDING = int(os.environ.get("JOB_MAX_PENDING", 32))
+JOB_TTL_SECONDS = int(os.environ.get("JOB_TTL_SECONDS", 3600))
+
+_executor = None
+_manager = None
+_progress = None
+_jobs = {}
+_lock = threading.Lock()
+
+# Set inside a pool worker while a job runs (see _run_job)
+_current_job_id = None
+_current_progress = None
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _get_executor():
+    """Creates the process pool + shared progress dict on first use."""
+    global _executor, _manager, _progress
+
+    if _executor is None:
+        _manager = multiprocessing.Manager()
+        _progress = _manager.dict()
+        _executor = ProcessPoolExecutor(max_workers=JOB_WORKERS)
+
+    return _executor
+
+
+# -------------------------------------------------------------
+# WORKER SIDE
+# -------------------------------------------------------------
+def _run_job(job_id, kind, progress, fn, args, kwargs):
+    """
+    Runs inside a pool process. Returns (result, metric events) so
+    the web process can fold the worker's stage timings into /metrics.
+    """
+    global _current_job_id, _current_progress
+
+    _current_job_id = job_id
+    _current_progress = progress
+    if job_id is not None:
+        progress[job_id] = 0.0
+
+    try:
+        with metrics.capture() as events, request_scope():
+            metrics.start_request(f"job:{kind}")
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                metrics.end_request()
+        if job_id is not None:
+            progress[job_id] = 1.0
+        return result, events
+    finally:
+        _current_job_id = None
+        _current_progress = None
+
+
+def report_progress(fraction):
+    """
+    Called by handlers to publish progress (0–1).
+    No-op when the handler is not running as a job.
+    """
+    if _current_progress is None or _current_job_id is None:
+        return
+
+    try:
+        _current_progress[_current_job_id] = float(min(1.0, max(0.0, fraction)))
+    except Exception:
+        pass
+
+
+# -------------------------------------------------------------
+# SERVER SIDE
+# -------------------------------------------------------------
+def _expire_jobs():
+    now = time.time()
+    for job_id in list(_jobs):
+        job = _jobs[job_id]
+        finished_at = job["finished_at"]
+        if finished_at is not None and now - finished_at > JOB_TTL_SECONDS:
+            _jobs.pop(job_id, None)
+            _progress.pop(job_id, None)
+
+
+def queue_depth():
+    """Number of submitted jobs that have not finished yet."""
+    with _lock:
+        return sum(1 for job in _jobs.values() if not job["future"].done())
+
+
+def submit_job(kind, fn, *args, coalesce_key=None, **kwargs):
+    """
+    Queues fn(*args, **kwargs) on the process pool.
+    fn must be a module-level (picklable) function.
+    Returns the job id. With coalesce_key, an unfinished job submitted
+    with the same key is reused and its id returned instead.
+    """
+    executor = _get_executor()
+
+    with _lock:
+        _expire_jobs()
+
+        if coalesce_key is not None:
+            for job in _jobs.values():
+                if job.get("key") == coalesce_key and not job["future"].done():
+                    metrics.inc("coalesced_requests", help_text="Requests served by an identical in-flight call",
+                                operation=f"job:{kind}")
+                    return job["id"]
+
+        pending = sum(1 for job in _jobs.values() if not job["future"].done())
+        if pending >= JOB_MAX_PENDING:
+            raise JobQueueFull(f"job queue full ({pending} pending)")
+
+        job_id = uuid.uuid4().hex
+        future = executor.submit(_run_job, job_id, kind, _progress, fn, args, kwargs)
+
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "key": coalesce_key,
+            "future": future,
+            "submitted_at": time.time(),
+            "finished_at": None,
+        }
+        _jobs[job_id] = job
+
+    def _mark_finished(done):
+        job["finished_at"] = time.time()
+        if done.exception() is None:
+            job["result"], events = done.result()
+            metrics.replay(events)
+
+    future.add_done_callback(_mark_finished)
+    return job_id
+
+
+def map_jobs(kind, calls):
+    """
+    Runs [(fn, args, kwargs)] across the pool and blocks until all
+    finish. Returns [(result, error)] in input order; one failing call
+    does not affect the others. These are not tracked as jobs (no ids,
+    not counted against JOB_MAX_PENDING).
+    """
+    executor = _get_executor()
+    futures = [
+        executor.submit(_run_job, None, kind, _progress, fn, args, kwargs)
+        for fn, args, kwargs in calls
+    ]
+
+    out = []
+    for future in futures:
+        try:
+            result, events = future.result()
+        except Exception as e:
+            out.append((None, "".join(traceback.format_exception_only(type(e), e)).strip()))
+            continue
+        metrics.replay(events)
+        out.append((result, None))
+    return out
+
+
+def get_job(job_id):
+    """
+    Returns a JSON-safe status dict for a job, or None if unknown.
+    {
+        "id": ..., "kind": ...,
+        "status": "queued" | "running" | "done" | "failed",
+        "progress": 0–1,
+        "result": ... (when done),
+        "error": ... (when failed)
+    }
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+
+    if job is None:
+        return None
+
+    future = job["future"]
+    info = {
+        "id": job["id"],
+        "kind": job["kind"],
+        "submitted_at": job["submitted_at"],
+        "finished_at": job["finished_at"],
+    }
+
+    if future.done():
+        exc = future.exception()
+        if exc is not None:
+            info["status"] = "failed"
+            info["progress"] = 1.0
+            info["error"] = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+        else:
+            info["status"] = "done"
+            info["progress"] = 1.0
+            info["result"] = job.get("result", future.result()[0])
+    elif job_id in _progress:
+        info["status"] = "running"
+        info["progress"] = float(_progress.get(job_id, 0.0))
+    else:
+        info["status"] = "queued"
+        info["progress"] = 0.0
+
+    return info
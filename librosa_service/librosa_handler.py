@@ -1,30 +1,7 @@
 import librosa
 import numpy as np
-import soundfile as sf
-import ffmpeg
-import tempfile
-import requests
 
-def download_audio_to_wav(url):
-    """Download audio from URL → convert to WAV → return path."""
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-
-    temp_input = tempfile.NamedTemporaryFile(delete=False, suffix=".tmp")
-    temp_input.write(response.content)
-    temp_input.flush()
-
-    temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-
-    (
-        ffmpeg
-        .input(temp_input.name)
-        .output(temp_wav.name, format="wav", ac=1, ar=44100)
-        .overwrite_output()
-        .run(quiet=True)
-    )
-
-    return temp_wav.name
+from fetch_service.audio_cache import load_audio
 
 
 def detect_key(y, sr):
@@ -57,10 +34,8 @@ def analyze_audio_with_librosa(audio_url):
     Runs on Render without Essentia.
     """
     try:
-        wav_path = download_audio_to_wav(audio_url)
-
-        # Load audio
-        y, sr = librosa.load(wav_path, sr=44100, mono=True)
+        # Fetch + decode in memory (no intermediate WAV transcode)
+        y, sr = load_audio(audio_url, sr=44100, mono=True)
 
         # Duration
         duration = librosa.get_duration(y=y, sr=sr)
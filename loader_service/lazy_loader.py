@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+import importlib
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Comma-separated handler names to import in the background after
+# boot, e.g. WARMUP_HANDLERS="run_master_ai,apply_ghost_mode"
+WARMUP_HANDLERS = [
+    name.strip()
+    for name in os.environ.get("WARMUP_HANDLERS", "").split(",")
+    if name.strip()
+]
+
+# Handlers imported in the gunicorn master before forking (preload_app)
+# so workers share their pages copy-on-write. Empty → every handler
+# whose engine is in FORK_SAFE_ENGINES. Engines that start thread pools
+# at load time (torch, crepe/TensorFlow, CTranslate2) are left to each
+# worker: threads do not survive fork.
+PRELOAD_HANDLERS = [
+    name.strip()
+    for name in os.environ.get("PRELOAD_HANDLERS", "").split(",")
+    if name.strip()
+]
+FORK_SAFE_ENGINES = ("librosa", "pyloudnorm", "ffmpeg")
+
+_registry = {}
+_warmup_state = {"started": False, "finished": False}
+
+
+class LazyHandler:
+    """
+    Stands in for a handler function; imports module_path on the first
+    call (or warm-up) so heavy deps like torch / crepe / numba are only
+    paid for by workers that actually use them.
+
+    fallback: called instead when the module cannot be imported.
+    """
+
+    def __init__(self, name, module_path, attr, engine, fallback=None):
+        self.name = name
+        self.module_path = module_path
+        self.attr = attr
+        self.engine = engine
+        self.fallback = fallback
+
+        self._fn = None
+        self._error = None
+        self._load_seconds = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._fn is not None:
+            return self._fn
+
+        with self._lock:
+            if self._fn is None and self._error is None:
+                start = time.time()
+                try:
+                    module = importlib.import_module(self.module_path)
+                    self._fn = getattr(module, self.attr)
+                except Exception as e:
+                    self._error = f"{type(e).__name__}: {e}"
+                    print(f"[lazy] {self.module_path}.{self.attr} unavailable: {self._error}")
+                self._load_seconds = time.time() - start
+
+        if self._fn is not None:
+            return self._fn
+        if self.fallback is not None:
+            return self.fallback
+        raise ImportError(f"{self.name} unavailable: {self._error}")
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def status(self):
+        if self._fn is not None:
+            state = "loaded"
+        elif self._error is not None:
+            state = "fallback" if self.fallback is not None else "failed"
+        else:
+            state = "not_loaded"
+
+        info = {"engine": self.engine, "state": state}
+        if self._load_seconds is not None:
+            info["load_seconds"] = round(self._load_seconds, 3)
+        if self._error is not None:
+            info["error"] = self._error
+        return info
+
+
+def lazy(name, module_path, attr=None, engine=None, fallback=None):
+    """Registers (or returns) the lazy handler called name."""
+    if name not in _registry:
+        _registry[name] = LazyHandler(
+            name,
+            module_path,
+            attr or name,
+            engine or module_path.split(".")[0],
+            fallback
+        )
+    return _registry[name]
+
+
+def handler_status():
+    return {name: h.status() for name, h in _registry.items()}
+
+
+def loaded_engines():
+    return sorted({h.engine for h in _registry.values() if h.status()["state"] == "loaded"})
+
+
+def warmup_state():
+    return dict(_warmup_state)
+
+
+def preload(names=None):
+    """
+    Imports handlers synchronously (gunicorn master, before fork).
+    Returns {name: state}.
+    """
+    if names is None:
+        names = PRELOAD_HANDLERS or [
+            name for name, h in _registry.items() if h.engine in FORK_SAFE_ENGINES
+        ]
+
+    for name in names:
+        handler = _registry.get(name)
+        if handler is None:
+            print(f"[lazy] unknown preload handler: {name}")
+            continue
+        try:
+            handler.load()
+        except ImportError:
+            pass
+
+    return {name: _registry[name].status()["state"] for name in names if name in _registry}
+
+
+def start_warmup(names=None):
+    """Imports the given handlers (default WARMUP_HANDLERS) on a background thread."""
+    names = WARMUP_HANDLERS if names is None else names
+
+    if _warmup_state["started"]:
+        return
+
+    _warmup_state["started"] = True
+
+    def _run():
+        for name in names:
+            handler = _registry.get(name)
+            if handler is None:
+                print(f"[lazy] unknown warm-up handler: {name}")
+                continue
+            try:
+                handler.load()
+            except ImportError:
+                pass
+        _warmup_state["finished"] = True
+
+    threading.Thread(target=_run, name="handler-warmup", daemon=True).start()
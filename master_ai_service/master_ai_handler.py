@@ -1,23 +1,26 @@
 import os
-import tempfile
-import requests
-import subprocess
 import numpy as np
-import soundfile as sf
-import librosa
-import pyloudnorm as pyln
 import scipy.signal as signal
 
+from fetch_service.fetcher import fetch
+from fetch_service.audio_cache import load_audio
+from fetch_service.result_cache import cached_result
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg
+from metrics_service.metrics import lap, set_mode
+from dsp_service.filters import Crossover
+from dsp_service.block_engine import (
+    iter_blocks, spool, collect, write_blocks, compensated, RmsMeter, LoudnessMeter
+)
+from dsp_service.dynamics import Compressor, Limiter
+
 
 # ------------------------------------------------------------
 # FAST MODE — Loudnorm + FFmpeg Limiter
 # ------------------------------------------------------------
 def _master_fast(audio_url):
-    input_path = tempfile.mktemp(suffix=".wav")
-    output_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    output_path = scratch_path(".wav")
 
     # Simple loudnorm
     cmd = [
@@ -27,7 +30,7 @@ def _master_fast(audio_url):
         output_path
     ]
 
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd)
 
     with open(output_path, "rb") as f:
         return f.read()
@@ -36,118 +39,139 @@ def _master_fast(audio_url):
 # ------------------------------------------------------------
 # HQ MODE — AI-Style Mastering Chain (CPU DSP)
 # ------------------------------------------------------------
-def _master_hq(audio_url):
-    """
-    HQ Mastering:
-    - multi-band EQ
-    - saturation
-    - multiband compression
-    - true-peak limiting
-    """
+# One LR4 crossover pass: <180 | 180–400 | 400–2.5k | 2.5k–8k | >8k
+MASTER_CROSSOVER = (180, 400, 2500, 8000)
 
-    # ---------------------------
-    # 1. Download + Load Audio
-    # ---------------------------
-    input_path = tempfile.mktemp(suffix=".wav")
+# Compressor per band (low, low-mid, hi-mid, air): ratio, attack ms, release ms
+BAND_COMPRESSION = (
+    (2.0, 30.0, 250.0),
+    (1.7, 20.0, 180.0),
+    (1.55, 10.0, 120.0),
+    (1.45, 5.0, 80.0),
+)
 
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+# Band thresholds sit this far above each band's RMS level, so the
+# compressors catch transients the same way at any input level
+BAND_THRESHOLD_DB = 6.0
 
-    y, sr = librosa.load(input_path, sr=44100)
+TARGET_LUFS = -10.5  # modern metalcore target
+TRUE_PEAK_CEILING_DB = -1.0
 
-    # Convert to float32
-    y = y.astype(np.float32)
 
+def _multiband_eq(xo, block):
+    """Multi-band EQ on one block → (eq_master, (low, lowmid, hi_mid, air))."""
+    low, lowmid, _, hi_mid, air = xo(block)
 
-    # ---------------------------
-    # 2. Multi-band EQ
-    # ---------------------------
     # Low-end tightening (around 80–120 Hz)
-    low = librosa.effects.bandpass(y, sr=sr, low=60, high=180)
     low *= 0.85
 
     # Low-mids cleanup (mud reduction 200–400 Hz)
-    lowmid = librosa.effects.bandpass(y, sr=sr, low=200, high=400)
     lowmid *= 0.75
 
     # Presence boost (3 kHz region)
-    hi_mid = librosa.effects.bandpass(y, sr=sr, low=2500, high=4500)
     hi_mid *= 1.25
 
     # Air shelf (10–12 kHz)
-    air = librosa.effects.bandpass(y, sr=sr, low=8000, high=14000)
     air *= 1.35
 
     # Reconstruct EQ curve
     eq_master = (
-        (y * 0.75) +
+        (block * 0.75) +
         (low * 0.15) +
         (lowmid * 0.10) +
         (hi_mid * 0.20) +
         (air * 0.25)
     )
+    return eq_master, (low, lowmid, hi_mid, air)
 
 
+def master_ai_blocks(y, sr, block_size=None):
+    """
+    HQ Mastering as a block stream:
+    - multi-band EQ
+    - saturation
+    - multiband compression
+    - loudness normalization
+    - lookahead true-peak limiting
+    Three passes over y (band levels → compressed mix → normalized,
+    limited out); working memory is a few blocks whatever the track
+    length.
+    """
     # ---------------------------
-    # 3. Soft Tape Saturation
+    # 1. Band levels (compressor thresholds)
     # ---------------------------
-    sat = np.tanh(eq_master * 2.0) * 0.7 + eq_master * 0.3
-
+    xo = Crossover(sr, MASTER_CROSSOVER)
+    band_levels = [RmsMeter() for _ in BAND_COMPRESSION]
+    for block in iter_blocks(y, block_size):
+        _, bands = _multiband_eq(xo, block)
+        for meter, band in zip(band_levels, bands):
+            meter(band)
+
+    compressors = [
+        Compressor(sr, meter.level_db() + BAND_THRESHOLD_DB, ratio, attack, release)
+        for meter, (ratio, attack, release) in zip(band_levels, BAND_COMPRESSION)
+    ]
 
     # ---------------------------
-    # 4. Multi-band compression
+    # 2. Saturation + multiband compression (spooled)
     # ---------------------------
-    def compress_band(band, amount=0.7):
-        thr = 0.6 * np.max(np.abs(band))
-        comp = np.where(
-            np.abs(band) > thr,
-            thr + (np.abs(band) - thr) * amount,
-            band
-        )
-        return comp * np.sign(band)
-
-    low_c = compress_band(low, amount=0.5)
-    mid_c = compress_band(lowmid, amount=0.6)
-    high_c = compress_band(hi_mid, amount=0.65)
-    air_c = compress_band(air, amount=0.7)
-
-    multi_comp = (
-        sat * 0.6 +
-        low_c * 0.2 +
-        mid_c * 0.2 +
-        high_c * 0.25 +
-        air_c * 0.3
-    )
+    xo = Crossover(sr, MASTER_CROSSOVER)
+    multi_comp = spool(y.shape)
+    loudness = LoudnessMeter(sr)
 
+    pos = 0
+    for block in iter_blocks(y, block_size):
+        eq_master, bands = _multiband_eq(xo, block)
 
-    # ---------------------------
-    # 5. True Peak Limiter
-    # ---------------------------
-    maxamp = max(1e-8, np.max(np.abs(multi_comp)))
-    limited = (multi_comp / maxamp) * 0.98
+        # Soft Tape Saturation
+        sat = np.tanh(eq_master * 2.0) * 0.7 + eq_master * 0.3
 
+        low_c, mid_c, high_c, air_c = (
+            compressor(band) for compressor, band in zip(compressors, bands)
+        )
+
+        mixed = (
+            sat * 0.6 +
+            low_c * 0.2 +
+            mid_c * 0.2 +
+            high_c * 0.25 +
+            air_c * 0.3
+        )
+        multi_comp[pos:pos + len(block)] = loudness(mixed)
+        pos += len(block)
 
     # ---------------------------
-    # 6. Loudness Normalization (pyloudnorm)
+    # 3. Loudness Normalization + True Peak Limiter
     # ---------------------------
-    meter = pyln.Meter(sr)
-    loud = meter.integrated_loudness(limited)
+    gain = 10.0 ** ((TARGET_LUFS - loudness.integrated()) / 20.0)
+    limiter = Limiter(sr, ceiling_db=TRUE_PEAK_CEILING_DB)
+
+    normalized = (block * gain for block in iter_blocks(multi_comp, block_size))
+    for block in compensated(limiter, normalized):
+        # Safety clip
+        yield np.clip(block, -1.0, 1.0)
 
-    target_lufs = -10.5  # modern metalcore target
-    loud_norm = pyln.normalize.loudness(limited, loud, target_lufs)
 
-    # Safety clip
-    loud_norm = np.clip(loud_norm, -1.0, 1.0).astype(np.float32)
+def master_ai_array(y, sr):
+    """float32 in → float32 out, same shape (used by /pipeline)."""
+    y = np.asarray(y, dtype=np.float32)
+    return collect(master_ai_blocks(y, sr), y.shape)
 
 
+@cached_result("master_ai_hq", version=5, file_ext=".wav")
+def _master_hq(audio_url):
     # ---------------------------
-    # 7. Write Mastered File
+    # Download + decode (memory-mapped, streamed from here on);
+    # channels kept: (channels, samples) → (samples, channels) view
     # ---------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
-    sf.write(out_path, loud_norm, sr)
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
+    channels = 1 if y.ndim == 1 else y.shape[0]
 
-    with open(out_path, "rb") as f:
-        return f.read()
+    out_path = write_blocks(master_ai_blocks(y.T, sr), scratch_path(".wav"), sr, channels)
+    lap("dsp")
+
+    # rendered file by path: the cache and publish step copy it, never load it
+    return out_path
 
 
 # ------------------------------------------------------------
@@ -161,6 +185,7 @@ def run_master_ai(audio_url, preset=None):
     # Determine if HQ requested via preset or query args
     if isinstance(preset, str):
         if preset.lower() in ["hq", "librosa", "true", "1", "master"]:
+            set_mode("hq")
             return _master_hq(audio_url)
 
     # Default fast mode
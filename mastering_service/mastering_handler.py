@@ -1,11 +1,15 @@
 import os
 import tempfile
-import requests
 import soundfile as sf
 import numpy as np
 import pyloudnorm as pyln
 
+from fetch_service.fetcher import fetch
+from fetch_service.result_cache import cached_result
+from metrics_service.metrics import lap
 
+
+@cached_result("run_mastering", version=1)
 def run_mastering(audio_url):
     """
     Input: audio_url
@@ -13,13 +17,10 @@ def run_mastering(audio_url):
     """
 
     with tempfile.TemporaryDirectory() as tmpdir:
-        input_path = os.path.join(tmpdir, "input.wav")
-
         # ------------------------------
         # 1. Download audio
         # ------------------------------
-        with open(input_path, "wb") as f:
-            f.write(requests.get(audio_url).content)
+        input_path = fetch(audio_url)
 
         # ------------------------------
         # 2. Load audio
@@ -43,12 +44,14 @@ def run_mastering(audio_url):
 
         # Keep values in safe range
         normalized = np.clip(normalized, -0.99, 0.99).astype(np.float32)
+        lap("dsp")
 
         # ------------------------------
         # 5. Write mastered file
         # ------------------------------
         output_path = os.path.join(tmpdir, "master.wav")
         sf.write(output_path, normalized, rate)
+        lap("encode")
 
         # ------------------------------
         # 6. Return raw bytes
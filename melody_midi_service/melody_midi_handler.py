@@ -1,30 +1,26 @@
-import tempfile
-import requests
 import numpy as np
 import soundfile as sf
-import librosa
 import crepe
 from midiutil import MIDIFile
 import scipy.signal as signal
 
+from fetch_service.audio_cache import load_audio
+from scratch_service.scratch import scratch_path
+from metrics_service.metrics import set_mode
+
 
 # ------------------------------------------------------------
 # FAST MODE (current behavior)
 # ------------------------------------------------------------
 def _melody_fast(audio_url):
-    input_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
-
-    audio, sr = librosa.load(input_path, sr=16000)
+    audio, sr = load_audio(audio_url, sr=16000)
 
     time, freq, conf, _ = crepe.predict(audio, sr, viterbi=True)
 
     valid = freq[(conf > 0.6)]
     times_valid = time[(conf > 0.6)]
 
-    output_path = tempfile.mktemp(suffix=".mid")
+    output_path = scratch_path(".mid")
     mf = MIDIFile(1)
     mf.addTempo(0, 0, 120)
 
@@ -47,14 +43,10 @@ def _melody_fast(audio_url):
 # HQ MODE (full AI-grade smoothing + CREPE full)
 # ------------------------------------------------------------
 def _melody_hq(audio_url):
-    input_path = tempfile.mktemp(suffix=".wav")
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
-
     # -------------------------------------------------------
     # Load audio
     # -------------------------------------------------------
-    audio, sr = librosa.load(input_path, sr=16000)
+    audio, sr = load_audio(audio_url, sr=16000)
 
     # CREPE full precision
     time, freq, conf, _ = crepe.predict(
@@ -95,7 +87,7 @@ def _melody_hq(audio_url):
     # -------------------------------------------------------
     # Write clean MIDI events
     # -------------------------------------------------------
-    output_path = tempfile.mktemp(suffix=".mid")
+    output_path = scratch_path(".mid")
     mf = MIDIFile(1)
     mf.addTempo(0, 0, 120)
 
@@ -135,7 +127,11 @@ def voice_to_midi(audio_url, hq=False):
     Called by app.py
     hq=True → run HQ melody extractor
     """
-    if isinstance(hq, str) and hq.lower() in ["1", "true", "yes", "y", "hq"]:
+    if isinstance(hq, str):
+        hq = hq.lower() in ["1", "true", "yes", "y", "hq"]
+
+    if hq:
+        set_mode("hq")
         return _melody_hq(audio_url)
 
     return _melody_fast(audio_url)
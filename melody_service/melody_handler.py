@@ -1,25 +1,20 @@
-import tempfile, os, base64, requests, librosa, numpy as np
+import base64, numpy as np
 from flask import jsonify
 import crepe
 
-def extract_melody(audio_url):
-    with tempfile.TemporaryDirectory() as tmpdir:
-        path = os.path.join(tmpdir, "audio.wav")
-
-        # Download
-        r = requests.get(audio_url)
-        with open(path, "wb") as f:
-            f.write(r.content)
+from fetch_service.audio_cache import load_audio
 
-        y, sr = librosa.load(path, sr=16000)
+def extract_melody(audio_url):
+    # Download + decode (cached)
+    y, sr = load_audio(audio_url, sr=16000)
 
-        # CREPE for pitch contour
-        time, frequency, confidence, _ = crepe.predict(y, sr, viterbi=True)
+    # CREPE for pitch contour
+    time, frequency, confidence, _ = crepe.predict(y, sr, viterbi=True)
 
-        melody = {
-            "time": time.tolist(),
-            "frequency": frequency.tolist(),
-            "confidence": confidence.tolist()
-        }
+    melody = {
+        "time": time.tolist(),
+        "frequency": frequency.tolist(),
+        "confidence": confidence.tolist()
+    }
 
-        return jsonify({"melody": melody, "success": True})
+    return jsonify({"melody": melody, "success": True})
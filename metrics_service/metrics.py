@@ -0,0 +1,244 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 4e6, 16e6, 64e6, 256e6, 1e9)
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# name → {"help", "type", "buckets", "series": {labels: value | [counts, sum, count]}}
+_metrics = {}
+
+# Gauges computed on scrape: name → (help, fn returning {labels: value})
+_collectors = {}
+
+
+def _register(name, kind, help_text, buckets=None):
+    if name not in _metrics:
+        _metrics[name] = {"help": help_text, "type": kind, "buckets": buckets, "series": {}}
+    return _metrics[name]
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+# -------------------------------------------------------------
+# PRIMITIVES
+# -------------------------------------------------------------
+def observe(name, value, help_text="", buckets=SECONDS_BUCKETS, **labels):
+    """Adds one sample to a histogram."""
+    capture = getattr(_local, "capture", None)
+    if capture is not None:
+        capture.append(("observe", name, value, help_text, buckets, labels))
+
+    with _lock:
+        metric = _register(name, "histogram", help_text, buckets)
+        series = metric["series"].setdefault(_key(labels), [[0] * len(buckets), 0.0, 0])
+        idx = bisect.bisect_left(buckets, value)
+        if idx < len(buckets):
+            series[0][idx] += 1
+        series[1] += value
+        series[2] += 1
+
+
+def inc(name, amount=1, help_text="", **labels):
+    """Increments a counter."""
+    capture = getattr(_local, "capture", None)
+    if capture is not None:
+        capture.append(("inc", name, amount, help_text, None, labels))
+
+    with _lock:
+        metric = _register(name, "counter", help_text)
+        key = _key(labels)
+        metric["series"][key] = metric["series"].get(key, 0) + amount
+
+
+def register_gauge(name, help_text, fn):
+    """fn() → {labels_tuple_or_dict: value} or a plain number, read at scrape time."""
+    _collectors[name] = (help_text, fn)
+
+
+# -------------------------------------------------------------
+# REQUEST / STAGE TIMING
+# -------------------------------------------------------------
+def start_request(endpoint, mode="fast"):
+    _local.endpoint = endpoint
+    _local.mode = mode
+    _local.started = time.perf_counter()
+    _local.mark = _local.started
+
+
+def end_request():
+    started = getattr(_local, "started", None)
+    if started is not None:
+        observe(
+            "request_seconds", time.perf_counter() - started,
+            "End-to-end request latency",
+            endpoint=current_endpoint(), mode=current_mode()
+        )
+    _local.started = None
+    _local.endpoint = None
+    _local.mode = None
+
+
+def set_mode(mode):
+    """Handlers call set_mode("hq") when they take the HQ path."""
+    _local.mode = mode
+
+
+def current_endpoint():
+    return getattr(_local, "endpoint", None) or "none"
+
+
+def current_mode():
+    return getattr(_local, "mode", None) or "fast"
+
+
+def _record_stage(stage_name, start, end, nbytes=None):
+    labels = {"endpoint": current_endpoint(), "mode": current_mode(), "stage": stage_name}
+    observe("stage_seconds", end - start, "Time spent per processing stage", **labels)
+    if nbytes is not None:
+        observe("stage_bytes", nbytes, "Bytes handled per processing stage", BYTES_BUCKETS, **labels)
+
+    timeline = getattr(_local, "timeline", None)
+    if timeline is not None:
+        origin = getattr(_local, "started", None) or start
+        timeline.append({
+            "stage": stage_name,
+            "start": round(start - origin, 6),
+            "seconds": round(end - start, 6),
+            "bytes": nbytes,
+        })
+
+
+def start_timeline():
+    """Starts collecting every stage recorded in this thread, in order (?profile=1)."""
+    _local.timeline = []
+
+
+def stop_timeline():
+    entries = getattr(_local, "timeline", None)
+    _local.timeline = None
+    return entries or []
+
+
+@contextmanager
+def stage(stage_name, nbytes=None):
+    """
+    with stage("download"):
+        ...
+    Yields a dict; set info["bytes"] inside the block to record size.
+    """
+    info = {"bytes": nbytes}
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        end = time.perf_counter()
+        _record_stage(stage_name, start, end, info["bytes"])
+        _local.mark = end
+
+
+def lap(stage_name, nbytes=None):
+    """
+    Records the time since the previous stage/lap ended as stage_name.
+    Lets long handlers mark stage boundaries without re-indenting.
+    """
+    now = time.perf_counter()
+    mark = getattr(_local, "mark", None)
+    if mark is not None:
+        _record_stage(stage_name, mark, now, nbytes)
+    _local.mark = now
+
+
+@contextmanager
+def capture():
+    """
+    Collects every observation made in this thread (used by job-pool
+    workers, whose metrics are replayed into the web process).
+    """
+    events = []
+    previous = getattr(_local, "capture", None)
+    _local.capture = events
+    try:
+        yield events
+    finally:
+        _local.capture = previous
+
+
+def replay(events):
+    for kind, name, value, help_text, buckets, labels in events:
+        if kind == "observe":
+            observe(name, value, help_text, buckets, **labels)
+        else:
+            inc(name, value, help_text, **labels)
+
+
+# -------------------------------------------------------------
+# PROMETHEUS TEXT FORMAT
+# -------------------------------------------------------------
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+        for k, v in labels
+    )
+    return "{" + inner + "}"
+
+
+def _fmt_value(v):
+    if isinstance(v, float) and v.is_integer():
+        return repr(v)
+    return str(v)
+
+
+def render_prometheus():
+    lines = []
+
+    with _lock:
+        for name in sorted(_metrics):
+            metric = _metrics[name]
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+
+            for key, value in sorted(metric["series"].items()):
+                if metric["type"] == "counter":
+                    lines.append(f"{name}_total{_fmt_labels(key)} {_fmt_value(value)}")
+                    continue
+
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(metric["buckets"], counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{_fmt_labels(key + (('le', repr(float(bound))),))} {cumulative}")
+                lines.append(f"{name}_bucket{_fmt_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+                lines.append(f"{name}_count{_fmt_labels(key)} {count}")
+
+    for name in sorted(_collectors):
+        help_text, fn = _collectors[name]
+        try:
+            values = fn()
+        except Exception as e:
+            print(f"[metrics] gauge {name} failed: {e}")
+            continue
+
+        if not isinstance(values, dict):
+            values = {(): values}
+
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in values.items():
+            if isinstance(labels, dict):
+                labels = _key(labels)
+            lines.append(f"{name}{_fmt_labels(labels)} {_fmt_value(value)}")
+
+    return "\n".join(lines) + "\n"
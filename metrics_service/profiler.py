@@ -0,0 +1,123 @@
+import os
+import time
+import uuid
+import cProfile
+import pstats
+import threading
+from collections import OrderedDict
+
+from metrics_service import metrics
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# ?profile=1 is ignored unless this is set — profiling slows the
+# request down several times and exposes source paths.
+PROFILING_ENABLED = os.environ.get("ENABLE_PROFILING", "false").lower() == "true"
+PROFILE_TOP_N = int(os.environ.get("PROFILE_TOP_N", "25"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+
+_local = threading.local()
+
+# cProfile hooks the interpreter globally, so only one request is
+# profiled at a time; concurrent ?profile=1 requests run unprofiled.
+_profiler_lock = threading.Lock()
+
+# Recent reports, for responses that are not JSON (files, streams)
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+
+# -------------------------------------------------------------
+# REQUEST HOOKS
+# -------------------------------------------------------------
+def begin_profile(sort="self"):
+    """
+    Starts a deterministic profiler + stage timeline for this thread.
+    Only code running on the request thread is profiled (not the
+    fetch_many download threads or job-pool workers).
+    """
+    if not PROFILING_ENABLED:
+        return False
+
+    _local.sort = sort
+    _local.started = time.perf_counter()
+    metrics.start_timeline()
+
+    if not _profiler_lock.acquire(blocking=False):
+        _local.profiler = None
+        return True
+
+    profiler = cProfile.Profile()
+    _local.profiler = profiler
+    profiler.enable()
+    return True
+
+
+def finish_profile():
+    """Stops profiling and returns the report (None if nothing was profiled)."""
+    started = getattr(_local, "started", None)
+    if started is None:
+        return None
+
+    profiler = _local.profiler
+    if profiler is not None:
+        profiler.disable()
+        _profiler_lock.release()
+
+    report = {
+        "id": uuid.uuid4().hex,
+        "wall_seconds": round(time.perf_counter() - started, 6),
+        "timeline": metrics.stop_timeline(),
+    }
+    if profiler is not None:
+        report["hot_functions"] = _rank(profiler, _local.sort)
+    else:
+        report["hot_functions"] = []
+        report["note"] = "another request was being profiled; timeline only"
+
+    _local.started = None
+    _local.profiler = None
+
+    with _reports_lock:
+        _reports[report["id"]] = report
+        while len(_reports) > PROFILE_KEEP:
+            _reports.popitem(last=False)
+
+    return report
+
+
+def get_report(report_id):
+    with _reports_lock:
+        return _reports.get(report_id)
+
+
+# -------------------------------------------------------------
+# REPORT
+# -------------------------------------------------------------
+def _describe(filename, lineno, funcname):
+    if filename == "~":
+        return funcname
+    short = "/".join(filename.replace("\\", "/").split("/")[-2:])
+    return f"{funcname} ({short}:{lineno})"
+
+
+def _rank(profiler, sort):
+    """
+    sort="self": time spent in the function body itself (finds
+    per-sample Python loops); sort="cumulative": including callees.
+    """
+    stats = pstats.Stats(profiler).stats
+
+    rows = []
+    for (filename, lineno, funcname), (_, ncalls, tottime, cumtime, _) in stats.items():
+        rows.append({
+            "function": _describe(filename, lineno, funcname),
+            "calls": ncalls,
+            "self_seconds": round(tottime, 6),
+            "cumulative_seconds": round(cumtime, 6),
+        })
+
+    key = "cumulative_seconds" if sort == "cumulative" else "self_seconds"
+    rows.sort(key=lambda r: r[key], reverse=True)
+    return rows[:PROFILE_TOP_N]
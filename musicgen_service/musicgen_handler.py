@@ -1,25 +1,23 @@
-import tempfile
 import requests
 import numpy as np
-import soundfile as sf
 from instrumental_master_service.instrumental_master_hq import master_instrumental_hq
 from musicgen_service.musicgen_handler import generate_music  # your existing
+from scratch_service.scratch import scratch_path
+from audio_io_service.audio_io import decode, encode
+from dsp_service.filters import crossover
 
 
 def enhance_musicgen(audio_bytes):
     """HQ cleanup pass."""
-    tmp = tempfile.mktemp(suffix=".wav")
-    with open(tmp, "wb") as f:
-        f.write(audio_bytes)
+    y, sr = decode(audio_bytes, sr=None, mono=False)
+    if y.ndim > 1:
+        y = y.T  # (samples, channels)
 
-    y, sr = sf.read(tmp)
-    y = y.astype(np.float32)
-
-    # spectral tilt
-    import librosa
-    lowmid = librosa.effects.bandpass(y, sr=sr, low=200, high=600) * 0.65
-    presence = librosa.effects.bandpass(y, sr=sr, low=2500, high=5000) * 1.3
-    air = librosa.effects.bandpass(y, sr=sr, low=10000, high=14000) * 1.4
+    # spectral tilt (one LR4 crossover pass: 200–600 | 2.5k–5k | 10k–14k)
+    bands = crossover(y, sr, (200, 600, 2500, 5000, 10000, 14000))
+    lowmid = bands[1] * 0.65
+    presence = bands[3] * 1.3
+    air = bands[5] * 1.4
 
     cleaned = (
         y * 0.8
@@ -30,11 +28,7 @@ def enhance_musicgen(audio_bytes):
 
     cleaned /= max(1e-6, np.max(np.abs(cleaned)))
 
-    out_tmp = tempfile.mktemp(suffix=".wav")
-    sf.write(out_tmp, cleaned, sr)
-
-    with open(out_tmp, "rb") as f:
-        return f.read()
+    return encode(cleaned, sr)
 
 
 def musicgen_hq(prompt, duration=32, bpm=None, seed=None):
@@ -59,7 +53,7 @@ def musicgen_hq(prompt, duration=32, bpm=None, seed=None):
     # ------------------------------
     # PASS 3: HQ Instrumental Mastering
     # ------------------------------
-    tmp_path = tempfile.mktemp(suffix=".wav")
+    tmp_path = scratch_path(".wav")
     with open(tmp_path, "wb") as f:
         f.write(enhanced)
 
@@ -1,18 +1,14 @@
 import numpy as np
 import librosa
 import requests
-import tempfile
 import scipy.signal as signal
 import pyloudnorm as pyln
 
+from audio_io_service.audio_io import decode
 
-def analyze_persona_hq(audio_bytes):
-    tmp = tempfile.mktemp(suffix=".wav")
-    with open(tmp, "wb") as f:
-        f.write(audio_bytes)
 
-    y, sr = librosa.load(tmp, sr=44100)
-    y = y.astype(np.float32)
+def analyze_persona_hq(audio_bytes):
+    y, sr = decode(audio_bytes, sr=44100)
 
     features = {}
 
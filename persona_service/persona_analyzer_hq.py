@@ -3,9 +3,10 @@
 import numpy as np
 import librosa
 import soundfile as sf
-import tempfile
 import pyloudnorm as pyln
 
+from audio_io_service.audio_io import decode
+
 def analyze_persona_hq(audio_bytes):
     """
     High-quality but Render-safe persona analyzer.
@@ -13,12 +14,8 @@ def analyze_persona_hq(audio_bytes):
     Returns vocal fingerprint features that your SoVITS engine can use.
     """
 
-    # Save to temp WAV
-    tmp = tempfile.mktemp(suffix=".wav")
-    with open(tmp, "wb") as f:
-        f.write(audio_bytes)
-
-    y, sr = librosa.load(tmp, sr=44100, mono=True)
+    # Decode straight from memory
+    y, sr = decode(audio_bytes, sr=44100, mono=True)
 
     # Normalize
     y = librosa.util.normalize(y)
@@ -0,0 +1,133 @@
+import os
+import json
+import numpy as np
+
+from fetch_service.audio_cache import load_audio
+from metrics_service.metrics import lap, set_mode
+from ghost_mode_service.ghost_mode_handler import ghost_mode_array
+from doubler_service.doubler_handler import vocal_doubler_array
+from analog_master_service.analog_master_handler import analog_master_array
+from master_ai_service.master_ai_handler import master_ai_array
+from pitch_service.pitch_handler import pitch_shift_array
+from timestretch_service.timestretch_handler import time_stretch_array
+from reverb_service.impulse_reverb import apply_convolution_reverb
+from reverb_service.ir_registry import DEFAULT_IR, reverb_params
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+SAMPLE_RATE = 44100
+MAX_STEPS = int(os.environ.get("PIPELINE_MAX_STEPS", 12))
+
+REQUIRED = object()
+
+# op → (array fn, channel handling, {param: (type, default)})
+# channels: "mono" → fn expects mono; a stereo buffer is downmixed first
+#           "each" → fn expects mono; applied per channel on stereo
+#           "any"  → fn takes (samples,) or (samples, channels)
+#                    (doubler / analog widen mono input to stereo)
+OPERATIONS = {
+    "ghost": (ghost_mode_array, "any", {}),
+    "doubler": (vocal_doubler_array, "any", {}),
+    "analog_master": (analog_master_array, "any", {}),
+    "master_ai": (master_ai_array, "any", {}),
+    "pitch": (pitch_shift_array, "any", {"semitones": (float, REQUIRED)}),
+    "timestretch": (time_stretch_array, "any", {"stretch_factor": (float, REQUIRED)}),
+    "reverb": (apply_convolution_reverb, "any",
+               {"ir": (str, DEFAULT_IR), "mix": (float, 0.28), "dampen": (float, 0.15)}),
+}
+
+
+# -------------------------------------------------------------
+# VALIDATION
+# -------------------------------------------------------------
+def parse_steps(steps):
+    """
+    steps: ["ghost", {"op": "pitch", "semitones": -2}, ...], the same
+    list as a JSON string, or "ghost,doubler,reverb" (query strings).
+    Returns [(op, kwargs)]; raises ValueError on anything invalid so
+    the route can answer 400 before any audio is downloaded.
+    """
+    if isinstance(steps, str):
+        steps = json.loads(steps) if steps.lstrip().startswith("[") else steps.split(",")
+
+    if not isinstance(steps, list) or not steps:
+        raise ValueError("steps must be a non-empty list of operations")
+    if len(steps) > MAX_STEPS:
+        raise ValueError(f"at most {MAX_STEPS} steps per pipeline")
+
+    plan = []
+    for i, step in enumerate(steps):
+        if isinstance(step, str):
+            step = {"op": step.strip()}
+        if not isinstance(step, dict) or "op" not in step:
+            raise ValueError(f"step {i}: expected an op name or {{\"op\": ...}}")
+
+        op = step["op"]
+        if op not in OPERATIONS:
+            raise ValueError(f"step {i}: unknown op {op!r} (one of {', '.join(OPERATIONS)})")
+
+        spec = OPERATIONS[op][2]
+        unknown = set(step) - set(spec) - {"op"}
+        if unknown:
+            raise ValueError(f"step {i} ({op}): unknown params {', '.join(sorted(unknown))}")
+
+        kwargs = {}
+        for name, (kind, default) in spec.items():
+            if name not in step:
+                if default is REQUIRED:
+                    raise ValueError(f"step {i} ({op}): missing {name}")
+                kwargs[name] = default
+                continue
+            try:
+                kwargs[name] = kind(step[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"step {i} ({op}): {name} must be a {'string' if kind is str else 'number'}")
+
+        if op == "reverb":
+            # same IR names, ranges and dampen quantization as /reverb
+            try:
+                kwargs["ir"], kwargs["mix"], kwargs["dampen"] = reverb_params(
+                    kwargs["ir"], kwargs["mix"], kwargs["dampen"])
+            except ValueError as e:
+                raise ValueError(f"step {i} ({op}): {e}")
+
+        plan.append((op, kwargs))
+
+    return plan
+
+
+# -------------------------------------------------------------
+# EXECUTION
+# -------------------------------------------------------------
+def _apply(op, y, sr, kwargs):
+    fn, channels, _ = OPERATIONS[op]
+
+    if y.ndim == 2 and channels == "mono":
+        y = y.mean(axis=1)
+
+    if y.ndim == 2 and channels == "each":
+        return np.stack([fn(y[:, c], sr, **kwargs) for c in range(y.shape[1])], axis=1)
+
+    return fn(y, sr, **kwargs)
+
+
+def run_pipeline(audio_url, steps):
+    """
+    Decodes once, runs every step on one in-memory float32 buffer.
+    Returns it as (y, sr), so the response layer encodes it once, in
+    the requested format.
+    """
+    plan = parse_steps(steps)
+    set_mode("hq")
+
+    # channels kept: (channels, samples) → (samples, channels); a copy,
+    # since decoded cache arrays are read-only
+    y, sr = load_audio(audio_url, sr=SAMPLE_RATE, mono=False)
+    y = np.array(y.T, dtype=np.float32)
+
+    for op, kwargs in plan:
+        y = _apply(op, y, sr, kwargs)
+        lap(f"pipeline_{op}")
+
+    return np.asarray(y, dtype=np.float32), sr
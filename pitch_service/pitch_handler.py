@@ -1,13 +1,12 @@
-import tempfile
-import subprocess
-import requests
+from fetch_service.fetcher import fetch
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg, filter_audio
+from fetch_service.result_cache import cached_result
 
+@cached_result("pitch_shift", version=1)
 def pitch_shift(audio_url, semitones):
-    input_path = tempfile.mktemp(suffix=".wav")
-    output_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    output_path = scratch_path(".wav")
 
     # Rubberband pitch shifting
     cmd = [
@@ -16,7 +15,12 @@ def pitch_shift(audio_url, semitones):
         "-af", f"rubberband=pitch={2 ** (semitones/12)}",
         output_path
     ]
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd, check=True)
 
     with open(output_path, "rb") as f:
         return f.read()
+
+
+def pitch_shift_array(y, sr, semitones):
+    """Same rubberband shift on an in-memory buffer (used by /pipeline)."""
+    return filter_audio(y, sr, f"rubberband=pitch={2 ** (semitones/12)}")
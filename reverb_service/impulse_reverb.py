@@ -1,128 +1,113 @@
 import numpy as np
-import soundfile as sf
-import scipy.signal as signal
-import os
 
-# -------------------------------------------------------------
-# STATIC IR LOAD (cached in memory after first import)
-# -------------------------------------------------------------
-IR_PATH = os.path.join(
-    os.path.dirname(__file__),
-    "..",
-    "impulse_responses",
-    "cinematic_tail.wav"
+from fetch_service.audio_cache import load_audio
+from fetch_service.result_cache import cached_result
+from scratch_service.scratch import scratch_path
+from metrics_service.metrics import lap, set_mode
+from dsp_service.block_engine import (
+    iter_blocks, spool, collect, compensated, write_blocks, PeakMeter
 )
-
-_cached_ir = None
-_cached_ir_sr = None
-
-
-def _load_ir():
-    """Loads IR once, caches it for later calls."""
-    global _cached_ir, _cached_ir_sr
-
-    if _cached_ir is not None:
-        return _cached_ir, _cached_ir_sr
-
-    ir, sr = sf.read(IR_PATH)
-
-    # Convert stereo IR → mono (more consistent convolution)
-    if ir.ndim > 1:
-        ir = ir.mean(axis=1)
-
-    # Normalize IR to prevent insane reverb bursts
-    ir = ir / (np.max(np.abs(ir)) + 1e-6)
-
-    _cached_ir = ir.astype(np.float32)
-    _cached_ir_sr = sr
-    return _cached_ir, _cached_ir_sr
-
+from reverb_service.partitioned_convolution import PartitionedConvolver
+from reverb_service.ir_registry import DEFAULT_IR, ir_names, ir_spectra
 
 # -------------------------------------------------------------
-# EQ helper for IR shaping
+# IR SHAPING (IRs by name from reverb_service.ir_registry)
 # -------------------------------------------------------------
-def _eq_ir(ir, sr, low_shelf=0.1, high_shelf=0.15):
-    """
-    Very light IR EQ shaping:
-    low_shelf adds warmth,
-    high_shelf boosts air.
-    """
-    # Simple FFT domain EQ (low cost)
-    fft = np.fft.rfft(ir)
+# Film-style IR EQ (see ir_registry._eq_ir)
+IR_LOW_SHELF = 0.1
+IR_HIGH_SHELF = 0.15
+DEFAULT_DAMPEN = 0.15
 
-    freqs = np.fft.rfftfreq(len(ir), d=1/sr)
 
-    # Warm low shelf (below 300 Hz)
-    fft[freqs < 300] *= (1.0 + low_shelf)
-
-    # Air shelf (above 6 kHz)
-    fft[freqs > 6000] *= (1.0 + high_shelf)
-
-    return np.fft.irfft(fft).astype(np.float32)
+def prebuild_spectra(sr=44100):
+    """Prepares every IR at the default shaping (gunicorn master, before fork)."""
+    for name in ir_names():
+        ir_spectra(name, sr, IR_LOW_SHELF, IR_HIGH_SHELF, DEFAULT_DAMPEN)
+    return ir_names()
 
 
 # -------------------------------------------------------------
 # Main Convolution Reverb
 # -------------------------------------------------------------
-def apply_convolution_reverb(audio, sr, mix=0.28, dampen=0.15):
+def convolution_reverb_blocks(audio, sr, mix=0.28, dampen=DEFAULT_DAMPEN, ir=DEFAULT_IR, block_size=None):
     """
-    HQ cinematic convolution reverb with:
-    - IR caching
+    HQ cinematic convolution reverb as a block stream:
+    - IR caching (prepared partition spectra)
     - IR resampling
     - IR EQ shaping
     - dampened high-frequency decay
+    - partitioned (overlap-save) convolution
     - safe normalization
+    Three passes (wet → spool + wet peak, mix peak, render); working
+    memory is a few blocks whatever the track length.
 
     mix:    amount of reverb (0–1)
     dampen: exponential decay factor for tail brightness
+    ir:     impulse response name (see ir_registry.ir_names())
     """
+    spectra = ir_spectra(ir, sr, IR_LOW_SHELF, IR_HIGH_SHELF, float(dampen))
 
     # ---------------------------------------------------------
-    # LOAD IR
+    # Partitioned convolution (spooled) + wet peak
     # ---------------------------------------------------------
-    ir, ir_sr = _load_ir()
+    convolver = PartitionedConvolver(spectra)
+    wet = spool(audio.shape)
+    wet_peak = PeakMeter()
 
-    # ---------------------------------------------------------
-    # Resample IR to match the audio sample rate
-    # ---------------------------------------------------------
-    if ir_sr != sr:
-        ir = signal.resample_poly(ir, sr, ir_sr)
+    pos = 0
+    for block in compensated(convolver, iter_blocks(audio, block_size)):
+        wet[pos:pos + len(block)] = wet_peak(block)
+        pos += len(block)
 
     # ---------------------------------------------------------
-    # Apply IR EQ shaping (film-style)
+    # Normalize wet tail BEFORE mixing, mix dry + wet
     # ---------------------------------------------------------
-    ir = _eq_ir(ir, sr)
+    wet_gain = 1.0 / (wet_peak.peak + 1e-6)
 
-    # ---------------------------------------------------------
-    # Apply dampening to IR (gentle HF decay)
-    # ---------------------------------------------------------
-    n = np.linspace(0, 1, len(ir))
-    ir = ir * np.exp(-dampen * n)
+    def mixed_blocks():
+        for dry, tail in zip(iter_blocks(audio, block_size), iter_blocks(wet, block_size)):
+            yield (1 - mix) * dry + mix * (tail * wet_gain)
 
     # ---------------------------------------------------------
-    # Fast convolution (FFT-based)
+    # Global normalization with soft limiting
     # ---------------------------------------------------------
-    # Use rfft/irfft for CPU efficiency
-    wet = signal.fftconvolve(audio, ir, mode="full")
-    wet = wet[:len(audio)]
+    peak = PeakMeter()
+    for out in mixed_blocks():
+        peak(out)
+    scale = 1.0 / (peak.peak + 1e-6)
 
-    # ---------------------------------------------------------
-    # Normalize wet tail BEFORE mixing
-    # ---------------------------------------------------------
-    wet = wet / (np.max(np.abs(wet)) + 1e-6)
+    for out in mixed_blocks():
+        # Very soft clip smoothing (avoids digital harshness)
+        yield np.tanh(out * scale * 1.15).astype(np.float32)
 
-    # ---------------------------------------------------------
-    # Mix dry + wet
-    # ---------------------------------------------------------
-    out = (1 - mix) * audio + (mix * wet)
 
-    # ---------------------------------------------------------
-    # Global normalization with soft limiting
-    # ---------------------------------------------------------
-    max_amp = np.max(np.abs(out)) + 1e-6
-    out = out / max_amp
+def apply_convolution_reverb(audio, sr, mix=0.28, dampen=DEFAULT_DAMPEN, ir=DEFAULT_IR):
+    """float32 in → float32 out, same shape (used by /pipeline)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    return collect(convolution_reverb_blocks(audio, sr, mix, dampen, ir), audio.shape)
+
+
+@cached_result("convolution_reverb", version=1)
+def _reverb_hq(audio_url, ir, mix, dampen):
+    """Keeps the input's channels; returns WAV bytes."""
+    y, sr = load_audio(audio_url, sr=44100, mono=False)
+
+    # (channels, samples) → (samples, channels) for the block stream
+    audio = y if y.ndim == 1 else y.T
+    channels = 1 if y.ndim == 1 else y.shape[0]
 
-    # Very soft clip smoothing (avoids digital harshness)
-    out = np.tanh(out * 1.15).astype(np.float32)
+    blocks = convolution_reverb_blocks(audio, sr, mix, dampen, ir)
+    out_path = write_blocks(blocks, scratch_path(".wav"), sr, channels)
+    lap("dsp")
 
-    return out
+    with open(out_path, "rb") as f:
+        return f.read()
+
+
+# -------------------------------------------------------------
+# PUBLIC ENTRYPOINT (called by app.py)
+# -------------------------------------------------------------
+def convolution_reverb(audio_url, ir=DEFAULT_IR, mix=0.28, dampen=DEFAULT_DAMPEN):
+    """Convolution reverb with the impulse response called ir."""
+    set_mode("hq")
+    return _reverb_hq(audio_url, ir, float(mix), float(dampen))
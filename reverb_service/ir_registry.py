@@ -0,0 +1,214 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import functools
+import threading
+import numpy as np
+import soundfile as sf
+
+from fetch_service.fetcher import CACHE_DIR, path_digest
+from audio_io_service.audio_io import resample
+from reverb_service.partitioned_convolution import PARTITION_SIZE, partition_spectra
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Every audio file in IR_DIR is an impulse response, named after its
+# file (impulse_responses/cathedral.wav → "cathedral").
+IR_DIR = os.environ.get(
+    "IR_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "impulse_responses")
+)
+IR_EXTENSIONS = (".wav", ".flac", ".aif", ".aiff")
+DEFAULT_IR = os.environ.get("REVERB_DEFAULT_IR", "cinematic")
+
+# Prepared (resampled, EQ'd, dampened, partitioned) spectra are written
+# once as .npy and memory-mapped read-only, so all workers share one
+# copy through the page cache. Keyed on the IR file's content and the
+# shaping params (~350 KB per second of IR each), evicted LRU past
+# IR_SPECTRA_MAX_BYTES. Bump PREP_VERSION when the preparation changes.
+SPECTRA_DIR = os.path.join(CACHE_DIR, "ir_spectra")
+IR_SPECTRA_MAX_BYTES = int(os.environ.get("IR_SPECTRA_MAX_BYTES", 256 * 1024 ** 2))
+MIN_EVICT_AGE = 120
+PREP_VERSION = 1
+
+# Client-supplied shaping: validated ranges, and dampen (part of the
+# spectra key) snapped to DAMPEN_STEP, so each IR has a small, fixed
+# set of possible spectra files
+MIX_RANGE = (0.0, 1.0)
+DAMPEN_RANGE = (0.0, 5.0)
+DAMPEN_STEP = 0.05
+
+_irs = {}
+_evict_lock = threading.Lock()
+
+
+# -------------------------------------------------------------
+# LIBRARY
+# -------------------------------------------------------------
+def scan(directory=None):
+    """(Re)indexes the IR directory; returns the sorted names."""
+    directory = directory or IR_DIR
+    found = {}
+    if os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() in IR_EXTENSIONS:
+                found[name] = os.path.join(directory, filename)
+
+    _irs.clear()
+    _irs.update(found)
+    return ir_names()
+
+
+def ir_names():
+    return sorted(_irs)
+
+
+def ir_path(name):
+    """Path of the IR called name; ValueError for unknown names."""
+    if name not in _irs:
+        raise ValueError(f"unknown ir {name!r} (one of {', '.join(ir_names())})")
+    return _irs[name]
+
+
+def _quantize_dampen(dampen):
+    dampen = min(max(float(dampen), DAMPEN_RANGE[0]), DAMPEN_RANGE[1])
+    return round(round(dampen / DAMPEN_STEP) * DAMPEN_STEP, 4)
+
+
+def reverb_params(ir, mix, dampen):
+    """Validated (ir, mix, dampen) from a request; ValueError when out of range."""
+    ir_path(ir)
+    mix, dampen = float(mix), float(dampen)
+    if not MIX_RANGE[0] <= mix <= MIX_RANGE[1]:
+        raise ValueError(f"mix must be between {MIX_RANGE[0]} and {MIX_RANGE[1]}")
+    if not DAMPEN_RANGE[0] <= dampen <= DAMPEN_RANGE[1]:
+        raise ValueError(f"dampen must be between {DAMPEN_RANGE[0]} and {DAMPEN_RANGE[1]}")
+    return ir, round(mix, 3), _quantize_dampen(dampen)
+
+
+# -------------------------------------------------------------
+# IR PREPARATION
+# -------------------------------------------------------------
+def _load_ir(path):
+    ir, sr = sf.read(path)
+
+    # Convert stereo IR → mono (more consistent convolution)
+    if ir.ndim > 1:
+        ir = ir.mean(axis=1)
+
+    # Normalize IR to prevent insane reverb bursts
+    ir = ir / (np.max(np.abs(ir)) + 1e-6)
+
+    return ir.astype(np.float32), sr
+
+
+def _eq_ir(ir, sr, low_shelf=0.1, high_shelf=0.15):
+    """
+    Very light IR EQ shaping:
+    low_shelf adds warmth,
+    high_shelf boosts air.
+    """
+    # Simple FFT domain EQ (low cost)
+    fft = np.fft.rfft(ir)
+
+    freqs = np.fft.rfftfreq(len(ir), d=1/sr)
+
+    # Warm low shelf (below 300 Hz)
+    fft[freqs < 300] *= (1.0 + low_shelf)
+
+    # Air shelf (above 6 kHz)
+    fft[freqs > 6000] *= (1.0 + high_shelf)
+
+    return np.fft.irfft(fft).astype(np.float32)
+
+
+def _prepare(path, sr, low_shelf, high_shelf, dampen, partition):
+    # ---------------------------------------------------------
+    # LOAD IR + resample to match the audio sample rate
+    # ---------------------------------------------------------
+    ir, ir_sr = _load_ir(path)
+    ir = resample(ir, ir_sr, sr)
+
+    # ---------------------------------------------------------
+    # Apply IR EQ shaping (film-style)
+    # ---------------------------------------------------------
+    ir = _eq_ir(ir, sr, low_shelf, high_shelf)
+
+    # ---------------------------------------------------------
+    # Apply dampening to IR (gentle HF decay)
+    # ---------------------------------------------------------
+    n = np.linspace(0, 1, len(ir))
+    ir = ir * np.exp(-dampen * n)
+
+    return partition_spectra(ir, partition)
+
+
+def _spectra_path(name, path, sr, low_shelf, high_shelf, dampen, partition):
+    params = json.dumps([PREP_VERSION, sr, low_shelf, high_shelf, dampen, partition])
+    key = hashlib.sha256(f"{path_digest(path)}:{params}".encode()).hexdigest()[:24]
+    return os.path.join(SPECTRA_DIR, f"{name}_{key}.npy")
+
+
+def _evict():
+    """Drops least-recently-used spectra until under IR_SPECTRA_MAX_BYTES."""
+    with _evict_lock:
+        entries = []
+        total = 0
+
+        for name in os.listdir(SPECTRA_DIR):
+            if name.startswith(".") or not name.endswith(".npy"):
+                continue
+            path = os.path.join(SPECTRA_DIR, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        now = time.time()
+        for mtime, size, path in sorted(entries):
+            if total <= IR_SPECTRA_MAX_BYTES:
+                break
+            if now - mtime < MIN_EVICT_AGE:
+                continue
+            try:
+                os.remove(path)   # open memory maps keep their pages
+                total -= size
+            except OSError:
+                pass
+
+
+@functools.lru_cache(maxsize=64)
+def _load_spectra(name, sr, low_shelf, high_shelf, dampen, partition):
+    path = ir_path(name)
+    spectra_path = _spectra_path(name, path, sr, low_shelf, high_shelf, dampen, partition)
+
+    if os.path.exists(spectra_path):
+        os.utime(spectra_path, None)
+    else:
+        os.makedirs(SPECTRA_DIR, exist_ok=True)
+        tmp = os.path.join(SPECTRA_DIR, f".{uuid.uuid4().hex}.npy")
+        np.save(tmp, _prepare(path, sr, low_shelf, high_shelf, dampen, partition))
+        os.replace(tmp, spectra_path)
+        _evict()
+
+    return np.load(spectra_path, mmap_mode="r")
+
+
+def ir_spectra(name, sr, low_shelf=0.1, high_shelf=0.15, dampen=0.15, partition=PARTITION_SIZE):
+    """
+    Partition spectra of IR `name` prepared for sr / EQ / dampen (clamped
+    and snapped to DAMPEN_STEP), as a read-only memory map shared by
+    every worker. The first caller anywhere builds and atomically
+    publishes the file.
+    """
+    return _load_spectra(name, sr, low_shelf, high_shelf, _quantize_dampen(dampen), partition)
+
+
+# Indexed at import (app startup / gunicorn master before fork)
+scan()
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import scipy.fft
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# Uniformly partitioned overlap-save: the IR is cut into PARTITION_SIZE
+# pieces whose spectra are computed once, and every PARTITION_SIZE
+# samples of input cost one 2 * PARTITION_SIZE FFT/IFFT pair plus one
+# spectrum multiply-add per IR partition — instead of a full-length
+# FFT of track + IR per call.
+PARTITION_SIZE = int(os.environ.get("REVERB_PARTITION_SIZE", 4096))
+
+
+# -------------------------------------------------------------
+# IR PARTITION SPECTRA
+# -------------------------------------------------------------
+def partition_spectra(ir, partition=None):
+    """
+    IR → (partitions, partition + 1) complex64: rfft of each
+    partition-long piece zero-padded to 2 * partition. Read-only, so
+    callers can cache and share it.
+    """
+    partition = partition or PARTITION_SIZE
+    count = max(1, -(-len(ir) // partition))
+
+    padded = np.zeros(count * partition, dtype=np.float32)
+    padded[:len(ir)] = ir
+
+    spectra = scipy.fft.rfft(padded.reshape(count, partition), n=2 * partition, axis=1)
+    spectra = spectra.astype(np.complex64)
+    spectra.setflags(write=False)
+    return spectra
+
+
+# -------------------------------------------------------------
+# CONVOLVER
+# -------------------------------------------------------------
+class PartitionedConvolver:
+    """
+    Convolution of a signal with a pre-partitioned IR, output truncated
+    to the input length (fftconvolve(x, ir)[:len(x)]). Mono (samples,)
+    or (samples, channels); every channel gets the same IR.
+
+    process(): block mode — any whole number of partitions at once,
+    vectorized over them, no latency.
+    __call__(): streaming — any block length; input is buffered to
+    partition boundaries, so output runs `latency` samples late
+    (use block_engine.compensated()).
+    """
+
+    def __init__(self, spectra):
+        self.spectra = spectra
+        self.partition = spectra.shape[1] - 1
+        self.latency = self.partition
+        self.prev = None      # last input partition (overlap-save)
+        self.fdl = None       # input spectra of the previous (partitions − 1) steps
+        self.pending = None
+        self.ready = None
+
+    def process(self, x):
+        size = self.partition
+        count = len(self.spectra)
+        x = np.asarray(x, dtype=np.float32)
+        if len(x) % size:
+            raise ValueError("process() takes whole partitions; use the streaming call")
+
+        frames = x.reshape(len(x) // size, size, -1)
+        m, _, channels = frames.shape
+        if self.prev is None:
+            self.prev = np.zeros((size, channels), dtype=np.float32)
+            self.fdl = np.zeros((count - 1, size + 1, channels), dtype=np.complex64)
+
+        # 2 * size frames: previous partition + current one
+        previous = np.concatenate([self.prev[None], frames[:-1]])
+        spectra = scipy.fft.rfft(np.concatenate([previous, frames], axis=1), axis=1)
+
+        # frequency-domain delay line: Y_k = Σ_p X_(k-p) · H_p
+        line = np.concatenate([self.fdl, spectra])
+        acc = np.zeros_like(spectra)
+        for p in range(count):
+            start = count - 1 - p
+            acc += self.spectra[p][None, :, None] * line[start:start + m]
+
+        self.fdl = line[m:]
+        self.prev = frames[-1]
+
+        out = scipy.fft.irfft(acc, axis=1)[:, size:]
+        out = out.reshape(m * size, channels).astype(np.float32)
+        return out if x.ndim > 1 else out[:, 0]
+
+    def __call__(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        if self.pending is None:
+            self.pending = np.zeros((0,) + block.shape[1:], dtype=np.float32)
+            self.ready = np.zeros((self.latency,) + block.shape[1:], dtype=np.float32)
+
+        self.pending = np.concatenate([self.pending, block])
+        whole = len(self.pending) // self.partition * self.partition
+        if whole:
+            self.ready = np.concatenate([self.ready, self.process(self.pending[:whole])])
+            self.pending = self.pending[whole:]
+
+        out, self.ready = self.ready[:len(block)], self.ready[len(block):]
+        return out
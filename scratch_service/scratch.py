@@ -0,0 +1,258 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+# work/<id>/   → per-request scratch, deleted when the request ends
+# orphan/      → scratch created outside a request (TTL cleanup)
+# PUBLISH_DIR  → outputs served by /files/<name>, expire after TTL
+SCRATCH_ROOT = os.environ.get("SCRATCH_ROOT", "/tmp/scratch")
+PUBLISH_DIR = os.environ.get("PUBLISH_DIR", "/tmp/published")
+
+PUBLISH_TTL_SECONDS = int(os.environ.get("PUBLISH_TTL_SECONDS", 3600))
+SCRATCH_TTL_SECONDS = int(os.environ.get("SCRATCH_TTL_SECONDS", 2 * 3600))
+SCRATCH_QUOTA_BYTES = int(os.environ.get("SCRATCH_QUOTA_BYTES", 5 * 1024 ** 3))
+GC_INTERVAL_SECONDS = int(os.environ.get("SCRATCH_GC_INTERVAL", 60))
+
+_WORK_DIR = os.path.join(SCRATCH_ROOT, "work")
+_ORPHAN_DIR = os.path.join(SCRATCH_ROOT, "orphan")
+
+_local = threading.local()
+_gc_lock = threading.Lock()
+_gc_thread = None
+
+_stats = {
+    "published_expired": 0,
+    "published_evicted": 0,
+    "scratch_expired": 0,
+    "bytes_freed": 0,
+}
+
+
+def _ensure_dirs():
+    for d in (_WORK_DIR, _ORPHAN_DIR, PUBLISH_DIR):
+        os.makedirs(d, exist_ok=True)
+
+
+def _tree_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path):
+    size = _tree_size(path)
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            return 0
+    _stats["bytes_freed"] += size
+    return size
+
+
+# -------------------------------------------------------------
+# PER-REQUEST SCRATCH
+# -------------------------------------------------------------
+@contextmanager
+def request_scope():
+    """
+    Gives the current thread a private working directory.
+    Everything created through scratch_path()/scratch_dir() inside
+    the block is deleted when it exits.
+    """
+    _ensure_dirs()
+    path = os.path.join(_WORK_DIR, uuid.uuid4().hex)
+    os.makedirs(path)
+
+    previous = getattr(_local, "work_dir", None)
+    _local.work_dir = path
+    try:
+        yield path
+    finally:
+        _local.work_dir = previous
+        _remove(path)
+
+
+def begin_request():
+    """Non-context-manager form (Flask before_request hook)."""
+    scope = request_scope()
+    scope.__enter__()
+    _local.scope = scope
+
+
+def end_request():
+    """Flask teardown_request hook."""
+    scope = getattr(_local, "scope", None)
+    _local.scope = None
+    if scope is not None:
+        scope.__exit__(None, None, None)
+
+
+def _current_dir():
+    path = getattr(_local, "work_dir", None)
+    if path is None:
+        _ensure_dirs()
+        return _ORPHAN_DIR
+    return path
+
+
+def scratch_path(suffix=""):
+    """Replacement for tempfile.mktemp(suffix=...)."""
+    return os.path.join(_current_dir(), f"{uuid.uuid4().hex}{suffix}")
+
+
+def scratch_dir(prefix=""):
+    """Creates and returns a fresh directory inside the scratch scope."""
+    path = os.path.join(_current_dir(), f"{prefix}{uuid.uuid4().hex}")
+    os.makedirs(path)
+    return path
+
+
+# -------------------------------------------------------------
+# PUBLISHED OUTPUTS (/files)
+# -------------------------------------------------------------
+def publish_bytes(raw_bytes, ext=".wav"):
+    """Stores a result for download. Returns its public file name."""
+    _ensure_dirs()
+    name = f"{uuid.uuid4().hex}{ext}"
+    tmp = os.path.join(PUBLISH_DIR, f".{name}.part")
+    with open(tmp, "wb") as f:
+        f.write(raw_bytes)
+    os.replace(tmp, os.path.join(PUBLISH_DIR, name))
+    return name
+
+
+def publish_file(path, ext=None, copy=False):
+    """
+    Moves an existing file into the published area (copy=True leaves
+    it in place, for files other callers share). Returns its name.
+    """
+    _ensure_dirs()
+    if ext is None:
+        ext = os.path.splitext(path)[1]
+    name = f"{uuid.uuid4().hex}{ext}"
+    if copy:
+        tmp = os.path.join(PUBLISH_DIR, f".{name}.part")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, os.path.join(PUBLISH_DIR, name))
+    else:
+        shutil.move(path, os.path.join(PUBLISH_DIR, name))
+    return name
+
+
+def published_path(name):
+    """Resolves a /files name to a path, or None (missing / escapes dir)."""
+    root = os.path.realpath(PUBLISH_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if not path.startswith(root + os.sep) or not os.path.isfile(path):
+        return None
+
+    # Downloads count as use for LRU eviction
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return path
+
+
+# -------------------------------------------------------------
+# GARBAGE COLLECTION
+# -------------------------------------------------------------
+def _entries(directory):
+    out = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            continue
+        out.append((mtime, path))
+    return out
+
+
+def collect_garbage():
+    """
+    1. expire published outputs older than PUBLISH_TTL_SECONDS
+    2. expire orphan / abandoned scratch older than SCRATCH_TTL_SECONDS
+    3. evict least-recently-used published outputs above the quota
+    """
+    _ensure_dirs()
+
+    with _gc_lock:
+        now = time.time()
+
+        for mtime, path in _entries(PUBLISH_DIR):
+            if now - mtime > PUBLISH_TTL_SECONDS:
+                _remove(path)
+                _stats["published_expired"] += 1
+
+        for directory in (_ORPHAN_DIR, _WORK_DIR):
+            for mtime, path in _entries(directory):
+                if now - mtime > SCRATCH_TTL_SECONDS:
+                    _remove(path)
+                    _stats["scratch_expired"] += 1
+
+        held = usage()["total_bytes"]
+        if held <= SCRATCH_QUOTA_BYTES:
+            return
+
+        for mtime, path in sorted(_entries(PUBLISH_DIR)):
+            if held <= SCRATCH_QUOTA_BYTES:
+                break
+            held -= _remove(path)
+            _stats["published_evicted"] += 1
+
+
+def usage():
+    """Bytes / files currently held in each area + GC counters."""
+    _ensure_dirs()
+
+    work = _tree_size(_WORK_DIR)
+    orphan = _tree_size(_ORPHAN_DIR)
+    published = _tree_size(PUBLISH_DIR)
+
+    return {
+        "work_bytes": work,
+        "orphan_bytes": orphan,
+        "published_bytes": published,
+        "published_files": len(os.listdir(PUBLISH_DIR)),
+        "active_requests": len(os.listdir(_WORK_DIR)),
+        "total_bytes": work + orphan + published,
+        "quota_bytes": SCRATCH_QUOTA_BYTES,
+        **_stats,
+    }
+
+
+def start_gc_thread():
+    """Runs collect_garbage() every GC_INTERVAL_SECONDS in the background."""
+    global _gc_thread
+
+    if _gc_thread is not None and _gc_thread.is_alive():
+        return
+
+    def _loop():
+        while True:
+            try:
+                collect_garbage()
+            except Exception as e:
+                print(f"[scratch] gc failed: {e}")
+            time.sleep(GC_INTERVAL_SECONDS)
+
+    _gc_thread = threading.Thread(target=_loop, name="scratch-gc", daemon=True)
+    _gc_thread.start()
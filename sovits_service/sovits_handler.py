@@ -1,8 +1,8 @@
-import tempfile
 import numpy as np
-import librosa
-import soundfile as sf
-import scipy.signal as signal
+
+from metrics_service.metrics import lap
+from audio_io_service.audio_io import decode, encode
+from dsp_service.filters import bandpass
 
 
 # -----------------------------------------------------------
@@ -10,15 +10,9 @@ import scipy.signal as signal
 # -----------------------------------------------------------
 def bandpass_filter(y, sr, low, high, gain=1.0, order=6):
     """
-    HQ bandpass filter using scipy SOS filter.
+    HQ bandpass filter using scipy SOS filter (design cached in dsp_service.filters).
     """
-    sos = signal.butter(
-        order,
-        [low / (sr / 2), high / (sr / 2)],
-        btype="bandpass",
-        output="sos"
-    )
-    return gain * signal.sosfilt(sos, y)
+    return gain * bandpass(y, sr, low, high, order=order)
 
 
 # -----------------------------------------------------------
@@ -32,14 +26,11 @@ def enhance_sovits(audio_bytes):
     """
 
     # ---------------------------------------------
-    # Load from bytes → float32 mono array
+    # Decode bytes → float32 array (in memory), channels kept:
+    # (samples,) or (samples, channels), filters run on axis 0
     # ---------------------------------------------
-    in_path = tempfile.mktemp(suffix=".wav")
-    with open(in_path, "wb") as f:
-        f.write(audio_bytes)
-
-    y, sr = librosa.load(in_path, sr=44100, mono=True)
-    y = y.astype(np.float32)
+    y, sr = decode(audio_bytes, sr=44100, mono=False)
+    y = y.T
 
     # ---------------------------------------------
     # 1. De-mud (remove 300–600 Hz mud)
@@ -72,12 +63,16 @@ def enhance_sovits(audio_bytes):
     deessed = saturated - sib * 0.22
 
     # ---------------------------------------------
-    # 6. Stereo widening (drift-based)
+    # 6. Stereo widening (drift-based) — mono renders only;
+    # stereo input already has its own image
     # ---------------------------------------------
-    shift = int(sr * 0.00065)   # 0.65 ms shift
-    left = np.roll(deessed, shift)
-    right = np.roll(deessed, -shift)
-    stereo = np.stack([left, right], axis=1)
+    if deessed.ndim == 1:
+        shift = int(sr * 0.00065)   # 0.65 ms shift
+        left = np.pad(deessed, (shift, 0))[:len(deessed)]
+        right = np.pad(deessed, (0, shift))[shift:]
+        stereo = np.stack([left, right], axis=1)
+    else:
+        stereo = deessed
 
     # Normalize before limiting
     max_amp = np.max(np.abs(stereo)) + 1e-6
@@ -87,11 +82,12 @@ def enhance_sovits(audio_bytes):
     # 7. Soft limiter
     # ---------------------------------------------
     stereo = np.tanh(stereo * 1.2).astype(np.float32)
+    lap("dsp")
 
     # ---------------------------------------------
-    # 8. Save output file
+    # 8. Encode output
     # ---------------------------------------------
-    out_path = tempfile.mktemp(suffix=".wav")
-    sf.write(out_path, stereo, sr)
+    out = encode(stereo, sr)
+    lap("encode")
 
-    return open(out_path, "rb").read()
+    return out
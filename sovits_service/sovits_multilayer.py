@@ -1,12 +1,12 @@
-import uuid
 import subprocess
-import tempfile
 import os
 import base64
 import json
 import numpy as np
 import soundfile as sf
 from sovits_service.sovits_handler import extract_sovits_features
+from scratch_service.scratch import scratch_path
+from dsp_service.delay_line import modulated_delay
 
 # Mapping internal vocal mode -> CLI code
 BASE_MODE_CODES = {
@@ -31,13 +31,18 @@ DSP_MODES = [
     "whisper_soft", "whisper_air", "whisper_breathy"
 ]
 
-def apply_dsp(y, sr, mode):
-    """Applies DSP transformations for non-SoVITS-native modes."""
+def apply_dsp(y, sr, mode, seed=0):
+    """
+    Applies DSP transformations for non-SoVITS-native modes.
+    seed fixes the raspy/breathy noise so equal inputs give equal output.
+    """
     import librosa
     import scipy.signal as signal
 
+    rng = np.random.default_rng(seed)
+
     if mode == "raspy":
-        y = y + 0.03 * np.random.randn(len(y))
+        y = y + 0.03 * rng.standard_normal(len(y))
 
     if mode == "fry":
         y = librosa.effects.harmonic(y) * 0.8
@@ -46,7 +51,7 @@ def apply_dsp(y, sr, mode):
         y = y * 0.7 + librosa.effects.preemphasis(y) * 0.3
 
     if mode == "breathy":
-        noise = np.random.randn(len(y)) * 0.02
+        noise = rng.standard_normal(len(y)) * 0.02
         y = y + noise
 
     if mode == "formant_shift_up":
@@ -56,11 +61,13 @@ def apply_dsp(y, sr, mode):
         y = librosa.effects.pitch_shift(y, sr, n_steps=-3)
 
     if mode == "chorus":
-        delayed = np.pad(y, (200, 0))[:len(y)]
+        # ~4.5 ms tap swept ±1.5 ms at 0.8 Hz
+        delayed = modulated_delay(y, sr, base=200 / sr, depth=0.0015, rate_hz=0.8)
         y = (y + delayed) / 2
 
     if mode == "double":
-        shifted = librosa.effects.pitch_shift(y, sr, n_steps=0.1)
+        # ADT: 25 ms tap swept ±2 ms at 0.5 Hz ≈ ±10 cents of drift
+        shifted = modulated_delay(y, sr, base=0.025, depth=0.002, rate_hz=0.5, interpolation="cubic")
         y = (y + shifted) / 2
 
     if mode == "octave_up":
@@ -85,9 +92,9 @@ def apply_dsp(y, sr, mode):
 
 def render_sovits_layer(lyrics, midi_data, persona, vocal_mode):
     """Render one SoVITS vocal layer."""
-    tmp_l = f"/tmp/lyrics_{uuid.uuid4()}.txt"
-    tmp_m = f"/tmp/midi_{uuid.uuid4()}.mid"
-    out_wav = f"/tmp/sovits_{uuid.uuid4()}.wav"
+    tmp_l = scratch_path(".txt")
+    tmp_m = scratch_path(".mid")
+    out_wav = scratch_path(".wav")
 
     with open(tmp_l, "w") as f: f.write(lyrics)
     with open(tmp_m, "wb") as f: f.write(midi_data)
@@ -109,7 +116,7 @@ def render_sovits_layer(lyrics, midi_data, persona, vocal_mode):
     return audio, sr
 
 
-def run_sovits_multilayer(lyrics, midi_data, persona, layers: dict):
+def run_sovits_multilayer(lyrics, midi_data, persona, layers: dict, seed=0):
     """Multi-layer SoVITS + DSP rendering engine."""
     final_mix = None
     final_sr = 44100
@@ -124,7 +131,7 @@ def run_sovits_multilayer(lyrics, midi_data, persona, layers: dict):
         else:
             # Base layer then DSP
             audio, sr = render_sovits_layer(lyrics, midi_data, persona, "neutral")
-            audio = apply_dsp(audio, sr, mode)
+            audio = apply_dsp(audio, sr, mode, seed=seed)
 
         # Apply weight
         audio = audio * weight
@@ -139,7 +146,7 @@ def run_sovits_multilayer(lyrics, midi_data, persona, layers: dict):
     # Normalize
     final_mix = final_mix / np.max(np.abs(final_mix))
 
-    out = f"/tmp/final_multilayer_{uuid.uuid4()}.wav"
+    out = scratch_path(".wav")
     sf.write(out, final_mix, final_sr)
 
     return open(out, "rb").read()
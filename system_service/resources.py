@@ -0,0 +1,47 @@
+import os
+
+
+# -------------------------------------------------------------
+# CONTAINER RESOURCES
+# -------------------------------------------------------------
+# Shared by gunicorn.conf.py (startup log) and the app (admission),
+# so both see the same cgroup-limited numbers.
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cores():
+    """CPU affinity, capped by a cgroup CPU quota when one is set."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    quota = _read("/sys/fs/cgroup/cpu.max")  # cgroup v2: "<quota> <period>" or "max <period>"
+    if quota and not quota.startswith("max"):
+        limit, period = (int(v) for v in quota.split())
+        cores = min(cores, max(1, limit // period))
+    else:
+        limit = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")  # cgroup v1
+        period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            cores = min(cores, max(1, int(limit) // int(period)))
+
+    return cores
+
+
+def available_memory_mb():
+    """cgroup memory limit when set, physical memory otherwise."""
+    physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+    limit = _read("/sys/fs/cgroup/memory.max")  # cgroup v2
+    if limit is None:
+        limit = _read("/sys/fs/cgroup/memory/memory.limit_in_bytes")  # cgroup v1
+    if limit and limit != "max" and int(limit) < physical:
+        return int(limit) // 2**20
+
+    return physical // 2**20
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+# Caches, scratch and published files go to a throwaway directory; set
+# before any service module reads its config at import time.
+_ROOT = tempfile.mkdtemp(prefix="audio-tests-")
+os.environ.setdefault("FETCH_CACHE_DIR", os.path.join(_ROOT, "cache"))
+os.environ.setdefault("SCRATCH_ROOT", os.path.join(_ROOT, "scratch"))
+os.environ.setdefault("PUBLISH_DIR", os.path.join(_ROOT, "published"))
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+SR = 44100
+
+
+@pytest.fixture
+def noise():
+    """3 s of stereo noise at SR, seeded."""
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal((3 * SR, 2)) * 0.25).astype(np.float32)
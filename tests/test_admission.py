@@ -0,0 +1,37 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from admission_service import admission
+from admission_service.admission import AdmissionController, Overloaded
+
+
+def test_over_capacity_without_queue_is_rejected():
+    controller = AdmissionController(capacity=10, max_queue=0, max_wait=0)
+    held = controller.acquire(8)
+
+    with pytest.raises(Overloaded) as e:
+        controller.acquire(5)
+    assert e.value.retry_after >= 1
+
+    controller.release(held)
+    controller.release(controller.acquire(5))
+
+
+def test_over_cost_request_gets_429(monkeypatch):
+    import app
+
+    controller = AdmissionController(capacity=1, max_queue=0, max_wait=0)
+    controller.acquire(1)
+    monkeypatch.setattr(admission, "_controller", controller)
+    monkeypatch.setattr(admission, "ADMISSION_ENABLED", True)
+
+    buf = io.BytesIO()
+    sf.write(buf, np.zeros(44100, dtype=np.float32), 44100, format="WAV")
+    response = app.app.test_client().post("/dsp/onsets", data=buf.getvalue())
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert response.get_json()["retry_after"] == int(response.headers["Retry-After"])
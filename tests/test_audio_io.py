@@ -0,0 +1,50 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_io_service.audio_io import output_options, transcode
+from scratch_service.scratch import scratch_path
+
+from conftest import SR
+
+
+def _wav_bytes(y):
+    buf = io.BytesIO()
+    sf.write(buf, y, SR, subtype="FLOAT", format="WAV")
+    return buf.getvalue()
+
+
+def _read(encoded):
+    return sf.read(encoded if isinstance(encoded, str) else io.BytesIO(encoded), dtype="float32")
+
+
+@pytest.mark.parametrize("fmt, bit_depth, tolerance", [
+    ("wav", 24, 1e-5),
+    ("flac", 16, 1e-3),
+    ("flac", 24, 1e-5),
+])
+@pytest.mark.parametrize("kind", ["buffer", "bytes", "file"])
+def test_transcode_round_trip(noise, kind, fmt, bit_depth, tolerance):
+    noise = np.clip(noise, -0.99, 0.99)   # integer formats clip at full scale
+    if kind == "buffer":
+        audio = (noise, SR)
+    elif kind == "bytes":
+        audio = _wav_bytes(noise)
+    else:
+        audio = scratch_path(".wav")
+        sf.write(audio, noise, SR, subtype="FLOAT")
+
+    encoded, ext, _ = transcode(audio, output_options(fmt, bit_depth))
+    y, sr = _read(encoded)
+
+    assert ext == f".{fmt}"
+    assert sr == SR
+    assert y.shape == noise.shape
+    np.testing.assert_allclose(y, noise, atol=tolerance)
+
+
+def test_plain_wav_passes_through(noise):
+    raw = _wav_bytes(noise)
+    assert transcode(raw, output_options())[0] is raw
@@ -0,0 +1,16 @@
+import pyloudnorm as pyln
+import pytest
+
+from dsp_service.block_engine import LoudnessMeter, iter_blocks
+
+from conftest import SR
+
+
+@pytest.mark.parametrize("gain", [1.0, 0.5])
+def test_loudness_meter_matches_pyloudnorm(noise, gain):
+    meter = LoudnessMeter(SR)
+    for block in iter_blocks(noise, 3000):
+        meter(block)
+
+    expected = pyln.Meter(SR).integrated_loudness(noise * gain)
+    assert meter.integrated(gain) == pytest.approx(expected, abs=1e-3)
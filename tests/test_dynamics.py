@@ -0,0 +1,19 @@
+import numpy as np
+
+from dsp_service.block_engine import collect, compensated, iter_blocks
+from dsp_service.dynamics import Limiter, TruePeakDetector
+
+from conftest import SR
+
+
+def test_limiter_keeps_length_and_ceiling(noise):
+    loud = noise * 8.0
+    limiter = Limiter(SR, ceiling_db=-1.0)
+    out = collect(compensated(limiter, iter_blocks(loud, 4096)), loud.shape)
+
+    assert out.shape == loud.shape
+
+    # ceiling is in dBTP: measure the output the way the limiter does
+    detector = TruePeakDetector()
+    detector(out)
+    assert detector.peak <= 10 ** (-1.0 / 20) * 1.001
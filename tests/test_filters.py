@@ -0,0 +1,31 @@
+import numpy as np
+import scipy.signal as signal
+
+from dsp_service.block_engine import iter_blocks
+from dsp_service.filters import Crossover, crossover
+
+from conftest import SR
+
+FREQS = (120.0, 1000.0, 6000.0)
+
+
+def test_crossover_bands_sum_flat(noise):
+    """The bands sum to an allpassed input: same magnitude response."""
+    impulse = np.zeros(SR, dtype=np.float32)
+    impulse[0] = 1.0
+    summed = np.sum(crossover(impulse, SR, FREQS), axis=0)
+
+    freqs, response = signal.freqz(summed, worN=4096, fs=SR)
+    audible = (freqs > 20) & (freqs < 20000)
+    assert np.max(np.abs(20 * np.log10(np.abs(response[audible])))) < 0.01
+
+
+def test_crossover_blocks_match_whole_signal(noise):
+    whole = crossover(noise, SR, FREQS)
+
+    stage = Crossover(SR, FREQS)
+    blocks = [stage(block) for block in iter_blocks(noise, 1000)]
+    streamed = [np.concatenate([b[i] for b in blocks]) for i in range(len(FREQS) + 1)]
+
+    for band, expected in zip(streamed, whole):
+        np.testing.assert_allclose(band, expected, atol=1e-5)
@@ -0,0 +1,32 @@
+import numpy as np
+import scipy.signal as signal
+
+from dsp_service.block_engine import collect, compensated, iter_blocks
+from reverb_service.partitioned_convolution import PartitionedConvolver, partition_spectra
+
+PARTITION = 512
+
+
+def _ir():
+    rng = np.random.default_rng(1)
+    n = 5 * PARTITION + 100   # last partition partly filled
+    return (rng.standard_normal(n) * np.exp(-np.arange(n) / 800.0)).astype(np.float32)
+
+
+def test_process_matches_fftconvolve(noise):
+    ir = _ir()
+    x = noise[:40 * PARTITION]
+    out = PartitionedConvolver(partition_spectra(ir, PARTITION)).process(x)
+
+    expected = signal.fftconvolve(x, ir[:, None], axes=0)[:len(x)]
+    np.testing.assert_allclose(out, expected, atol=1e-4)
+
+
+def test_streaming_matches_fftconvolve(noise):
+    ir = _ir()
+    x = noise[:, 0]
+    convolver = PartitionedConvolver(partition_spectra(ir, PARTITION))
+    out = collect(compensated(convolver, iter_blocks(x, 1000)), x.shape)
+
+    expected = signal.fftconvolve(x, ir)[:len(x)]
+    np.testing.assert_allclose(out, expected, atol=1e-4)
@@ -1,13 +1,12 @@
-import tempfile
-import subprocess
-import requests
+from fetch_service.fetcher import fetch
+from scratch_service.scratch import scratch_path
+from ffmpeg_service.ffmpeg_runner import run_ffmpeg, filter_audio
+from fetch_service.result_cache import cached_result
 
+@cached_result("time_stretch", version=1)
 def time_stretch(audio_url, stretch_factor):
-    input_path = tempfile.mktemp(suffix=".wav")
-    output_path = tempfile.mktemp(suffix=".wav")
-
-    with open(input_path, "wb") as f:
-        f.write(requests.get(audio_url).content)
+    input_path = fetch(audio_url)
+    output_path = scratch_path(".wav")
 
     cmd = [
         "ffmpeg", "-y",
@@ -15,7 +14,12 @@ def time_stretch(audio_url, stretch_factor):
         "-af", f"atempo={stretch_factor}",
         output_path
     ]
-    subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(cmd, check=True)
 
     with open(output_path, "rb") as f:
         return f.read()
+
+
+def time_stretch_array(y, sr, stretch_factor):
+    """Same atempo stretch on an in-memory buffer (used by /pipeline)."""
+    return filter_audio(y, sr, f"atempo={stretch_factor}")
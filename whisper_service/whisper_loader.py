@@ -1,16 +1,41 @@
+import os
+import threading
+
 from faster_whisper import WhisperModel
 
-# Global model instance (loads once)
-model = WhisperModel(
-    "medium",
-    device="cpu",
-    compute_type="int8",   # ✔ ENABLE INT8 QUANTIZATION
-    cpu_threads=4,         # Adjust based on your Render plan
-    num_workers=1
-)
+# -------------------------------------------------------------
+# CONFIG
+# -------------------------------------------------------------
+WHISPER_MODEL_SIZE = os.environ.get("WHISPER_MODEL_SIZE", "medium")
+WHISPER_CPU_THREADS = int(os.environ.get("WHISPER_CPU_THREADS", 4))
+
+# Global model instance, loaded on first use (not on import) so only
+# processes that actually transcribe pay for it. It is deliberately not
+# preloaded in the gunicorn master: CTranslate2 starts its worker
+# threads when the model is built, and those would not exist in the
+# forked workers.
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = WhisperModel(
+                    WHISPER_MODEL_SIZE,
+                    device="cpu",
+                    compute_type="int8",   # ✔ ENABLE INT8 QUANTIZATION
+                    cpu_threads=WHISPER_CPU_THREADS,
+                    num_workers=1
+                )
+    return _model
+
 
 def transcribe(audio_path):
-    segments, info = model.transcribe(
+    segments, info = get_model().transcribe(
         audio_path,
         beam_size=5,
         vad_filter=True